@@ -8,7 +8,9 @@ import re
 import sys
 
 import salt.loader
+import salt.utils.beacons
 import salt.utils.event
+import salt.utils.json
 import salt.utils.minion
 
 log = logging.getLogger(__name__)
@@ -37,8 +39,18 @@ class Beacon:
                 - files:
                     - /etc/fstab: {}
                     - /var/cache/foo: {}
+
+        The beacons share the system metrics they sample during a pass, see
+        :py:func:`salt.utils.beacons.sample`. The identical events fired
+        during a pass by the beacons setting ``COALESCE_EVENTS`` to ``True``,
+        which report sampled metrics, are only sent once.
         """
+        with salt.utils.beacons.sampling_pass():
+            return self._process(config, grains)
+
+    def _process(self, config, grains):
         ret = []
+        coalesced = set()
         b_config = copy.deepcopy(config)
         if "enabled" in b_config and not b_config["enabled"]:
             return
@@ -142,12 +154,26 @@ class Beacon:
                         }
                     )
                 if not error:
+                    coalesce = self.beacons[fun_str].__globals__.get(
+                        "COALESCE_EVENTS", False
+                    )
                     for data in raw:
                         tag = "salt/beacon/{}/{}/".format(self.opts["id"], mod)
                         if "tag" in data:
                             tag += data.pop("tag")
                         if "id" not in data:
                             data["id"] = self.opts["id"]
+                        if coalesce:
+                            key = (
+                                tag,
+                                salt.utils.json.dumps(
+                                    data, sort_keys=True, default=str
+                                ),
+                            )
+                            if key in coalesced:
+                                log.trace("Coalesced identical %s beacon event", mod)
+                                continue
+                            coalesced.add(key)
                         ret.append(
                             {"tag": tag, "data": data, "beacon_name": beacon_name}
                         )
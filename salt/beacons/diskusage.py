@@ -8,6 +8,7 @@ Beacon to monitor disk usage.
 import logging
 import re
 
+import salt.utils.beacons
 import salt.utils.platform
 
 try:
@@ -21,6 +22,8 @@ log = logging.getLogger(__name__)
 
 __virtualname__ = "diskusage"
 
+COALESCE_EVENTS = True
+
 
 def __virtual__():
     if HAS_PSUTIL is False:
@@ -80,7 +83,9 @@ def beacon(config):
     it will override the previously defined threshold.
 
     """
-    parts = psutil.disk_partitions(all=True)
+    parts = salt.utils.beacons.sample(
+        "psutil.disk_partitions", psutil.disk_partitions, all=True
+    )
     ret = []
     for mounts in config:
         mount = next(iter(mounts))
@@ -105,7 +110,9 @@ def beacon(config):
                 _mount = part.mountpoint
 
                 try:
-                    _current_usage = psutil.disk_usage(_mount)
+                    _current_usage = salt.utils.beacons.sample(
+                        "psutil.disk_usage", psutil.disk_usage, _mount
+                    )
                 except OSError:
                     log.warning("%s is not a valid mount point.", _mount)
                     continue
@@ -19,6 +19,7 @@ import fnmatch
 import logging
 import os
 import re
+import time
 
 import salt.utils.beacons
 
@@ -111,6 +112,26 @@ def validate(config):
     else:
         config = salt.utils.beacons.list_to_dict(config)
 
+        window = config.get("coalesce_window", 0)
+        if isinstance(window, bool) or not isinstance(window, (int, float)):
+            return (
+                False,
+                "Configuration for inotify beacon coalesce_window must be a number.",
+            )
+        max_paths = config.get("coalesce_max_paths", 1000)
+        if (
+            isinstance(max_paths, bool)
+            or not isinstance(max_paths, int)
+            or max_paths < 1
+        ):
+            return (
+                False,
+                "Configuration for inotify beacon coalesce_max_paths must be a"
+                " positive integer.",
+            )
+        if not isinstance(config.get("batch", False), bool):
+            return False, "Configuration for inotify beacon batch must be boolean."
+
         if "files" not in config:
             return False, "Configuration for inotify beacon must include files."
         else:
@@ -171,6 +192,172 @@ def validate(config):
     return True, "Valid beacon configuration"
 
 
+def _excluded(excludes, pathname):
+    """
+    Return whether the excludes of a watched path match ``pathname``
+    """
+    if not excludes or not isinstance(excludes, list):
+        return False
+    for exclude in excludes:
+        if isinstance(exclude, dict):
+            _exclude = next(iter(exclude))
+            if exclude[_exclude].get("regex", False):
+                try:
+                    if re.search(_exclude, pathname):
+                        return True
+                except Exception:  # pylint: disable=broad-except
+                    log.warning("Failed to compile regex: %s", _exclude)
+        elif "*" in exclude:
+            if fnmatch.fnmatch(pathname, exclude):
+                return True
+        else:
+            if pathname.startswith(exclude):
+                return True
+    return False
+
+
+def _maskname(mask):
+    """
+    Return the name of a mask which may combine several events, in the format
+    of the ``maskname`` of a pyinotify event
+    """
+    names = [
+        name
+        for value, name in sorted(pyinotify.EventsCodes.ALL_VALUES.items())
+        # Skip the combined values like ALL_EVENTS
+        if not value & (value - 1) and value != pyinotify.IN_ISDIR and mask & value
+    ]
+    if mask & pyinotify.IN_ISDIR:
+        names.append("IN_ISDIR")
+    return "|".join(names)
+
+
+def _coalesce(events, window, max_paths):
+    """
+    Hold the changes of a path for ``window`` seconds after the first of them
+    and return the changes which were held long enough, merged per path.
+
+    At most ``max_paths`` paths of a directory are held, the changes to the
+    other paths of the directory are merged in one change of the directory
+    itself flagged with ``overflow``.
+    """
+    pending = __context__.setdefault("inotify.pending", collections.OrderedDict())
+    counts = __context__.setdefault("inotify.pending_counts", collections.Counter())
+    now = time.time()
+    for event in events:
+        key = (event["tag"], event["path"])
+        if key not in pending and counts[event["tag"]] >= max_paths:
+            key = (event["tag"], None)
+        if key in pending:
+            pending[key][0] |= event["mask"]
+            continue
+        pending[key] = [event["mask"], now]
+        if key[1] is not None:
+            counts[event["tag"]] += 1
+
+    ret = []
+    # The changes are held in the order of their first event, stop at the
+    # first one which is still in its window
+    while pending:
+        key, (mask, first) = next(iter(pending.items()))
+        if now - first < window:
+            break
+        del pending[key]
+        tag, path = key
+        sub = {"tag": tag, "path": path, "change": _maskname(mask)}
+        if path is None:
+            sub["path"] = tag
+            sub["overflow"] = True
+        else:
+            counts[tag] -= 1
+            if not counts[tag]:
+                del counts[tag]
+        ret.append(sub)
+    return ret
+
+
+def _watch_spec(path_config):
+    """
+    Return the mask, recurse and auto_add settings and the excludes of a
+    watched path
+    """
+    if not isinstance(path_config, dict):
+        return DEFAULT_MASK, False, False, None
+    mask = path_config.get("mask", DEFAULT_MASK)
+    if isinstance(mask, list):
+        r_mask = 0
+        for sub in mask:
+            r_mask |= _get_mask(sub)
+    elif isinstance(mask, bytes):
+        r_mask = _get_mask(mask)
+    else:
+        r_mask = mask
+    excludes = path_config.get("exclude", "")
+    excl = None
+    if isinstance(excludes, list):
+        excl = []
+        for exclude in excludes:
+            if isinstance(exclude, dict):
+                excl.append(list(exclude)[0])
+            else:
+                excl.append(exclude)
+        excl = tuple(excl)
+    return (
+        r_mask,
+        path_config.get("recurse", False),
+        path_config.get("auto_add", False),
+        excl,
+    )
+
+
+def _update_watches(wm, files):
+    """
+    Bring the watches in line with the configured paths.
+
+    Only the paths whose configuration changed, which were removed from the
+    configuration or whose watch went away, are touched, the watches of the
+    subdirectories of the other paths are left alone.
+    """
+    watched = __context__.setdefault("inotify.watched", {})
+
+    for path in list(watched):
+        spec, wd = watched[path]
+        if path in files and spec == _watch_spec(files[path]):
+            continue
+        watch = wm.watches.get(wd)
+        if watch is not None and watch.path == path:
+            wds = [wd]
+            if spec[1]:
+                # rm_watch with rec=True changes the watches while it walks
+                # them, collect the watches of the subdirectories first
+                prefix = os.path.join(path, "")
+                wds.extend(
+                    sub_wd
+                    for sub_wd, sub in wm.watches.items()
+                    if sub.path.startswith(prefix)
+                )
+            wm.rm_watch(wds, quiet=True)
+        del watched[path]
+
+    for path in files:
+        if path in watched:
+            wd = watched[path][1]
+            watch = wm.watches.get(wd)
+            if watch is not None and watch.path == path:
+                continue
+        if not os.path.exists(path):
+            continue
+        spec = _watch_spec(files[path])
+        mask, rec, auto_add, excl = spec
+        if excl is not None:
+            excl = pyinotify.ExcludeFilter(list(excl))
+        wds = wm.add_watch(path, mask, rec=rec, auto_add=auto_add, exclude_filter=excl)
+        wd = wds.get(path, -1)
+        if wd < 0:
+            continue
+        watched[path] = (spec, wd)
+
+
 def beacon(config):
     """
     Watch the configured files
@@ -195,6 +382,9 @@ def beacon(config):
                     - /path/to/file/or/dir/regex[a-m]*$:
                         regex: True
             - coalesce: True
+            - coalesce_window: 5
+            - coalesce_max_paths: 1000
+            - batch: True
 
     The mask list can contain the following events (the default mask is create,
     delete, and modify):
@@ -235,6 +425,30 @@ def beacon(config):
       This option is top-level (at the same level as the path) and therefore
       affects all paths that are being watched. This is due to this option
       being at the Notifier level in pyinotify.
+    coalesce_window:
+      .. versionadded:: 3005
+
+      Hold the changes of a path for this many seconds after the first of
+      them and send a single event for the path with all of its changes, for
+      example ``IN_CREATE|IN_MODIFY``. This option is top-level and affects
+      all paths that are being watched. The changes are sent as they happen
+      when it is not set or ``0``.
+    coalesce_max_paths:
+      .. versionadded:: 3005
+
+      The number of paths of a directory for which the changes are held when
+      ``coalesce_window`` is set, defaults to ``1000``. The changes to the
+      other paths of the directory are merged in a single event for the
+      directory itself, with ``overflow`` set to ``True``.
+    batch:
+      .. versionadded:: 3005
+
+      Send all of the changes found when the beacon runs in a single event,
+      with the list of changes in ``changes``, instead of one event per
+      change.
+
+    The watches are only updated for the paths whose configuration changed,
+    the watches of the subdirectories of a ``recurse`` path are added once.
     """
 
     config = salt.utils.beacons.list_to_dict(config)
@@ -251,7 +465,6 @@ def beacon(config):
         while queue:
             event = queue.popleft()
 
-            _append = True
             # Find the matching path in config
             path = event.path
             while path != "/":
@@ -261,85 +474,29 @@ def beacon(config):
 
             excludes = config["files"][path].get("exclude", "")
 
-            if excludes and isinstance(excludes, list):
-                for exclude in excludes:
-                    if isinstance(exclude, dict):
-                        _exclude = next(iter(exclude))
-                        if exclude[_exclude].get("regex", False):
-                            try:
-                                if re.search(_exclude, event.pathname):
-                                    _append = False
-                            except Exception:  # pylint: disable=broad-except
-                                log.warning("Failed to compile regex: %s", _exclude)
-                        else:
-                            exclude = _exclude
-                    elif "*" in exclude:
-                        if fnmatch.fnmatch(event.pathname, exclude):
-                            _append = False
-                    else:
-                        if event.pathname.startswith(exclude):
-                            _append = False
-
-            if _append:
-                sub = {
-                    "tag": event.path,
-                    "path": event.pathname,
-                    "change": event.maskname,
-                }
-                ret.append(sub)
-            else:
+            if _excluded(excludes, event.pathname):
                 log.info("Excluding %s from event for %s", event.pathname, path)
-
-    # Get paths currently being watched
-    current = set()
-    for wd in wm.watches:
-        current.add(wm.watches[wd].path)
-
-    # Update existing watches and add new ones
-    # TODO: make the config handle more options
-    for path in config.get("files", ()):
-
-        if isinstance(config["files"][path], dict):
-            mask = config["files"][path].get("mask", DEFAULT_MASK)
-            if isinstance(mask, list):
-                r_mask = 0
-                for sub in mask:
-                    r_mask |= _get_mask(sub)
-            elif isinstance(mask, bytes):
-                r_mask = _get_mask(mask)
             else:
-                r_mask = mask
-            mask = r_mask
-            rec = config["files"][path].get("recurse", False)
-            auto_add = config["files"][path].get("auto_add", False)
-        else:
-            mask = DEFAULT_MASK
-            rec = False
-            auto_add = False
-
-        if path in current:
-            for wd in wm.watches:
-                if path == wm.watches[wd].path:
-                    update = False
-                    if wm.watches[wd].mask != mask:
-                        update = True
-                    if wm.watches[wd].auto_add != auto_add:
-                        update = True
-                    if update:
-                        wm.update_watch(wd, mask=mask, rec=rec, auto_add=auto_add)
-        elif os.path.exists(path):
-            excludes = config["files"][path].get("exclude", "")
-            excl = None
-            if isinstance(excludes, list):
-                excl = []
-                for exclude in excludes:
-                    if isinstance(exclude, dict):
-                        excl.append(list(exclude)[0])
-                    else:
-                        excl.append(exclude)
-                excl = pyinotify.ExcludeFilter(excl)
-
-            wm.add_watch(path, mask, rec=rec, auto_add=auto_add, exclude_filter=excl)
+                ret.append(
+                    {
+                        "tag": event.path,
+                        "path": event.pathname,
+                        "change": event.maskname,
+                        "mask": event.mask,
+                    }
+                )
+
+    window = config.get("coalesce_window", 0)
+    if window:
+        ret = _coalesce(ret, window, config.get("coalesce_max_paths", 1000))
+    else:
+        for sub in ret:
+            del sub["mask"]
+
+    _update_watches(wm, config.get("files", {}))
+
+    if config.get("batch", False) and ret:
+        return [{"changes": ret}]
 
     # Return event data
     return ret
@@ -349,3 +506,5 @@ def close(config):
     if "inotify.notifier" in __context__:
         __context__["inotify.notifier"].stop()
         del __context__["inotify.notifier"]
+    for key in ("inotify.watched", "inotify.pending", "inotify.pending_counts"):
+        __context__.pop(key, None)
@@ -11,6 +11,8 @@ log = logging.getLogger(__name__)
 
 __virtualname__ = "load"
 
+COALESCE_EVENTS = True
+
 LAST_STATUS = {}
 
 
@@ -122,7 +124,7 @@ def beacon(config):
         config["onchangeonly"] = False
 
     ret = []
-    avgs = os.getloadavg()
+    avgs = salt.utils.beacons.sample("os.getloadavg", os.getloadavg)
     avg_keys = ["1m", "5m", "15m"]
     avg_dict = dict(zip(avg_keys, avgs))
 
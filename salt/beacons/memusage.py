@@ -21,6 +21,8 @@ log = logging.getLogger(__name__)
 
 __virtualname__ = "memusage"
 
+COALESCE_EVENTS = True
+
 
 def __virtual__():
     if HAS_PSUTIL is False:
@@ -61,7 +63,9 @@ def beacon(config):
 
     config = salt.utils.beacons.list_to_dict(config)
 
-    _current_usage = psutil.virtual_memory()
+    _current_usage = salt.utils.beacons.sample(
+        "psutil.virtual_memory", psutil.virtual_memory
+    )
 
     current_usage = _current_usage.percent
     monitor_usage = config["percent"]
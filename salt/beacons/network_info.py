@@ -19,6 +19,8 @@ log = logging.getLogger(__name__)
 
 __virtualname__ = "network_info"
 
+COALESCE_EVENTS = True
+
 __attrs = [
     "bytes_sent",
     "bytes_recv",
@@ -143,7 +145,9 @@ def beacon(config):
 
     log.debug("psutil.net_io_counters %s", psutil.net_io_counters)
 
-    _stats = psutil.net_io_counters(pernic=True)
+    _stats = salt.utils.beacons.sample(
+        "psutil.net_io_counters", psutil.net_io_counters, pernic=True
+    )
 
     log.debug("_stats %s", _stats)
     for interface in config.get("interfaces", {}):
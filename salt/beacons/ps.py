@@ -17,6 +17,8 @@ log = logging.getLogger(__name__)  # pylint: disable=invalid-name
 
 __virtualname__ = "ps"
 
+COALESCE_EVENTS = True
+
 
 def __virtual__():
     if not HAS_PSUTIL:
@@ -43,6 +45,20 @@ def validate(config):
     return True, "Valid beacon configuration"
 
 
+def _process_names():
+    """
+    Return the names of the running processes
+    """
+    procs = set()
+    for proc in psutil.process_iter():
+        try:
+            procs.add(proc.name())
+        except psutil.NoSuchProcess:
+            # The process is now gone
+            continue
+    return procs
+
+
 def beacon(config):
     """
     Scan for processes and fire events
@@ -61,15 +77,7 @@ def beacon(config):
     processes are running or stopped.
     """
     ret = []
-    procs = []
-    for proc in psutil.process_iter():
-        try:
-            _name = proc.name()
-        except psutil.NoSuchProcess:
-            # The process is now gone
-            continue
-        if _name not in procs:
-            procs.append(_name)
+    procs = salt.utils.beacons.sample("ps.process_names", _process_names)
 
     config = salt.utils.beacons.list_to_dict(config)
 
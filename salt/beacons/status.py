@@ -91,12 +91,15 @@ import datetime
 import logging
 
 import salt.exceptions
+import salt.utils.beacons
 import salt.utils.platform
 
 log = logging.getLogger(__name__)
 
 __virtualname__ = "status"
 
+COALESCE_EVENTS = True
+
 
 def validate(config):
     """
@@ -138,7 +141,9 @@ def beacon(config):
         for func in entry:
             ret[func] = {}
             try:
-                data = __salt__["status.{}".format(func)]()
+                data = salt.utils.beacons.sample(
+                    "status.{}".format(func), __salt__["status.{}".format(func)]
+                )
             except salt.exceptions.CommandExecutionError as exc:
                 log.debug(
                     "Status beacon attempted to process function %s "
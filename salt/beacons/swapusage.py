@@ -21,6 +21,8 @@ log = logging.getLogger(__name__)
 
 __virtualname__ = "swapusage"
 
+COALESCE_EVENTS = True
+
 
 def __virtual__():
     if HAS_PSUTIL is False:
@@ -61,7 +63,7 @@ def beacon(config):
 
     config = salt.utils.beacons.list_to_dict(config)
 
-    _current_usage = psutil.swap_memory()
+    _current_usage = salt.utils.beacons.sample("psutil.swap_memory", psutil.swap_memory)
 
     current_usage = _current_usage.percent
     monitor_usage = config["percent"]
@@ -583,6 +583,11 @@ class SSH:
         )
         ret = {"id": single.id}
         stdout, stderr, retcode = single.run()
+        if (
+            isinstance(single.shell, salt.client.ssh.shell.Shell)
+            and opts.get("ssh_control_persist", 60) <= 0
+        ):
+            single.shell.close_master()
         # This job is done, yield
         try:
             data = salt.utils.json.find_json(stdout)
@@ -780,6 +785,9 @@ class SSH:
                 self.targets
             ) >= len(running):
                 time.sleep(0.1)
+        if self.opts.get("ssh_multiplex", False):
+            # Keep at most ssh_control_max master connections for the next runs
+            salt.client.ssh.shell.prune_control_sockets(self.opts)
 
     def run_iter(self, mine=False, jid=None):
         """
@@ -2,10 +2,12 @@
 Manage transport commands via ssh
 """
 
+import hashlib
 import logging
 import os
 import re
 import shlex
+import stat
 import subprocess
 import sys
 import time
@@ -25,6 +27,9 @@ SSH_PRIVATE_KEY_PASSWORD_PROMPT_RE = re.compile(r"Enter passphrase for key", re.
 RSTR = "_edbc7885e4f9aac9b83b35999b68d015148caf467b78fa39c05f669c0ff89878"
 RSTR_RE = re.compile(r"(?:^|\r?\n)" + RSTR + r"(?:\r?\n|$)")
 
+# Longer paths do not fit in the address of a Unix socket on every platform
+CONTROL_PATH_MAX = 100
+
 
 def gen_key(path):
     """
@@ -37,6 +42,66 @@ def gen_key(path):
     subprocess.call(cmd)
 
 
+def control_dir(opts):
+    """
+    Return the directory of the control sockets of the multiplexed ssh
+    connections
+    """
+    return opts.get("ssh_control_dir") or os.path.join(opts["cachedir"], "ssh_control")
+
+
+def close_control_socket(path, command="stop"):
+    """
+    Ask the ssh master connection listening on ``path`` to ``stop``, it then
+    exits once its sessions are done, or to ``exit`` at once
+    """
+    try:
+        proc = subprocess.run(
+            ["ssh", "-S", path, "-O", command, "salt-ssh"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            timeout=10,
+            check=False,
+        )
+    except (OSError, subprocess.TimeoutExpired) as exc:
+        log.debug("Failed to close the ssh master connection of %s: %s", path, exc)
+        return
+    if proc.returncode != 0:
+        # The master connection is gone, the socket is stale
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def prune_control_sockets(opts, keep=None):
+    """
+    Close the least recently used ssh master connections in excess of
+    :conf_master:`ssh_control_max`, or of ``keep``
+    """
+    if keep is None:
+        keep = opts.get("ssh_control_max", 256)
+    sockets = []
+    try:
+        names = os.listdir(control_dir(opts))
+    except OSError:
+        return
+    for name in names:
+        path = os.path.join(control_dir(opts), name)
+        try:
+            st = os.lstat(path)
+        except OSError:
+            continue
+        if stat.S_ISSOCK(st.st_mode):
+            sockets.append((st.st_mtime, path))
+    if len(sockets) <= keep:
+        return
+    sockets.sort()
+    for _, path in sockets[: len(sockets) - max(keep, 0)]:
+        log.debug("Closing the least recently used ssh master connection %s", path)
+        close_control_socket(path)
+
+
 def gen_shell(opts, **kwargs):
     """
     Return the correct shell interface for the target system
@@ -93,6 +158,74 @@ class Shell:
         self.identities_only = identities_only
         self.remote_port_forwards = remote_port_forwards
         self.ssh_options = "" if ssh_options is None else ssh_options
+        self.control_path = self._control_path()
+
+    def _control_path(self):
+        """
+        Return the path of the control socket of the ssh master connection to
+        the host, or ``None`` if the connections are not multiplexed
+        """
+        if not self.opts.get("ssh_multiplex", False):
+            return None
+        if self.opts.get("_ssh_version", (0,)) < (5, 6):
+            log.debug("ssh does not support ControlPersist, not multiplexing")
+            return None
+        # Do not rely on the %C token of ssh, it needs OpenSSH 6.7
+        name = hashlib.sha1(
+            "{}@{}:{}".format(self.user, self.host, self.port).encode()
+        ).hexdigest()
+        path = os.path.join(control_dir(self.opts), name)
+        if len(path) > CONTROL_PATH_MAX:
+            log.warning(
+                "The ssh control socket path %s is too long, not multiplexing the"
+                " ssh connections, set ssh_control_dir to a shorter path",
+                path,
+            )
+            return None
+        return path
+
+    def _control_opts(self):
+        """
+        Return the options multiplexing the ssh connections to the host
+        """
+        if self.control_path is None:
+            return ""
+        if not os.path.exists(self.control_path):
+            # A new master connection is made, its socket must only be
+            # reachable by the user running salt-ssh. The connections over
+            # ssh_control_max are closed at the end of the run.
+            dirname = control_dir(self.opts)
+            try:
+                os.makedirs(dirname, mode=0o700, exist_ok=True)
+                if stat.S_IMODE(os.stat(dirname).st_mode) != 0o700:
+                    os.chmod(dirname, 0o700)
+            except OSError as exc:
+                log.warning("Failed to create the ssh control directory: %s", exc)
+                return ""
+        else:
+            # Record when the master connection was last used
+            try:
+                os.utime(self.control_path)
+            except OSError:
+                pass
+        persist = self.opts.get("ssh_control_persist", 60)
+        if persist <= 0:
+            # The master connection is closed when done with the host, the
+            # timeout covers a salt-ssh run which did not get there
+            persist = self.timeout or 60
+        options = [
+            "ControlMaster=auto",
+            "ControlPath={}".format(self.control_path.replace("%", "%%")),
+            "ControlPersist={}s".format(int(persist)),
+        ]
+        return "".join("-o {} ".format(option) for option in options)
+
+    def close_master(self):
+        """
+        Close the ssh master connection to the host, if any
+        """
+        if self.control_path is not None and os.path.exists(self.control_path):
+            close_control_socket(self.control_path, command="exit")
 
     def get_error(self, errstr):
         """
@@ -147,9 +280,9 @@ class Shell:
         """
         Return options to pass to ssh
         """
-        # TODO ControlMaster does not work without ControlPath
-        # user could take advantage of it if they set ControlPath in their
-        # ssh config.  Also, ControlPersist not widely available.
+        # ControlMaster does not work without ControlPath, users can take
+        # advantage of it if they set ControlPath in their ssh config, or
+        # enable ssh_multiplex
         options = [
             "ControlMaster=auto",
             "StrictHostKeyChecking=no",
@@ -248,6 +381,8 @@ class Shell:
             command.append(self.host)
         if self.tty and ssh == "ssh":
             command.append("-t -t")
+        if self.control_path is not None:
+            command.append(self._control_opts())
         if self.passwd or self.priv:
             command.append(self.priv and self._key_opts() or self._passwd_opts())
         if ssh != "scp" and self.remote_port_forwards:
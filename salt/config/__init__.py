@@ -223,9 +223,19 @@ VALID_OPTS = immutabletypes.freeze(
         "pillarenv": (type(None), str),
         # Make the pillarenv always match the effective saltenv
         "pillarenv_from_saltenv": bool,
+        # Only fetch the changes to the pillar data when refreshing the pillar
+        "pillar_delta": bool,
         # Allows a user to provide an alternate name for top.sls
         "state_top": str,
         "state_top_saltenv": (type(None), str),
+        # Number of processes used to run independent states concurrently
+        "state_parallel_workers": int,
+        # Index the targets of top files to speed up matching large top files
+        "top_file_index": bool,
+        # Cache the compiled highstate and reuse it while its inputs are unchanged
+        "state_compile_cache": bool,
+        # Record the time spent rendering and compiling highstates
+        "state_render_profile": bool,
         # States to run when a minion starts up
         "startup_states": str,
         # List of startup states
@@ -241,6 +251,11 @@ VALID_OPTS = immutabletypes.freeze(
         # When using a local file_client, this parameter is used to allow the client to connect to
         # a master for remote execution.
         "use_master_when_local": bool,
+        # Store files cached from the master once per content hash and hard link
+        # them into the per-saltenv cache
+        "file_client_blob_cache": bool,
+        # Size cap of the content-addressed file cache, in megabytes. 0 disables eviction
+        "file_client_blob_cache_max_size": int,
         # A map of saltenvs and fileserver backend locations
         "file_roots": dict,
         # A map of saltenvs and fileserver backend locations
@@ -290,6 +305,10 @@ VALID_OPTS = immutabletypes.freeze(
         "multiprocessing": bool,
         # Maximum number of concurrently active processes at any given point in time
         "process_count_max": int,
+        # Number of pre-forked processes running the jobs of the minion
+        "minion_job_pool_size": int,
+        # Number of jobs run by a pre-forked job process before it is replaced
+        "minion_job_pool_max_jobs": int,
         # Whether or not the salt minion should run scheduled mine updates
         "mine_enabled": bool,
         # Whether or not scheduled mine updates should be accompanied by a job return for the job cache
@@ -355,6 +374,10 @@ VALID_OPTS = immutabletypes.freeze(
         "enable_gpu_grains": bool,
         # Tell the loader to attempt to import *.zip archives
         "enable_zip_modules": bool,
+        # Cache the mapping of module names to files built by the loader
+        "loader_file_mapping_cache": bool,
+        # Cache the outcome of the __virtual__ functions of the loaded modules
+        "loader_virtual_cache": bool,
         # Tell the client to show minions that have timed out
         "show_timeout": bool,
         # Tell the client to display the jid when a job is published
@@ -523,6 +546,15 @@ VALID_OPTS = immutabletypes.freeze(
         "azurefs_update_interval": int,
         "gitfs_update_interval": int,
         "git_pillar_update_interval": int,
+        # Number of gitfs/git_pillar remotes to fetch concurrently
+        "gitfs_fetch_workers": int,
+        "git_pillar_fetch_workers": int,
+        # Seconds after which a gitfs/git_pillar remote's fetch is abandoned
+        "gitfs_fetch_timeout": int,
+        "git_pillar_fetch_timeout": int,
+        # Skip fetching gitfs/git_pillar remotes whose refs have not changed
+        "gitfs_fetch_check_refs": bool,
+        "git_pillar_fetch_check_refs": bool,
         "hgfs_update_interval": int,
         "minionfs_update_interval": int,
         "s3fs_update_interval": int,
@@ -560,6 +592,7 @@ VALID_OPTS = immutabletypes.freeze(
         "gitfs_ref_types": list,
         "gitfs_refspecs": list,
         "gitfs_disable_saltenv_mapping": bool,
+        "gitfs_tree_index": bool,
         "hgfs_remotes": list,
         "hgfs_mountpoint": str,
         "hgfs_root": str,
@@ -581,6 +614,12 @@ VALID_OPTS = immutabletypes.freeze(
         "minionfs_blacklist": list,
         # Specify a list of external pillar systems to use
         "ext_pillar": list,
+        # Number of external pillars to run concurrently
+        "ext_pillar_workers": int,
+        # Time in seconds after which an external pillar is abandoned, 0 disables it
+        "ext_pillar_timeout": int,
+        # External pillars which use the pillar data merged before them
+        "ext_pillar_sequential": list,
         # Reserved for future use to version the pillar structure
         "pillar_version": int,
         # Whether or not a copy of the master opts dict should be rendered into minion pillars
@@ -591,6 +630,14 @@ VALID_OPTS = immutabletypes.freeze(
         "pillar_cache_ttl": int,
         # Pillar cache backend. Defaults to `disk` which stores caches in the master cache
         "pillar_cache_backend": str,
+        # Maximum number of minions whose pillar is cached, 0 means no limit
+        "pillar_cache_size": int,
+        # Cache rendered pillar SLS files by their contents and the grains they reference
+        "pillar_render_cache": bool,
+        # Maximum number of rendered pillar SLS files kept in memory by each worker
+        "pillar_render_cache_size": int,
+        # List of pillar SLS globs which are declared not to depend on the minion
+        "pillar_render_cache_static": list,
         # Cache the GPG data to avoid having to pass through the gpg renderer
         "gpg_cache": bool,
         # GPG data cache TTL, in seconds. Has no effect unless `gpg_cache` is True
@@ -743,6 +790,20 @@ VALID_OPTS = immutabletypes.freeze(
         "grains_blacklist": list,
         # The number of minutes between the minion refreshing its cache of grains
         "grains_refresh_every": int,
+        # Run the grains functions in parallel
+        "grains_parallel": bool,
+        # The number of threads running the grains functions in parallel
+        "grains_parallel_workers": int,
+        # The number of seconds a grains function run in parallel may take
+        "grains_function_timeout": int,
+        # How long the results of the grains functions are cached
+        "grains_cache_policies": dict,
+        # Send the changes of the grains to the master instead of all grains
+        "grains_delta": bool,
+        # Send the mine data of the functions which changed instead of all mine data
+        "mine_delta": bool,
+        # Index the mine data in the memory of the master processes
+        "mine_index": bool,
         # Use lspci to gather system data for grains on a minion
         "enable_lspci": bool,
         # The number of seconds for the salt client to wait for additional syndics to
@@ -757,6 +818,8 @@ VALID_OPTS = immutabletypes.freeze(
         "jinja_lstrip_blocks": bool,
         # If this is set to True the first newline after a Jinja block is removed
         "jinja_trim_blocks": bool,
+        # Store the code compiled from Jinja templates in the cachedir
+        "jinja_bytecode_cache": bool,
         # Cache minion ID to file
         "minion_id_caching": bool,
         # Always generate minion id in lowercase.
@@ -805,6 +868,14 @@ VALID_OPTS = immutabletypes.freeze(
         "ssh_identities_only": bool,
         "ssh_log_file": str,
         "ssh_config_file": str,
+        # Multiplex the ssh connections to a host over a master connection
+        "ssh_multiplex": bool,
+        # The directory of the control sockets of the ssh master connections
+        "ssh_control_dir": str,
+        # The number of seconds an idle ssh master connection is kept open
+        "ssh_control_persist": int,
+        # The maximum number of ssh master connections kept open
+        "ssh_control_max": int,
         "ssh_merge_pillar": bool,
         "ssh_run_pre_flight": bool,
         "cluster_mode": bool,
@@ -1005,6 +1076,12 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze(
         "grains_cache": False,
         "grains_cache_expiration": 300,
         "grains_deep_merge": False,
+        "grains_parallel": False,
+        "grains_parallel_workers": 8,
+        "grains_function_timeout": 30,
+        "grains_cache_policies": {},
+        "grains_delta": False,
+        "mine_delta": False,
         "conf_file": os.path.join(salt.syspaths.CONFIG_DIR, "minion"),
         "sock_dir": os.path.join(salt.syspaths.SOCK_DIR, "minion"),
         "sock_pool_size": 1,
@@ -1019,6 +1096,7 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze(
         "lock_saltenv": False,
         "pillarenv": None,
         "pillarenv_from_saltenv": False,
+        "pillar_delta": False,
         "pillar_opts": False,
         "pillar_source_merging_strategy": "smart",
         "pillar_merge_lists": False,
@@ -1029,11 +1107,17 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze(
         "pillar_cache": False,
         "pillar_cache_ttl": 3600,
         "pillar_cache_backend": "disk",
+        "pillar_cache_size": 0,
         "gpg_cache": False,
         "gpg_cache_ttl": 86400,
         "gpg_cache_backend": "disk",
         "extension_modules": os.path.join(salt.syspaths.CACHE_DIR, "minion", "extmods"),
         "state_top": "top.sls",
+        "top_file_index": False,
+        "state_compile_cache": False,
+        "state_render_profile": False,
+        "jinja_bytecode_cache": False,
+        "state_parallel_workers": 0,
         "state_top_saltenv": None,
         "startup_states": "",
         "sls_list": [],
@@ -1046,6 +1130,8 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze(
         "file_client": "remote",
         "local": False,
         "use_master_when_local": False,
+        "file_client_blob_cache": False,
+        "file_client_blob_cache_max_size": 1024,
         "file_roots": {
             "base": [salt.syspaths.BASE_FILE_ROOTS_DIR, salt.syspaths.SPM_FORMULA_PATH]
         },
@@ -1073,6 +1159,12 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze(
         "azurefs_update_interval": DEFAULT_INTERVAL,
         "gitfs_update_interval": DEFAULT_INTERVAL,
         "git_pillar_update_interval": DEFAULT_INTERVAL,
+        "gitfs_fetch_workers": 1,
+        "git_pillar_fetch_workers": 1,
+        "gitfs_fetch_timeout": 0,
+        "git_pillar_fetch_timeout": 0,
+        "gitfs_fetch_check_refs": False,
+        "git_pillar_fetch_check_refs": False,
         "hgfs_update_interval": DEFAULT_INTERVAL,
         "minionfs_update_interval": DEFAULT_INTERVAL,
         "s3fs_update_interval": DEFAULT_INTERVAL,
@@ -1111,6 +1203,7 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze(
         "gitfs_ref_types": ["branch", "tag", "sha"],
         "gitfs_refspecs": _DFLT_REFSPECS,
         "gitfs_disable_saltenv_mapping": False,
+        "gitfs_tree_index": False,
         "unique_jid": False,
         "hash_type": "sha256",
         "optimization_order": [0, 1, 2],
@@ -1133,6 +1226,8 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze(
         "autosign_timeout": 120,
         "multiprocessing": True,
         "process_count_max": -1,
+        "minion_job_pool_size": 0,
+        "minion_job_pool_max_jobs": 100,
         "mine_enabled": True,
         "mine_return_job": False,
         "mine_interval": 60,
@@ -1163,6 +1258,8 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze(
         "enable_fqdns_grains": _DFLT_FQDNS_GRAINS,
         "enable_gpu_grains": True,
         "enable_zip_modules": False,
+        "loader_file_mapping_cache": False,
+        "loader_virtual_cache": False,
         "state_verbose": True,
         "state_output": "full",
         "state_output_diff": False,
@@ -1323,6 +1420,12 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "azurefs_update_interval": DEFAULT_INTERVAL,
         "gitfs_update_interval": DEFAULT_INTERVAL,
         "git_pillar_update_interval": DEFAULT_INTERVAL,
+        "gitfs_fetch_workers": 1,
+        "git_pillar_fetch_workers": 1,
+        "gitfs_fetch_timeout": 0,
+        "git_pillar_fetch_timeout": 0,
+        "gitfs_fetch_check_refs": False,
+        "git_pillar_fetch_check_refs": False,
         "hgfs_update_interval": DEFAULT_INTERVAL,
         "minionfs_update_interval": DEFAULT_INTERVAL,
         "s3fs_update_interval": DEFAULT_INTERVAL,
@@ -1362,6 +1465,7 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "gitfs_ref_types": ["branch", "tag", "sha"],
         "gitfs_refspecs": _DFLT_REFSPECS,
         "gitfs_disable_saltenv_mapping": False,
+        "gitfs_tree_index": False,
         "hgfs_remotes": [],
         "hgfs_mountpoint": "",
         "hgfs_root": "",
@@ -1388,6 +1492,9 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "minionfs_whitelist": [],
         "minionfs_blacklist": [],
         "ext_pillar": [],
+        "ext_pillar_workers": 1,
+        "ext_pillar_timeout": 0,
+        "ext_pillar_sequential": ["gpg", "nacl", "stack", "makostack", "pepa"],
         "pillar_version": 2,
         "pillar_opts": False,
         "pillar_safe_render_error": True,
@@ -1397,6 +1504,10 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "pillar_cache": False,
         "pillar_cache_ttl": 3600,
         "pillar_cache_backend": "disk",
+        "pillar_cache_size": 0,
+        "pillar_render_cache": False,
+        "pillar_render_cache_size": 1000,
+        "pillar_render_cache_static": [],
         "gpg_cache": False,
         "gpg_cache_ttl": 86400,
         "gpg_cache_backend": "disk",
@@ -1445,6 +1556,7 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "renderer_blacklist": [],
         "failhard": False,
         "state_top": "top.sls",
+        "top_file_index": False,
         "state_top_saltenv": None,
         "master_tops": {},
         "master_tops_first": False,
@@ -1455,6 +1567,7 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "job_cache_store_endtime": False,
         "minion_data_cache": True,
         "enforce_mine_cache": False,
+        "mine_index": False,
         "ipc_mode": _DFLT_IPC_MODE,
         "ipc_write_buffer": _DFLT_IPC_WBUFFER,
         # various subprocess niceness levels
@@ -1513,6 +1626,8 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "ssh_use_home_key": False,
         "cython_enable": False,
         "enable_gpu_grains": False,
+        "loader_file_mapping_cache": False,
+        "loader_virtual_cache": False,
         # XXX: Remove 'key_logfile' support in 2014.1.0
         "key_logfile": os.path.join(salt.syspaths.LOGS_DIR, "key"),
         "verify_env": True,
@@ -1542,6 +1657,7 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "jinja_sls_env": {},
         "jinja_lstrip_blocks": False,
         "jinja_trim_blocks": False,
+        "jinja_bytecode_cache": False,
         "tcp_keepalive": True,
         "tcp_keepalive_idle": 300,
         "tcp_keepalive_cnt": -1,
@@ -1565,6 +1681,10 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "ssh_identities_only": False,
         "ssh_log_file": os.path.join(salt.syspaths.LOGS_DIR, "ssh"),
         "ssh_config_file": os.path.join(salt.syspaths.HOME_DIR, ".ssh", "config"),
+        "ssh_multiplex": False,
+        "ssh_control_dir": "",
+        "ssh_control_persist": 60,
+        "ssh_control_max": 256,
         "cluster_mode": False,
         "sqlite_queue_dir": os.path.join(salt.syspaths.CACHE_DIR, "master", "queues"),
         "queue_dirs": [],
@@ -414,6 +414,9 @@ class RemoteFuncs:
         self.mminion = salt.minion.MasterMinion(self.opts, states=False, rend=False)
         self.__setup_fileserver()
         self.cache = salt.cache.factory(opts)
+        self.mine_index = None
+        if self.opts.get("mine_index", False):
+            self.mine_index = salt.utils.mine.MineIndex(self.cache)
 
     def __setup_fileserver(self):
         """
@@ -587,9 +590,17 @@ class RemoteFuncs:
         checker = salt.utils.minions.CkMinions(self.opts)
         _res = checker.check_minions(load["tgt"], match_type, greedy=False)
         minions = _res["minions"]
+        indexed = None
+        if self.mine_index is not None:
+            indexed = self.mine_index.get(
+                (load["tgt"], match_type), minions, functions_allowed
+            )
         minion_side_acl = {}  # Cache minion-side ACL
         for minion in minions:
-            mine_data = self.cache.fetch("minions/{}".format(minion), "mine")
+            if indexed is not None:
+                mine_data = indexed.get(minion)
+            else:
+                mine_data = self.cache.fetch("minions/{}".format(minion), "mine")
             if not isinstance(mine_data, dict):
                 continue
             for function in functions_allowed:
@@ -633,6 +644,12 @@ class RemoteFuncs:
     def _mine(self, load, skip_verify=False):
         """
         Store/update the mine data in cache.
+
+        When the load holds the hashes of the mine functions, the data of the
+        functions which did not change can be left out of the load. Then the
+        hashes of the functions stored are checked and
+        ``{MINE_DELTA_KEY: False}`` is returned if they do not match, for the
+        minion to send the data of all of the functions.
         """
         if not skip_verify:
             if "id" not in load or "data" not in load:
@@ -643,11 +660,55 @@ class RemoteFuncs:
             cbank = "minions/{}".format(load["id"])
             ckey = "mine"
             new_data = load["data"]
-            if not load.get("clear", False):
-                data = self.cache.fetch(cbank, ckey)
-                if isinstance(data, dict):
-                    data.update(new_data)
-            self.cache.store(cbank, ckey, data)
+            clear = load.get("clear", False)
+            hashes = load.get("mine_hashes")
+            data = self.cache.fetch(cbank, ckey)
+            if not isinstance(data, dict):
+                data = {}
+            stored_hashes = {}
+            if isinstance(hashes, dict):
+                stored_hashes = self.cache.fetch(cbank, "mine_hashes")
+                if not isinstance(stored_hashes, dict):
+                    stored_hashes = {}
+                for function, function_hash in hashes.items():
+                    if function in new_data:
+                        continue
+                    if (
+                        clear
+                        or function not in data
+                        or stored_hashes.get(function) != function_hash
+                    ):
+                        log.debug(
+                            "The mine data of %s for %s is not current, asking"
+                            " for all of its mine data",
+                            function,
+                            load["id"],
+                        )
+                        return {salt.utils.mine.MINE_DELTA_KEY: False}
+            if clear:
+                changed = set(data).symmetric_difference(new_data)
+                changed.update(
+                    function
+                    for function in new_data
+                    if function in data and data[function] != new_data[function]
+                )
+                data = new_data
+            else:
+                changed = {
+                    function
+                    for function in new_data
+                    if function not in data or data[function] != new_data[function]
+                }
+                data.update(new_data)
+            if changed:
+                self.cache.store(cbank, ckey, data)
+                if self.opts.get("mine_index", False):
+                    salt.utils.mine.touch_index(self.cache, changed)
+            if isinstance(hashes, dict):
+                new_hashes = {} if clear else dict(stored_hashes)
+                new_hashes.update(hashes)
+                if new_hashes != stored_hashes:
+                    self.cache.store(cbank, "mine_hashes", new_hashes)
         return True
 
     def _mine_delete(self, load):
@@ -668,6 +729,8 @@ class RemoteFuncs:
                 if load["fun"] in data:
                     del data[load["fun"]]
                     self.cache.store(cbank, ckey, data)
+                    if self.opts.get("mine_index", False):
+                        salt.utils.mine.touch_index(self.cache, [load["fun"]])
             except OSError:
                 return False
         return True
@@ -681,7 +744,13 @@ class RemoteFuncs:
         if self.opts.get("minion_data_cache", False) or self.opts.get(
             "enforce_mine_cache", False
         ):
-            return self.cache.flush("minions/{}".format(load["id"]), "mine")
+            cbank = "minions/{}".format(load["id"])
+            if self.opts.get("mine_index", False):
+                data = self.cache.fetch(cbank, "mine")
+                if isinstance(data, dict):
+                    salt.utils.mine.touch_index(self.cache, data)
+            self.cache.flush(cbank, "mine_hashes")
+            return self.cache.flush(cbank, "mine")
         return True
 
     def _file_recv(self, load):
@@ -19,6 +19,7 @@ import salt.loader
 import salt.payload
 import salt.transport.client
 import salt.utils.atomicfile
+import salt.utils.blobstore
 import salt.utils.data
 import salt.utils.files
 import salt.utils.gzip_util
@@ -84,6 +85,10 @@ class Client:
     def __init__(self, opts):
         self.opts = opts
         self.utils = salt.loader.utils(self.opts)
+        if salt.utils.blobstore.enabled(self.opts):
+            self.blobs = salt.utils.blobstore.BlobStore(self.opts)
+        else:
+            self.blobs = None
 
     # Add __setstate__ and __getstate__ so that the object may be
     # deep copied. It normally can't be deep copied because its
@@ -148,6 +153,14 @@ class Client:
 
             yield dest
 
+    def _blob_unshare(self, path):
+        """
+        Make sure that writing to ``path`` will not modify a blob in the
+        content-addressed file cache
+        """
+        if self.blobs is not None and path.startswith(self.opts["cachedir"]):
+            self.blobs.unshare(path)
+
     def get_cachedir(self, cachedir=None):
         if cachedir is None:
             cachedir = self.opts["cachedir"]
@@ -310,10 +323,19 @@ class Client:
         """
         return {}
 
-    def is_cached(self, path, saltenv="base", cachedir=None):
+    def is_cached(self, path, saltenv="base", cachedir=None, source_hash=None):
         """
         Returns the full path to a file if it is cached locally on the minion
         otherwise returns a blank string
+
+        source_hash
+            .. versionadded:: 3005
+
+            The hash (as returned by ``hash_file``) which the master advertises
+            for ``path``. If the file is not cached in ``saltenv`` but a file
+            with this hash is present in the content-addressed file cache (see
+            :conf_minion:`file_client_blob_cache`), the cached copy is
+            populated from it without contacting the master.
         """
         if path.startswith("salt://"):
             path, senv = salt.utils.url.parse(path)
@@ -331,6 +353,13 @@ class Client:
         )
         extrndest = self._extrn_path(path, saltenv, cachedir=cachedir)
 
+        if (
+            source_hash is not None
+            and self.blobs is not None
+            and not os.path.exists(filesdest)
+        ):
+            self.blobs.materialize(source_hash, filesdest)
+
         if os.path.exists(filesdest):
             return salt.utils.url.escape(filesdest) if escaped else filesdest
         elif os.path.exists(localsfilesdest):
@@ -1182,6 +1211,22 @@ class RemoteClient(Client):
             if hash_local == hash_server:
                 return dest2check
 
+        # The same content may already have been fetched for another path or
+        # saltenv, in which case there is no need to transfer it again. Only
+        # the minion cache is hard linked to the blob, explicit destinations
+        # get a copy so that editing them cannot corrupt the blob.
+        if (
+            self.blobs is not None
+            and (not dest or makedirs or os.path.isdir(os.path.dirname(dest)))
+            and self.blobs.materialize(hash_server, dest2check, link=not dest)
+        ):
+            log.debug(
+                "In saltenv '%s', populated '%s' from the blob cache",
+                saltenv,
+                dest2check,
+            )
+            return dest2check
+
         log.debug(
             "Fetching file from saltenv '%s', ** attempting ** '%s'", saltenv, path
         )
@@ -1205,6 +1250,7 @@ class RemoteClient(Client):
                             raise
                 else:
                     return False
+            self._blob_unshare(dest)
             # We need an open filehandle here, that's why we're not using a
             # with clause:
             # pylint: disable=resource-leakage
@@ -1233,6 +1279,7 @@ class RemoteClient(Client):
                             data["dest"], saltenv, cachedir=cachedir
                         ) as cache_dest:
                             dest = cache_dest
+                            self._blob_unshare(cache_dest)
                             with salt.utils.files.fopen(cache_dest, "wb+") as ofile:
                                 ofile.write(data["data"])
                     if "hsum" in data and d_tries < 3:
@@ -1299,6 +1346,8 @@ class RemoteClient(Client):
         if fn_:
             fn_.close()
             log.info("Fetching file from saltenv '%s', ** done ** '%s'", saltenv, path)
+            if self.blobs is not None and dest.startswith(self.opts["cachedir"]):
+                self.blobs.add(dest, hash_server)
         else:
             log.debug(
                 "In saltenv '%s', we are ** missing ** the file '%s'", saltenv, path
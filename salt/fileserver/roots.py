@@ -20,6 +20,7 @@ import logging
 import os
 
 import salt.fileserver
+import salt.utils.cache
 import salt.utils.event
 import salt.utils.files
 import salt.utils.gzip_util
@@ -184,6 +185,19 @@ def update():
     data["files"]["removed"] = list(old_files - new_files)
     data["files"]["added"] = list(new_files - old_files)
 
+    if data["changed"]:
+        # Mark the cached data rendered from the saltenvs serving the modified
+        # files as stale
+        paths = (
+            data["files"]["changed"] + data["files"]["added"] + data["files"]["removed"]
+        )
+        for saltenv, roots in __opts__["file_roots"].items():
+            prefixes = tuple(os.path.join(root, "") for root in roots)
+            if any(path.startswith(prefixes) for path in paths):
+                salt.utils.cache.bump_generation(
+                    __opts__, salt.utils.cache.fileserver_generation(saltenv)
+                )
+
     # write out the new map
     mtime_map_path_dir = os.path.dirname(mtime_map_path)
     if not os.path.exists(mtime_map_path_dir):
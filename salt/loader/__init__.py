@@ -5,8 +5,11 @@ plugin interfaces used by Salt.
 """
 
 import contextlib
+import copy
+import fnmatch
 import logging
 import os
+import queue
 import re
 import threading
 import time
@@ -16,8 +19,10 @@ import salt.config
 import salt.defaults.events
 import salt.defaults.exitcodes
 import salt.loader.context
+import salt.payload
 import salt.syspaths
 import salt.utils.args
+import salt.utils.atomicfile
 import salt.utils.context
 import salt.utils.data
 import salt.utils.dictupdate
@@ -28,6 +33,7 @@ import salt.utils.odict
 import salt.utils.platform
 import salt.utils.stringutils
 import salt.utils.versions
+import salt.version
 from salt.exceptions import LoaderError
 from salt.template import check_render_pipe_str
 from salt.utils import entrypoints
@@ -864,6 +870,227 @@ def _load_cached_grains(opts, cfn):
         return None
 
 
+def _grains_funcs_cache_path(opts):
+    return os.path.join(opts["cachedir"], "grains.functions.p")
+
+
+def clear_grains_funcs_cache(opts):
+    """
+    Remove the results of the grains functions cached according to the
+    ``grains_cache_policies`` option
+    """
+    if opts.get("cachedir"):
+        try:
+            os.remove(_grains_funcs_cache_path(opts))
+        except FileNotFoundError:
+            pass
+        except OSError as exc:
+            log.warning("Unable to remove the grains functions cache: %s", exc)
+
+
+def _grain_cache_policy(policies, key):
+    """
+    Return the cache policy of the grains function ``key``: ``"static"``, a
+    number of seconds, or ``None`` if its result is not cached
+    """
+    if key in policies:
+        policy = policies[key]
+    else:
+        for pattern, policy in policies.items():
+            if fnmatch.fnmatch(key, pattern):
+                break
+        else:
+            return None
+    if policy == "static":
+        return policy
+    if isinstance(policy, int) and not isinstance(policy, bool) and policy > 0:
+        return policy
+    log.warning("Ignoring the invalid grains cache policy %r of %s", policy, key)
+    return None
+
+
+def _load_grains_funcs_cache(path):
+    try:
+        with salt.utils.files.fopen(path, "rb") as fp_:
+            data = salt.payload.load(fp_)
+        if data.get("version") != salt.version.__version__:
+            return {}
+        return salt.utils.data.decode(data["functions"], preserve_tuples=True)
+    except FileNotFoundError:
+        return {}
+    except Exception as exc:  # pylint: disable=broad-except
+        log.debug("Unable to load the grains functions cache %s: %s", path, exc)
+        return {}
+
+
+def _save_grains_funcs_cache(path, functions):
+    data = {"version": salt.version.__version__, "functions": functions}
+    try:
+        with salt.utils.files.set_umask(0o077):
+            with salt.utils.atomicfile.atomic_open(path, "wb") as fp_:
+                salt.payload.dump(data, fp_)
+    except Exception as exc:  # pylint: disable=broad-except
+        log.debug("Unable to write the grains functions cache %s: %s", path, exc)
+
+
+# How the grains were last loaded by grains() in this process
+_grains_profile = {}
+
+
+def grains_profile():
+    """
+    Return how long each grains function took to run, in seconds, the last
+    time the grains were loaded in this process, and which grains functions
+    were not run because their result was cached
+
+    .. versionadded:: 3005
+    """
+    return {
+        "parallel": _grains_profile.get("parallel", False),
+        "duration": _grains_profile.get("duration", 0),
+        "functions": dict(_grains_profile.get("functions", {})),
+        "timeouts": list(_grains_profile.get("timeouts", [])),
+        "cached": list(_grains_profile.get("cached", [])),
+    }
+
+
+def _grain_func_parameters(key, funcs):
+    """
+    Return the names of the parameters of the grains function ``key``
+    """
+    if key.startswith("core."):
+        return []
+    return salt.utils.args.get_function_argspec(funcs[key]).args
+
+
+def _grain_func_kwargs(parameters, proxy, grains_data):
+    # Grains are loaded too early to take advantage of the injected
+    # __proxy__ variable.  Pass an instance of that LazyLoader
+    # here instead to grains functions if the grains functions take
+    # one parameter.  Then the grains can have access to the
+    # proxymodule for retrieving information from the connected
+    # device.
+    kwargs = {}
+    if "proxy" in parameters:
+        kwargs["proxy"] = proxy
+    if "grains" in parameters:
+        kwargs["grains"] = grains_data
+    return kwargs
+
+
+def _merge_grains(grains_data, ret, blist, deep_merge):
+    """
+    Merge the grains ``ret`` returned by a grains function in ``grains_data``
+    """
+    if not isinstance(ret, dict):
+        return
+    if blist:
+        for key in list(ret):
+            for block in blist:
+                if salt.utils.stringutils.expr_match(key, block):
+                    del ret[key]
+                    log.trace("Filtering %s grain", key)
+        if not ret:
+            return
+    if deep_merge:
+        salt.utils.dictupdate.update(grains_data, ret)
+    else:
+        grains_data.update(ret)
+
+
+class _GrainsTask:
+    """
+    A call to a grains function
+    """
+
+    def __init__(self, func, kwargs):
+        self.func = func
+        self.kwargs = kwargs
+        self.started = threading.Event()
+        self.done = threading.Event()
+        self.start = None
+        self.duration = None
+        self.ret = None
+        self.exc = None
+
+    def run(self):
+        self.start = time.time()
+        self.started.set()
+        try:
+            self.ret = self.func(**self.kwargs)
+        except Exception as exc:  # pylint: disable=broad-except
+            self.exc = exc
+        finally:
+            self.duration = time.time() - self.start
+            self.done.set()
+
+
+class _GrainsRunner:
+    """
+    Run grains functions in daemon threads. A function still running after
+    ``timeout`` seconds is abandoned, and the thread running it replaced, so
+    that a hung function does not hold the other ones or the minion.
+    """
+
+    def __init__(self, workers, timeout):
+        self.timeout = timeout
+        self.queue = queue.Queue()
+        self.threads = 0
+        for _ in range(max(1, workers)):
+            self._add_worker()
+
+    @staticmethod
+    def _start_thread(target):
+        thread = threading.Thread(target=target, name="GrainsRunner", daemon=True)
+        thread.start()
+
+    def _add_worker(self):
+        self._start_thread(self._work)
+        self.threads += 1
+
+    def _work(self):
+        while True:
+            task = self.queue.get()
+            if task is None:
+                return
+            task.run()
+
+    def submit(self, func, kwargs):
+        """
+        Queue a call to ``func``, the calls are started in order
+        """
+        task = _GrainsTask(func, kwargs)
+        self.queue.put(task)
+        return task
+
+    def start(self, task):
+        """
+        Start ``task`` right away in its own thread
+        """
+        self._start_thread(task.run)
+
+    def wait(self, task):
+        """
+        Wait for ``task`` and return ``False`` if it did not finish within the
+        timeout
+        """
+        # The tasks are waited for in the order they were queued, a task not
+        # started yet waits for a thread running a task which is waited for
+        # with a timeout, or replaced, first.
+        task.started.wait()
+        if task.done.wait(max(0, task.start + self.timeout - time.time())):
+            return True
+        self._add_worker()
+        return False
+
+    def stop(self):
+        """
+        Stop the threads once they are done with their task
+        """
+        for _ in range(self.threads):
+            self.queue.put(None)
+
+
 def grains(opts, force_refresh=False, proxy=None, context=None):
     """
     Return the functions for the dynamic grains and the values for the static
@@ -929,73 +1156,131 @@ def grains(opts, force_refresh=False, proxy=None, context=None):
     funcs = grain_funcs(opts, proxy=proxy, context=context or {})
     if force_refresh:  # if we refresh, lets reload grain modules
         funcs.clear()
-    # Run core grains
-    for key in funcs:
-        if not key.startswith("core."):
-            continue
-        log.trace("Loading %s grain", key)
-        ret = funcs[key]()
-        if not isinstance(ret, dict):
-            continue
-        if blist:
-            for key in list(ret):
-                for block in blist:
-                    if salt.utils.stringutils.expr_match(key, block):
-                        del ret[key]
-                        log.trace("Filtering %s grain", key)
-            if not ret:
+    # Run the core grains, then the rest of the grains
+    keys = [key for key in funcs if key.startswith("core.")]
+    keys.extend(
+        key for key in funcs if not key.startswith("core.") and key != "_errors"
+    )
+    # The results of the grains functions with a cache policy, which are
+    # reused until they expire instead of running the functions again
+    policies = {}
+    if proxy is None and opts.get("grains_cache_policies"):
+        for key in keys:
+            policy = _grain_cache_policy(opts["grains_cache_policies"], key)
+            if policy is not None:
+                policies[key] = policy
+    funcs_cache = {}
+    funcs_cache_dirty = False
+    reused = {}
+    if policies:
+        fcfn = _grains_funcs_cache_path(opts)
+        cached = _load_grains_funcs_cache(fcfn)
+        now = time.time()
+        for key, policy in policies.items():
+            entry = cached.get(key)
+            if entry is None:
+                continue
+            funcs_cache[key] = entry
+            if policy == "static" or (
+                not force_refresh and now - entry["time"] < policy
+            ):
+                reused[key] = entry["ret"]
+        funcs_cache_dirty = len(funcs_cache) != len(cached)
+    runner = None
+    tasks = {}
+    if opts.get("grains_parallel", False):
+        runner = _GrainsRunner(
+            opts.get("grains_parallel_workers", 8),
+            opts.get("grains_function_timeout", 30),
+        )
+        for key in keys:
+            try:
+                parameters = _grain_func_parameters(key, funcs)
+            except Exception:  # pylint: disable=broad-except
+                # Reported when the function is run in order
+                continue
+            # The functions taking the grains depend on the functions before
+            # them and are run in order, the others are started right away
+            if "grains" not in parameters and key not in reused:
+                tasks[key] = runner.submit(
+                    funcs[key], _grain_func_kwargs(parameters, proxy, grains_data)
+                )
+    profile = {}
+    timeouts = []
+    cached_keys = []
+    start = time.time()
+    try:
+        for key in keys:
+            if key in reused:
+                log.trace("Loading %s grain from the cache", key)
+                _merge_grains(
+                    grains_data,
+                    _format_cached_grains(copy.deepcopy(reused[key])),
+                    blist,
+                    grains_deep_merge,
+                )
+                cached_keys.append(key)
                 continue
-        if grains_deep_merge:
-            salt.utils.dictupdate.update(grains_data, ret)
-        else:
-            grains_data.update(ret)
-
-    # Run the rest of the grains
-    for key in funcs:
-        if key.startswith("core.") or key == "_errors":
-            continue
-        try:
-            # Grains are loaded too early to take advantage of the injected
-            # __proxy__ variable.  Pass an instance of that LazyLoader
-            # here instead to grains functions if the grains functions take
-            # one parameter.  Then the grains can have access to the
-            # proxymodule for retrieving information from the connected
-            # device.
             log.trace("Loading %s grain", key)
-            parameters = salt.utils.args.get_function_argspec(funcs[key]).args
-            kwargs = {}
-            if "proxy" in parameters:
-                kwargs["proxy"] = proxy
-            if "grains" in parameters:
-                kwargs["grains"] = grains_data
-            ret = funcs[key](**kwargs)
-        except Exception:  # pylint: disable=broad-except
-            if salt.utils.platform.is_proxy():
-                log.info(
-                    "The following CRITICAL message may not be an error; the proxy may not be completely established yet."
+            try:
+                task = tasks.get(key)
+                if task is None:
+                    parameters = _grain_func_parameters(key, funcs)
+                    task = _GrainsTask(
+                        funcs[key],
+                        _grain_func_kwargs(parameters, proxy, grains_data),
+                    )
+                    if runner is None:
+                        task.run()
+                    else:
+                        runner.start(task)
+                if runner is not None and not runner.wait(task):
+                    log.warning(
+                        "The grains function %s did not return within %s seconds,"
+                        " its grains are ignored",
+                        key,
+                        runner.timeout,
+                    )
+                    timeouts.append(key)
+                    continue
+                profile[key] = task.duration
+                if task.exc is not None:
+                    raise task.exc
+                ret = task.ret
+                if key in policies and isinstance(ret, dict):
+                    funcs_cache[key] = {"time": time.time(), "ret": copy.deepcopy(ret)}
+                    funcs_cache_dirty = True
+            except Exception:  # pylint: disable=broad-except
+                if key.startswith("core."):
+                    raise
+                if salt.utils.platform.is_proxy():
+                    log.info(
+                        "The following CRITICAL message may not be an error; the proxy may not be completely established yet."
+                    )
+                log.critical(
+                    "Failed to load grains defined in grain file %s in "
+                    "function %s, error:\n",
+                    key,
+                    funcs[key],
+                    exc_info=True,
                 )
-            log.critical(
-                "Failed to load grains defined in grain file %s in "
-                "function %s, error:\n",
-                key,
-                funcs[key],
-                exc_info=True,
-            )
-            continue
-        if not isinstance(ret, dict):
-            continue
-        if blist:
-            for key in list(ret):
-                for block in blist:
-                    if salt.utils.stringutils.expr_match(key, block):
-                        del ret[key]
-                        log.trace("Filtering %s grain", key)
-            if not ret:
                 continue
-        if grains_deep_merge:
-            salt.utils.dictupdate.update(grains_data, ret)
-        else:
-            grains_data.update(ret)
+            _merge_grains(grains_data, ret, blist, grains_deep_merge)
+    finally:
+        if runner is not None:
+            runner.stop()
+    _grains_profile.clear()
+    _grains_profile.update(
+        {
+            "parallel": runner is not None,
+            "duration": time.time() - start,
+            "functions": profile,
+            "timeouts": timeouts,
+            "cached": cached_keys,
+        }
+    )
+    if policies and funcs_cache_dirty:
+        _save_grains_funcs_cache(fcfn, funcs_cache)
 
     if opts.get("proxy_merge_grains_in_module", True) and proxy:
         try:
@@ -1,5 +1,6 @@
 import copy
 import functools
+import hashlib
 import importlib
 import importlib.machinery
 import importlib.util
@@ -21,18 +22,22 @@ import salt.config
 import salt.defaults.events
 import salt.defaults.exitcodes
 import salt.loader.context
+import salt.payload
 import salt.syspaths
 import salt.utils.args
+import salt.utils.atomicfile
 import salt.utils.context
 import salt.utils.data
 import salt.utils.dictupdate
 import salt.utils.event
 import salt.utils.files
+import salt.utils.json
 import salt.utils.lazy
 import salt.utils.odict
 import salt.utils.platform
 import salt.utils.stringutils
 import salt.utils.versions
+import salt.version
 from salt.utils.decorators import Depends
 
 try:
@@ -72,6 +77,140 @@ PY3_PRE_EXT = re.compile(r"\.cpython-{}{}(\.opt-[1-9])?".format(*sys.version_inf
 pyximport = None
 
 
+def _file_mapping_cache_dir(opts):
+    return os.path.join(opts["cachedir"], "loader_file_mapping")
+
+
+def _remove_cache_dir(path):
+    try:
+        salt.utils.files.rm_rf(path)
+    except FileNotFoundError:
+        pass
+    except OSError as exc:
+        log.warning("Unable to remove the loader cache %s: %s", path, exc)
+
+
+def clear_file_mapping_cache(opts):
+    """
+    Remove the module file mappings cached by the loaders, see the
+    ``loader_file_mapping_cache`` option
+    """
+    if opts.get("cachedir"):
+        _remove_cache_dir(_file_mapping_cache_dir(opts))
+
+
+def _virtual_cache_dir(opts):
+    return os.path.join(opts["cachedir"], "loader_virtual")
+
+
+def clear_virtual_cache(opts):
+    """
+    Remove the ``__virtual__`` outcomes cached by the loaders, see the
+    ``loader_virtual_cache`` option
+    """
+    if opts.get("cachedir"):
+        _remove_cache_dir(_virtual_cache_dir(opts))
+
+
+def _load_virtual_cache(path):
+    try:
+        with salt.utils.files.fopen(path, "rb") as fp_:
+            return dict(salt.payload.load(fp_))
+    except FileNotFoundError:
+        return {}
+    except Exception as exc:  # pylint: disable=broad-except
+        log.debug("Unable to load the cached __virtual__ outcomes %s: %s", path, exc)
+        return {}
+
+
+def _save_virtual_cache(path, entries):
+    """
+    Merge ``entries`` into the ``__virtual__`` outcomes cached in ``path``,
+    which other processes may have updated
+    """
+    cached = _load_virtual_cache(path)
+    if not cached:
+        _prune_virtual_cache(path)
+    cached.update(entries)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with salt.utils.atomicfile.atomic_open(path, "wb") as fp_:
+            salt.payload.dump(cached, fp_)
+    except Exception as exc:  # pylint: disable=broad-except
+        log.debug("Unable to cache the __virtual__ outcomes in %s: %s", path, exc)
+
+
+def _prune_virtual_cache(path):
+    """
+    Remove the files caching the ``__virtual__`` outcomes of the same loader
+    for other grains, which are named with the same prefix as ``path``
+    """
+    dirname, basename = os.path.split(path)
+    prefix = basename.split(".", 1)[0] + "."
+    try:
+        names = os.listdir(dirname)
+    except OSError:
+        return
+    for name in names:
+        if name.startswith(prefix) and name != basename:
+            try:
+                os.remove(os.path.join(dirname, name))
+            except OSError:
+                pass
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+def _load_file_mapping(path):
+    """
+    Return the file mapping cached in ``path``, or ``None`` if it is missing
+    or one of the directories it was built from has been modified since
+    """
+    try:
+        with salt.utils.files.fopen(path, "rb") as fp_:
+            data = salt.payload.load(fp_)
+        for dirpath, mtime in data["dirs"]:
+            if _mtime(dirpath) != mtime:
+                return None
+        return salt.utils.odict.OrderedDict(
+            (name, (fpath, ext, opt_index))
+            for name, fpath, ext, opt_index in data["mapping"]
+        )
+    except FileNotFoundError:
+        return None
+    except Exception as exc:  # pylint: disable=broad-except
+        log.debug("Unable to load the cached file mapping %s: %s", path, exc)
+        return None
+
+
+def _save_file_mapping(path, watched, mapping):
+    """
+    Cache the file mapping built from the ``watched`` directories, given as
+    ``(path, mtime)`` with the mtime taken before listing them
+    """
+    # The mtime of a directory changed less than 2 seconds ago does not
+    # guarantee that a later change will modify it, on filesystems with a
+    # coarse timestamp resolution.
+    threshold = time.time() - 2
+    if any(mtime is not None and mtime > threshold for _, mtime in watched):
+        return
+    data = {
+        "dirs": [list(item) for item in watched],
+        "mapping": [[name] + list(item) for name, item in mapping.items()],
+    }
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with salt.utils.atomicfile.atomic_open(path, "wb") as fp_:
+            salt.payload.dump(data, fp_)
+    except Exception as exc:  # pylint: disable=broad-except
+        log.debug("Unable to cache the file mapping in %s: %s", path, exc)
+
+
 def _generate_module(name):
     if name in sys.modules:
         return
@@ -283,6 +422,11 @@ class LazyLoader(salt.utils.lazy.LazyDict):
         self.loaded_modules = set()
         self.loaded_files = set()  # TODO: just remove them from file_mapping?
         self.static_modules = static_modules if static_modules else []
+        # outcomes of __virtual__ cached across processes, see _cached_virtual
+        self._virtual_cache = None
+        self._virtual_cache_file = None
+        self._virtual_cache_dirty = False
+        self.imports_avoided = 0
 
         if virtual_funcs is None:
             virtual_funcs = []
@@ -423,7 +567,48 @@ class LazyLoader(salt.utils.lazy.LazyDict):
 
         # create mapping of filename (without suffix) to (path, suffix)
         # The files are added in order of priority, so order *must* be retained.
-        self.file_mapping = salt.utils.odict.OrderedDict()
+        cache_path = self._file_mapping_cache_path()
+        file_mapping = None
+        if cache_path is not None:
+            file_mapping = _load_file_mapping(cache_path)
+        if file_mapping is None:
+            watched = []
+            file_mapping = self._map_module_dirs(watched)
+            if cache_path is not None:
+                _save_file_mapping(cache_path, watched, file_mapping)
+        self.file_mapping = file_mapping
+        for smod in self.static_modules:
+            f_noext = smod.split(".")[-1]
+            self.file_mapping[f_noext] = (smod, ".o", 0)
+
+    def _file_mapping_cache_path(self):
+        """
+        Return the path of the file caching the file mapping of this loader,
+        or ``None`` if the file mapping is not cached
+        """
+        if not self.opts.get("loader_file_mapping_cache", False) or not self.opts.get(
+            "cachedir"
+        ):
+            return None
+        key = [
+            salt.version.__version__,
+            sys.implementation.cache_tag,
+            self.tag,
+            list(self.module_dirs),
+            sorted(self.suffix_map),
+            list(self.suffix_order),
+            sorted(self.disabled),
+            list(self.opts["optimization_order"]),
+        ]
+        digest = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(_file_mapping_cache_dir(self.opts), "{}.p".format(digest))
+
+    def _map_module_dirs(self, watched):
+        """
+        Return the mapping of the modules found in the module directories,
+        the directories the mapping depends on are added to ``watched``
+        """
+        file_mapping = salt.utils.odict.OrderedDict()
 
         opt_match = []
 
@@ -438,12 +623,15 @@ class LazyLoader(salt.utils.lazy.LazyDict):
             return ""
 
         for mod_dir in self.module_dirs:
+            watched.append((mod_dir, _mtime(mod_dir)))
             try:
                 # Make sure we have a sorted listdir in order to have
                 # expectable override results
                 files = sorted(x for x in os.listdir(mod_dir) if x != "__pycache__")
             except OSError:
                 continue  # Next mod_dir
+            pycache = os.path.join(mod_dir, "__pycache__")
+            watched.append((pycache, _mtime(pycache)))
             try:
                 pycache_files = [
                     os.path.join("__pycache__", x)
@@ -495,6 +683,7 @@ class LazyLoader(salt.utils.lazy.LazyDict):
                     # if its a directory, lets allow us to load that
                     if ext == "":
                         # is there something __init__?
+                        watched.append((fpath, _mtime(fpath)))
                         subfiles = os.listdir(fpath)
                         for suffix in self.suffix_order:
                             if "" == suffix:
@@ -506,8 +695,8 @@ class LazyLoader(salt.utils.lazy.LazyDict):
                             continue  # Next filename
 
                     try:
-                        curr_ext = self.file_mapping[f_noext][1]
-                        curr_opt_index = self.file_mapping[f_noext][2]
+                        curr_ext = file_mapping[f_noext][1]
+                        curr_opt_index = file_mapping[f_noext][2]
                     except KeyError:
                         pass
                     else:
@@ -515,7 +704,7 @@ class LazyLoader(salt.utils.lazy.LazyDict):
                             log.error(
                                 "Module/package collision: '%s' and '%s'",
                                 fpath,
-                                self.file_mapping[f_noext][0],
+                                file_mapping[f_noext][0],
                             )
 
                         if ext == ".pyc" and curr_ext == ".pyc":
@@ -538,13 +727,11 @@ class LazyLoader(salt.utils.lazy.LazyDict):
                         continue
 
                     # Made it this far - add it
-                    self.file_mapping[f_noext] = (fpath, ext, opt_index)
+                    file_mapping[f_noext] = (fpath, ext, opt_index)
 
                 except OSError:
                     continue
-        for smod in self.static_modules:
-            f_noext = smod.split(".")[-1]
-            self.file_mapping[f_noext] = (smod, ".o", 0)
+        return file_mapping
 
     def clear(self):
         """
@@ -590,6 +777,94 @@ class LazyLoader(salt.utils.lazy.LazyDict):
             mod_opts[key] = val
         return mod_opts
 
+    def _virtual_cache_path(self):
+        """
+        Return the path of the file caching the outcomes of the ``__virtual__``
+        functions of this loader, or ``None`` if they are not cached
+        """
+        if (
+            not self.opts.get("loader_virtual_cache", False)
+            or not self.opts.get("cachedir")
+            or not self.virtual_enable
+            or self.tag == "grains"
+        ):
+            return None
+        grains = self.context_dict.get("grains")
+        if not grains:
+            return None
+        try:
+            fingerprint = salt.utils.json.dumps(grains, sort_keys=True, default=repr)
+        except (TypeError, ValueError):
+            return None
+        proxy = self.opts.get("proxy")
+        key = [
+            salt.version.__version__,
+            self.tag,
+            list(self.module_dirs),
+            list(self.virtual_funcs),
+            self.opts.get("__role"),
+            proxy.get("proxytype") if isinstance(proxy, dict) else None,
+        ]
+        # The files of a loader share the digest of its key as a prefix, the
+        # file of the previous grains is removed when the grains change
+        return os.path.join(
+            _virtual_cache_dir(self.opts),
+            "{}.{}.p".format(
+                hashlib.sha256(repr(key).encode("utf-8")).hexdigest(),
+                hashlib.sha256(fingerprint.encode("utf-8")).hexdigest(),
+            ),
+        )
+
+    def _cached_virtual(self, name):
+        """
+        Return the cached outcome of the ``__virtual__`` functions of the
+        module ``name``, ``[False, reason]`` if it refused to load or
+        ``[True, module_name, aliases]`` if it loaded, or ``None`` if the
+        outcome is unknown or the module file changed since
+        """
+        if self._virtual_cache is None:
+            self._virtual_cache_file = self._virtual_cache_path()
+            if self._virtual_cache_file is None:
+                self._virtual_cache = {}
+            else:
+                self._virtual_cache = _load_virtual_cache(self._virtual_cache_file)
+        entry = self._virtual_cache.get(name)
+        if entry is None:
+            return None
+        fpath, mtime, size, outcome = entry
+        try:
+            if fpath != self.file_mapping[name][0]:
+                return None
+            stat = os.stat(fpath)
+        except (KeyError, OSError):
+            return None
+        if stat.st_mtime != mtime or stat.st_size != size:
+            return None
+        return outcome
+
+    def _cache_virtual(self, name, outcome):
+        """
+        Remember the outcome of the ``__virtual__`` functions of the module
+        ``name``, see :py:meth:`_cached_virtual`
+        """
+        if self._virtual_cache_file is None:
+            return
+        fpath, suffix = self.file_mapping[name][:2]
+        if suffix in ("", ".o"):
+            # Packages and static modules have no file to validate it against
+            return
+        try:
+            stat = os.stat(fpath)
+        except OSError:
+            return
+        self._virtual_cache[name] = [fpath, stat.st_mtime, stat.st_size, outcome]
+        self._virtual_cache_dirty = True
+
+    def _save_virtual_cache(self):
+        if self._virtual_cache_dirty:
+            self._virtual_cache_dirty = False
+            _save_virtual_cache(self._virtual_cache_file, self._virtual_cache)
+
     def _iter_files(self, mod_name):
         """
         Iterate over all file_mapping files in order of closeness to mod_name
@@ -677,6 +952,14 @@ class LazyLoader(salt.utils.lazy.LazyDict):
             # Most likely Py 2.7 or some other Python version we don't really support
             pass
 
+        outcome = self._cached_virtual(name)
+        if outcome is not None and not outcome[0]:
+            # The module refused to load, no need to import it again
+            self.loaded_files.add(name)
+            self.missing_modules[name] = outcome[1]
+            self.imports_avoided += 1
+            return False
+
         self.loaded_files.add(name)
         fpath_dirname = os.path.dirname(fpath)
         try:
@@ -918,7 +1201,12 @@ class LazyLoader(salt.utils.lazy.LazyDict):
                     # If a module has information about why it could not be loaded, record it
                     self.missing_modules[module_name] = virtual_err
                     self.missing_modules[name] = virtual_err
+                    self._cache_virtual(
+                        name,
+                        [False, None if virtual_err is None else str(virtual_err)],
+                    )
                     return False
+            self._cache_virtual(name, [True, module_name, list(virtual_aliases)])
         else:
             virtual_aliases = ()
 
@@ -1020,6 +1308,16 @@ class LazyLoader(salt.utils.lazy.LazyDict):
                 for name in self._iter_files(mod_name):
                     if name in self.loaded_files:
                         continue
+                    outcome = self._cached_virtual(name)
+                    if (
+                        outcome is not None
+                        and outcome[0]
+                        and mod_name != outcome[1]
+                        and mod_name not in outcome[2]
+                    ):
+                        # The module is loaded under another name
+                        self.imports_avoided += 1
+                        continue
                     # if we got what we wanted, we are done
                     if self._load_module(name) and key in self._dict:
                         return True
@@ -1043,6 +1341,7 @@ class LazyLoader(salt.utils.lazy.LazyDict):
                         self._refresh_file_mapping()
                         reloaded = True
                     continue
+            self._save_virtual_cache()
 
         return ret
 
@@ -1057,6 +1356,14 @@ class LazyLoader(salt.utils.lazy.LazyDict):
                 self._load_module(name)
 
             self.loaded = True
+            self._save_virtual_cache()
+            if self.imports_avoided:
+                log.debug(
+                    "Avoided %d imports of %s modules thanks to the cached"
+                    " __virtual__ outcomes",
+                    self.imports_avoided,
+                    self.tag,
+                )
 
     def reload_modules(self):
         with self._lock:
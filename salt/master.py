@@ -38,6 +38,7 @@ import salt.state
 import salt.transport.server
 import salt.utils.args
 import salt.utils.atomicfile
+import salt.utils.cache
 import salt.utils.crypt
 import salt.utils.event
 import salt.utils.files
@@ -328,7 +329,10 @@ class Maintenance(salt.utils.process.SignalHandlingProcess):
         """
         try:
             for pillar in self.git_pillar:
-                pillar.fetch_remotes()
+                if pillar.fetch_remotes():
+                    # Mark the cached pillar data compiled from git_pillar as
+                    # stale
+                    salt.utils.cache.bump_generation(self.opts, "git_pillar")
         except Exception as exc:  # pylint: disable=broad-except
             log.error("Exception caught while updating git_pillar", exc_info=True)
 
@@ -1587,10 +1591,16 @@ class AESFuncs(TransportMethods):
         :rtype: dict
         :return: The pillar data for the minion
         """
-        if any(key not in load for key in ("id", "grains")):
+        if "id" not in load or not salt.utils.verify.valid_id(self.opts, load["id"]):
             return False
-        if not salt.utils.verify.valid_id(self.opts, load["id"]):
+        if "grains_diff" in load:
+            load["grains"] = self._grains_delta(load)
+            if load["grains"] is None:
+                return {salt.pillar.PILLAR_DELTA_KEY: {"grains": False}}
+        if "grains" not in load:
             return False
+        if "grains_hash" in load:
+            self._store_grains_delta_base(load)
         load["grains"]["id"] = load["id"]
 
         pillar = salt.pillar.get_pillar(
@@ -1603,10 +1613,14 @@ class AESFuncs(TransportMethods):
             pillarenv=load.get("pillarenv"),
             extra_minion_data=load.get("extra_minion_data"),
             context=self.context,
+            clean_cache=load.get("clean_cache", False),
         )
         data = pillar.compile_pillar()
         self.fs_.update_opts()
+        previous = None
         if self.opts.get("minion_data_cache", False):
+            if "pillar_hash" in load:
+                previous = self._cached_pillar(load["id"])
             self.masterapi.cache.store(
                 "minions/{}".format(load["id"]),
                 "data",
@@ -1617,8 +1631,124 @@ class AESFuncs(TransportMethods):
                     {"Minion data cache refresh": load["id"]},
                     tagify(load["id"], "refresh", "minion"),
                 )
+        if "pillar_hash" in load:
+            return self._pillar_delta(load, data, previous)
         return data
 
+    def _cached_pillar(self, minion_id):
+        """
+        Return the pillar data of the minion in the minion data cache, or
+        ``None`` if it is not cached
+
+        :param str minion_id: The ID of the minion
+
+        :rtype: dict
+        :return: The cached pillar data of the minion
+        """
+        try:
+            cached = self.masterapi.cache.fetch("minions/{}".format(minion_id), "data")
+        except Exception:  # pylint: disable=broad-except
+            log.error("Unable to fetch the cached pillar of %s", minion_id)
+            return None
+        if not isinstance(cached, dict):
+            return None
+        return cached.get("pillar")
+
+    def _grains_delta(self, load):
+        """
+        Return the grains of the minion rebuilt from the changes it sent since
+        the grains it last sent, or ``None`` if they cannot be rebuilt
+
+        :param dict load: Minion payload
+
+        :rtype: dict
+        :return: The grains of the minion
+        """
+        bank = "minions/{}".format(load["id"])
+        try:
+            base = self.masterapi.cache.fetch(bank, "grains_delta") or {}
+        except Exception:  # pylint: disable=broad-except
+            log.error("Unable to fetch the grains delta base of %s", load["id"])
+            return None
+        if not base or base.get("hash") != load.get("grains_hash"):
+            return None
+        grains = salt.pillar.apply_pillar_diff(base["grains"], load["grains_diff"])
+        if salt.pillar.pillar_hash(grains) != load.get("grains_new_hash"):
+            log.debug("The grains delta of %s does not match its grains", load["id"])
+            return None
+        return grains
+
+    def _store_grains_delta_base(self, load):
+        """
+        Keep the grains of a minion sending grains deltas, as the base of its
+        next delta
+
+        :param dict load: Minion payload
+        """
+        grains_hash = load.get("grains_new_hash") or salt.pillar.pillar_hash(
+            load["grains"]
+        )
+        if grains_hash is None or grains_hash == load["grains_hash"]:
+            return
+        try:
+            self.masterapi.cache.store(
+                "minions/{}".format(load["id"]),
+                "grains_delta",
+                {"hash": grains_hash, "grains": load["grains"]},
+            )
+        except Exception:  # pylint: disable=broad-except
+            log.error("Unable to store the grains delta base of %s", load["id"])
+
+    def _pillar_delta(self, load, data, previous=None):
+        """
+        Return the difference between the pillar data last sent to the minion
+        and ``data``, if the minion still has the former. Otherwise return
+        ``data``.
+
+        Only the hash of the pillar data sent to the minion is kept when the
+        minion data cache is enabled, as the cache has the data itself.
+        Otherwise the data is kept as well.
+
+        :param dict load: Minion payload
+
+        :param dict data: The pillar data for the minion
+
+        :param dict previous: The pillar data of the minion in the minion data
+            cache before ``data`` replaced it
+
+        :rtype: dict
+        :return: The pillar delta or the pillar data for the minion
+        """
+        new_hash = salt.pillar.pillar_hash(data)
+        if new_hash is None:
+            return data
+        bank = "minions/{}".format(load["id"])
+        try:
+            base = self.masterapi.cache.fetch(bank, "pillar_delta") or {}
+        except Exception:  # pylint: disable=broad-except
+            log.error("Unable to fetch the pillar delta base of %s", load["id"])
+            base = {}
+        if self.opts.get("minion_data_cache", False):
+            base_pillar = previous
+            entry = {"hash": new_hash}
+        else:
+            base_pillar = base.get("pillar")
+            entry = {"hash": new_hash, "pillar": data}
+        if base.get("hash") != new_hash or set(base) != set(entry):
+            self.masterapi.cache.store(bank, "pillar_delta", entry)
+        if (
+            not load["pillar_hash"]
+            or base.get("hash") != load["pillar_hash"]
+            or base_pillar is None
+        ):
+            return data
+        delta = {"hash": new_hash}
+        if new_hash != base["hash"]:
+            # The minion checks the hash of the pillar it rebuilds, and fetches
+            # the full pillar if the cached data was not the one sent to it
+            delta["diff"] = salt.pillar.pillar_diff(base_pillar, data)
+        return {salt.pillar.PILLAR_DELTA_KEY: delta}
+
     def _minion_event(self, load):
         """
         Receive an event from the minion and fire it on the master event
@@ -46,6 +46,8 @@ import salt.utils.error
 import salt.utils.event
 import salt.utils.files
 import salt.utils.jid
+import salt.utils.jobpool
+import salt.utils.mine
 import salt.utils.minion
 import salt.utils.minions
 import salt.utils.network
@@ -1257,6 +1259,26 @@ class Minion(MinionBase):
         self.ready = False
         self.jid_queue = [] if jid_queue is None else jid_queue
         self.periodic_callbacks = {}
+        # The hashes of the mine data of the functions the master has, see
+        # mine_delta
+        self._mine_hashes = {}
+        self.job_pool = None
+        # Set in the processes of the job pool
+        self.job_pool_worker = False
+        pool_size = self.opts.get("minion_job_pool_size", 0)
+        if pool_size > 0 and self.opts.get("multiprocessing", True):
+            if salt.utils.platform.spawning_platform():
+                log.warning(
+                    "The minion job pool requires forking processes, it is"
+                    " disabled on this platform"
+                )
+            else:
+                process_count_max = self.opts.get("process_count_max", -1)
+                if process_count_max > 0:
+                    pool_size = min(pool_size, process_count_max)
+                self.job_pool = salt.utils.jobpool.JobPool(
+                    self, pool_size, self.opts.get("minion_job_pool_max_jobs", 0)
+                )
 
         if io_loop is None:
             self.io_loop = salt.ext.tornado.ioloop.IOLoop.current()
@@ -1724,6 +1746,8 @@ class Minion(MinionBase):
                 ) = self._load_modules()
                 self.schedule.functions = self.functions
                 self.schedule.returners = self.returners
+                if self.job_pool is not None:
+                    self.job_pool.recycle()
 
         process_count_max = self.opts.get("process_count_max")
         if process_count_max > 0:
@@ -1743,6 +1767,9 @@ class Minion(MinionBase):
         # side.
         instance = self
         multiprocessing_enabled = self.opts.get("multiprocessing", True)
+        if self.job_pool is not None and self.job_pool.dispatch(data, self.connected):
+            # A pre-forked worker runs the job
+            return
         if multiprocessing_enabled:
             if sys.platform.startswith("win"):
                 # let python reconstruct the minion on the other side if we're
@@ -1882,7 +1909,10 @@ class Minion(MinionBase):
         This method should be used as a threading target, start the actual
         minion side execution.
         """
-        minion_instance.gen_modules()
+        if not getattr(minion_instance, "job_pool_worker", False):
+            # The job pool workers are forked with the modules loaded and
+            # replaced when the modules are refreshed
+            minion_instance.gen_modules()
         fn_ = os.path.join(minion_instance.proc_dir, data["jid"])
 
         salt.utils.process.appendproctitle(
@@ -2072,7 +2102,10 @@ class Minion(MinionBase):
         This method should be used as a threading target, start the actual
         minion side execution.
         """
-        minion_instance.gen_modules()
+        if not getattr(minion_instance, "job_pool_worker", False):
+            # The job pool workers are forked with the modules loaded and
+            # replaced when the modules are refreshed
+            minion_instance.gen_modules()
         fn_ = os.path.join(minion_instance.proc_dir, data["jid"])
 
         salt.utils.process.appendproctitle(
@@ -2411,12 +2444,16 @@ class Minion(MinionBase):
         if not hasattr(self, "schedule"):
             return
         log.debug("Refreshing modules. Notify=%s", notify)
+        salt.loader.lazy.clear_virtual_cache(self.opts)
         self.functions, self.returners, _, self.executors = self._load_modules(
             force_refresh, notify=notify
         )
 
         self.schedule.functions = self.functions
         self.schedule.returners = self.returners
+        if self.job_pool is not None:
+            # The workers were forked with the modules as they were
+            self.job_pool.recycle()
 
         self.beacons_refresh()
 
@@ -2470,7 +2507,7 @@ class Minion(MinionBase):
 
     # TODO: only allow one future in flight at a time?
     @salt.ext.tornado.gen.coroutine
-    def pillar_refresh(self, force_refresh=False):
+    def pillar_refresh(self, force_refresh=False, clean_cache=False):
         """
         Refresh the pillar
         """
@@ -2484,6 +2521,7 @@ class Minion(MinionBase):
                 self.opts["id"],
                 self.opts["saltenv"],
                 pillarenv=self.opts.get("pillarenv"),
+                clean_cache=clean_cache,
             )
             try:
                 new_pillar = yield async_pillar.compile_pillar()
@@ -2500,6 +2538,9 @@ class Minion(MinionBase):
                     current_schedule, new_schedule
                 )
                 self.opts["pillar"] = new_pillar
+                if self.job_pool is not None:
+                    # The workers were forked while the pillar was compiled
+                    self.job_pool.recycle()
             finally:
                 async_pillar.destroy()
         self.matchers_refresh()
@@ -2642,6 +2683,44 @@ class Minion(MinionBase):
         """
         Send mine data to the master
         """
+        if not self.opts.get("mine_delta", False):
+            return self._send_mine_load(data)
+        hashes = self._mine_hashes
+        cmd = data.get("cmd")
+        if cmd == "_mine_delete":
+            hashes.pop(data.get("fun"), None)
+        elif cmd == "_mine_flush":
+            hashes.clear()
+        if cmd != "_mine" or not isinstance(data.get("data"), dict):
+            return self._send_mine_load(data)
+
+        mine_data = data["data"]
+        new_hashes = {}
+        for function, function_data in mine_data.items():
+            function_hash = salt.utils.mine.function_hash(function_data)
+            if function_hash is not None:
+                new_hashes[function] = function_hash
+        data["mine_hashes"] = new_hashes
+        if not data.get("clear", False):
+            # Only send the data of the functions which changed
+            data["data"] = {
+                function: function_data
+                for function, function_data in mine_data.items()
+                if function not in new_hashes
+                or hashes.get(function) != new_hashes[function]
+            }
+        ret = self._send_mine_load(data)
+        if ret == {salt.utils.mine.MINE_DELTA_KEY: False}:
+            log.debug("The master cannot apply the mine delta, sending all mine data")
+            data["data"] = mine_data
+            ret = self._send_mine_load(data)
+        if ret is True:
+            if data.get("clear", False):
+                hashes.clear()
+            hashes.update(new_hashes)
+        return ret
+
+    def _send_mine_load(self, data):
         with salt.transport.client.ReqChannel.factory(self.opts) as channel:
             data["tok"] = self.tok
             try:
@@ -2677,7 +2756,10 @@ class Minion(MinionBase):
                 notify=data.get("notify", False),
             )
         elif tag.startswith("pillar_refresh"):
-            yield _minion.pillar_refresh(force_refresh=data.get("force_refresh", False))
+            yield _minion.pillar_refresh(
+                force_refresh=data.get("force_refresh", False),
+                clean_cache=data.get("clean_cache", False),
+            )
         elif tag.startswith("beacons_refresh"):
             _minion.beacons_refresh()
         elif tag.startswith("matchers_refresh"):
@@ -2693,6 +2775,9 @@ class Minion(MinionBase):
             ):
                 _minion.pillar_refresh(force_refresh=True)
                 _minion.grains_cache = _minion.opts["grains"]
+                if getattr(_minion, "job_pool", None) is not None:
+                    # The workers must run the jobs with the new grains
+                    _minion.job_pool.recycle()
         elif tag.startswith("environ_setenv"):
             self.environ_setenv(tag, data)
         elif tag.startswith("_minion_mine"):
@@ -3188,6 +3273,8 @@ class Minion(MinionBase):
             return
 
         self._running = False
+        if getattr(self, "job_pool", None) is not None:
+            self.job_pool.stop()
         if hasattr(self, "schedule"):
             del self.schedule
         if hasattr(self, "pub_channel") and self.pub_channel is not None:
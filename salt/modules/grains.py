@@ -19,6 +19,7 @@ import random
 from collections.abc import Mapping
 from functools import reduce  # pylint: disable=redefined-builtin
 
+import salt.loader
 import salt.utils.compat
 import salt.utils.data
 import salt.utils.files
@@ -800,5 +801,35 @@ def equals(key, value):
     return str(value) == str(get(key))
 
 
+def profile(top=0):
+    """
+    .. versionadded:: 3005
+
+    Return how long each grains function took to run, in seconds, the last
+    time the minion loaded its grains, along with the whole duration, whether
+    the functions were run in parallel (see :conf_minion:`grains_parallel`),
+    the functions which did not return within
+    :conf_minion:`grains_function_timeout` and the functions whose result was
+    cached (see :conf_minion:`grains_cache_policies`).
+
+    top
+        Only return the ``top`` slowest functions
+
+    CLI Example:
+
+    .. code-block:: bash
+
+        salt '*' grains.profile
+        salt '*' grains.profile top=10
+    """
+    ret = salt.loader.grains_profile()
+    if top:
+        slowest = sorted(
+            ret["functions"].items(), key=operator.itemgetter(1), reverse=True
+        )
+        ret["functions"] = dict(slowest[: int(top)])
+    return ret
+
+
 # Provide a jinja function call compatible get aliased as fetch
 fetch = get
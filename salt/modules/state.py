@@ -32,6 +32,7 @@ import salt.utils.jid
 import salt.utils.json
 import salt.utils.msgpack
 import salt.utils.platform
+import salt.utils.renderprofile
 import salt.utils.state
 import salt.utils.stringutils
 import salt.utils.url
@@ -1539,11 +1540,21 @@ def show_highstate(queue=False, **kwargs):
 
     Custom Pillar data can be passed with the ``pillar`` kwarg.
 
+    profile : False
+        .. versionadded:: 3005
+
+        Record the time spent to render the highstate, see
+        :conf_minion:`state_render_profile`. The highstate is returned under
+        the ``highstate`` key and the recorded data under the
+        ``render_profile`` key, which the ``profile`` outputter displays as a
+        table.
+
     CLI Example:
 
     .. code-block:: bash
 
         salt '*' state.show_highstate
+        salt '*' state.show_highstate profile=True --out=profile
     """
     conflict = _check_queue(queue, kwargs)
     if conflict is not None:
@@ -1583,12 +1594,21 @@ def show_highstate(queue=False, **kwargs):
             __context__["retcode"] = salt.defaults.exitcodes.EX_PILLAR_FAILURE
             raise CommandExecutionError("Pillar failed to render", info=errors)
 
+        profile = salt.utils.data.is_true(kwargs.get("profile", False))
+        render_profile = None
+        profiling = profile or salt.utils.renderprofile.enabled(opts)
+        if profiling:
+            st_.start_render_profile()
         st_.push_active()
         try:
             ret = st_.compile_highstate()
         finally:
             st_.pop_active()
+            if profiling:
+                render_profile = st_.stop_render_profile()
         _set_retcode(ret)
+        if profile:
+            return {"highstate": ret, "render_profile": render_profile}
         return ret
 
 
@@ -21,6 +21,18 @@ names, modules and durations that looks somewhat like the following::
     /etc/salt/minion    file.managed                 63.1450
 
 
+The ``render_profile`` returned by ``state.show_highstate profile=True`` is
+displayed as a table of the rendered SLS files with their depth in the include
+graph, the time spent in each renderer, the time spent fetching files, the
+number of fetches served from the file cache and the total render time::
+
+    sls              depth  renderers (ms)               fetch (ms)  cached  total (ms)
+    ---------------------------------------------------------------------------------
+    base:web         0      jinja=12.4100 yaml=3.2200        4.1200  2/3        25.0400
+    base:web.nginx   1      jinja=2.1000 yaml=0.8800         0.9100  1/1         3.8900
+
+    minion: deserialized YAML/JSON data 4 times, reused it 12 times
+
 To get the above appearance, use settings something like these::
 
     out.table.separate_rows: False
@@ -67,17 +79,66 @@ def _find_durations(data, name_max=60):
     return [x[1:] + x[0:1] for x in sorted(ret)]
 
 
+def _find_render_times(data):
+    ret = []
+    for host in data:
+        for stats in data[host]["render_profile"].get("sls", []):
+            renderers = " ".join(
+                "{}={:0.4f}".format(name, dur)
+                for name, dur in stats.get("render", {}).items()
+            )
+            ret.append(
+                [
+                    "{}:{}".format(stats["saltenv"], stats["sls"]),
+                    str(stats.get("depth", 0)),
+                    renderers,
+                    "{:0.4f}".format(stats.get("fetch", 0)),
+                    "{}/{}".format(stats.get("cache_hits", 0), stats.get("fetches", 0)),
+                    "{:0.4f}".format(stats.get("total", 0)),
+                ]
+            )
+    return ret
+
+
+def _is_render_profile(data):
+    return bool(data) and all(
+        isinstance(data[host], dict) and "render_profile" in data[host] for host in data
+    )
+
+
 def output(data, **kwargs):
     """
     Display the profiling data in a table format.
     """
 
-    rows = _find_durations(data)
-
     kwargs["opts"] = __opts__
     kwargs["rows_key"] = "rows"
     kwargs["labels_key"] = "labels"
 
+    if _is_render_profile(data):
+        to_show = {
+            "labels": [
+                "sls",
+                "depth",
+                "renderers (ms)",
+                "fetch (ms)",
+                "cached",
+                "total (ms)",
+            ],
+            "rows": _find_render_times(data),
+        }
+        ret = table_out.output(to_show, **kwargs)
+        for host in data:
+            parsed = data[host]["render_profile"].get("parsed_data")
+            if parsed:
+                ret += (
+                    "\n{}: deserialized YAML/JSON data {} times, reused it {} "
+                    "times".format(host, parsed.get("parses", 0), parsed.get("hits", 0))
+                )
+        return ret
+
+    rows = _find_durations(data)
+
     to_show = {"labels": ["name", "mod.fun", "duration (ms)"], "rows": rows}
 
     return table_out.output(to_show, **kwargs)
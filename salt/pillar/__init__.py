@@ -3,11 +3,17 @@ Render the pillar data
 """
 
 import collections
+import concurrent.futures
+import contextvars
 import copy
 import fnmatch
+import hashlib
 import logging
 import os
+import re
 import sys
+import threading
+import time
 import traceback
 import uuid
 
@@ -21,19 +27,101 @@ import salt.utils.cache
 import salt.utils.crypt
 import salt.utils.data
 import salt.utils.dictupdate
+import salt.utils.files
+import salt.utils.json
+import salt.utils.stringutils
+import salt.utils.templates
+import salt.utils.topindex
 import salt.utils.url
 from salt.exceptions import SaltClientError
-from salt.template import compile_template
+from salt.template import OLD_STYLE_RENDERERS, compile_template
 
 # Even though dictupdate is imported, invoking salt.utils.dictupdate.merge here
 # causes an UnboundLocalError. This should be investigated and fixed, but until
 # then, leave the import directly below this comment intact.
+from salt.utils.decorators.jinja import JinjaFilter, JinjaGlobal
 from salt.utils.dictupdate import merge
 from salt.utils.odict import OrderedDict
 from salt.version import __version__
 
 log = logging.getLogger(__name__)
 
+# The in-memory pillar cache of this process
+_MEMORY_PILLAR_CACHE = None
+
+# The key of the master reply to a delta pillar request
+PILLAR_DELTA_KEY = "__pillar_delta__"
+
+# The last pillar received from the master, used as the base of the deltas
+_PILLAR_DELTA_BASE = {}
+
+# The last grains sent to each master, used as the base of the grains deltas
+_GRAINS_DELTA_BASE = {}
+
+# The number of pillar cache files and when they were last counted by this
+# process, by cache directory
+_PILLAR_CACHE_COUNTS = {}
+
+# The calls of external pillars which timed out in this process and are still
+# running, by external pillar name and configuration
+_HUNG_EXT_PILLARS = {}
+_HUNG_EXT_PILLARS_LOCK = threading.Lock()
+
+
+def pillar_hash(pillar):
+    """
+    Return a hash of the pillar data which does not depend on the order of its
+    keys, or ``None`` if the pillar data cannot be hashed
+    """
+    try:
+        data = salt.utils.json.dumps(pillar, sort_keys=True, default=repr)
+    except (TypeError, ValueError):
+        return None
+    return hashlib.sha256(salt.utils.stringutils.to_bytes(data)).hexdigest()
+
+
+def pillar_diff(old, new):
+    """
+    Return the structural difference between two pillar dicts, which
+    :py:func:`apply_pillar_diff` applies to ``old`` to get ``new``. Nested
+    dicts are compared recursively, any other changed value is replaced.
+    """
+    diff = {}
+    changed = {}
+    nested = {}
+    for key, value in new.items():
+        if key not in old:
+            changed[key] = value
+        elif isinstance(value, dict) and isinstance(old[key], dict):
+            sub_diff = pillar_diff(old[key], value)
+            if sub_diff:
+                nested[key] = sub_diff
+        elif type(old[key]) is not type(value) or old[key] != value:
+            changed[key] = value
+    removed = [key for key in old if key not in new]
+    if changed:
+        diff["set"] = changed
+    if nested:
+        diff["nested"] = nested
+    if removed:
+        diff["removed"] = removed
+    return diff
+
+
+def apply_pillar_diff(pillar, diff):
+    """
+    Apply a difference returned by :py:func:`pillar_diff` to a copy of
+    ``pillar`` and return it
+    """
+    ret = dict(pillar)
+    for key in diff.get("removed", []):
+        ret.pop(key, None)
+    for key, value in diff.get("set", {}).items():
+        ret[key] = value
+    for key, sub_diff in diff.get("nested", {}).items():
+        ret[key] = apply_pillar_diff(ret.get(key, {}), sub_diff)
+    return ret
+
 
 def get_pillar(
     opts,
@@ -46,6 +134,7 @@ def get_pillar(
     pillarenv=None,
     extra_minion_data=None,
     context=None,
+    clean_cache=False,
 ):
     """
     Return the correct pillar driver based on the file_client option
@@ -81,6 +170,7 @@ def get_pillar(
             pillar_override=pillar_override,
             pillarenv=pillarenv,
             context=context,
+            clean_cache=clean_cache,
         )
     return ptype(
         opts,
@@ -107,6 +197,7 @@ def get_async_pillar(
     pillar_override=None,
     pillarenv=None,
     extra_minion_data=None,
+    clean_cache=False,
 ):
     """
     Return the correct pillar driver based on the file_client option
@@ -119,6 +210,10 @@ def get_async_pillar(
     ptype = {"remote": AsyncRemotePillar, "local": AsyncPillar}.get(
         file_client, AsyncPillar
     )
+    kwargs = {}
+    if ptype is AsyncRemotePillar:
+        # Ask the master to discard its cached pillar data for this minion
+        kwargs["clean_cache"] = clean_cache
     return ptype(
         opts,
         grains,
@@ -129,6 +224,7 @@ def get_async_pillar(
         pillar_override=pillar_override,
         pillarenv=pillarenv,
         extra_minion_data=extra_minion_data,
+        **kwargs
     )
 
 
@@ -180,6 +276,117 @@ class RemotePillarMixin:
         log.trace("ext_pillar_extra_data = %s", extra_data)
         return extra_data
 
+    def delta_key(self):
+        """
+        Return the key under which the last pillar received from the master is
+        kept when ``pillar_delta`` is enabled, or ``None`` if the pillar cannot
+        be fetched as a delta
+        """
+        if not self.opts.get("pillar_delta", False):
+            return None
+        if self.ext or self.pillar_override:
+            # One-off pillars are always fetched in full
+            return None
+        return (self.minion_id, self.opts["saltenv"], self.opts["pillarenv"])
+
+    def apply_delta(self, delta_key, ret_pillar):
+        """
+        Apply a delta reply of the master to the last pillar received from it.
+        Return the new pillar or ``None`` if the delta could not be applied.
+        """
+        if not isinstance(ret_pillar, dict):
+            return ret_pillar
+        delta = ret_pillar.get(PILLAR_DELTA_KEY)
+        if not isinstance(delta, dict) or len(ret_pillar) != 1:
+            # The master sent the full pillar
+            new_hash = pillar_hash(ret_pillar)
+            if new_hash is not None:
+                _PILLAR_DELTA_BASE[delta_key] = {
+                    "hash": new_hash,
+                    "pillar": copy.deepcopy(ret_pillar),
+                }
+            return ret_pillar
+        base = _PILLAR_DELTA_BASE.get(delta_key)
+        if base is None:
+            log.warning("Got a pillar delta from the master without a base pillar")
+            return None
+        if "diff" in delta:
+            new_pillar = apply_pillar_diff(base["pillar"], delta["diff"])
+            new_hash = pillar_hash(new_pillar)
+        else:
+            log.debug("Pillar data is unchanged on the master")
+            new_pillar = base["pillar"]
+            new_hash = base["hash"]
+        if new_hash != delta.get("hash"):
+            log.warning(
+                "Pillar delta from the master does not match, fetching the full pillar"
+            )
+            _PILLAR_DELTA_BASE.pop(delta_key, None)
+            return None
+        _PILLAR_DELTA_BASE[delta_key] = {"hash": new_hash, "pillar": new_pillar}
+        # The minion modifies the pillar it receives, keep the base intact
+        return copy.deepcopy(new_pillar)
+
+    def grains_delta_key(self):
+        """
+        Return the key under which the last grains sent to the master are kept,
+        the masters of a multi-master minion each have their own base
+        """
+        master = self.opts.get("master")
+        if isinstance(master, list):
+            master = tuple(master)
+        return (master, self.opts.get("master_port"), self.minion_id)
+
+    def add_grains_delta(self, load):
+        """
+        Replace the grains in ``load`` by their changes since the grains last
+        sent to the master, when ``grains_delta`` is enabled. Return the hash
+        of the grains or ``None`` if they are sent in full as usual.
+        """
+        if not self.opts.get("grains_delta", False):
+            return None
+        grains_hash = pillar_hash(self.grains)
+        if grains_hash is None:
+            return None
+        base = _GRAINS_DELTA_BASE.get(self.grains_delta_key())
+        if base is None:
+            # Ask the master to keep the grains as the base of the next deltas
+            load["grains_hash"] = ""
+        else:
+            del load["grains"]
+            load["grains_hash"] = base["hash"]
+            load["grains_diff"] = pillar_diff(base["grains"], self.grains)
+            load["grains_new_hash"] = grains_hash
+        return grains_hash
+
+    def grains_delta_sent(self, load, grains_hash, ret_pillar):
+        """
+        Return ``False`` if the master could not apply the grains delta in
+        ``load``, which then holds the full grains to send again. Otherwise
+        record the grains as the base of the next deltas.
+        """
+        if "grains_diff" in load and (
+            not isinstance(ret_pillar, dict)
+            or ret_pillar.get(PILLAR_DELTA_KEY) == {"grains": False}
+        ):
+            log.debug("The master cannot apply the grains delta, sending all grains")
+            del load["grains_diff"]
+            del load["grains_new_hash"]
+            load["grains"] = self.grains
+            load["grains_hash"] = ""
+            return False
+        if isinstance(ret_pillar, dict):
+            _GRAINS_DELTA_BASE[self.grains_delta_key()] = {
+                "hash": grains_hash,
+                "grains": copy.deepcopy(self.grains),
+            }
+            if "grains_diff" in load:
+                # The master now has these grains, a request sent again only
+                # needs to confirm them
+                load["grains_hash"] = grains_hash
+                load["grains_diff"] = {}
+        return True
+
 
 class AsyncRemotePillar(RemotePillarMixin):
     """
@@ -197,10 +404,12 @@ class AsyncRemotePillar(RemotePillarMixin):
         pillar_override=None,
         pillarenv=None,
         extra_minion_data=None,
+        clean_cache=False,
     ):
         self.opts = opts
         self.opts["saltenv"] = saltenv
         self.ext = ext
+        self.clean_cache = clean_cache
         self.grains = grains
         self.minion_id = minion_id
         self.channel = salt.transport.client.AsyncReqChannel.factory(opts)
@@ -239,6 +448,42 @@ class AsyncRemotePillar(RemotePillarMixin):
         }
         if self.ext:
             load["ext"] = self.ext
+        if self.clean_cache:
+            load["clean_cache"] = self.clean_cache
+        delta_key = self.delta_key()
+        if delta_key is not None:
+            base = _PILLAR_DELTA_BASE.get(delta_key)
+            load["pillar_hash"] = base["hash"] if base else ""
+        grains_hash = self.add_grains_delta(load)
+        ret_pillar = yield self._send_load(load)
+        if grains_hash is not None and not self.grains_delta_sent(
+            load, grains_hash, ret_pillar
+        ):
+            ret_pillar = yield self._send_load(load)
+            self.grains_delta_sent(load, grains_hash, ret_pillar)
+
+        if delta_key is not None:
+            ret_pillar = self.apply_delta(delta_key, ret_pillar)
+            if ret_pillar is None:
+                # The delta could not be applied, fetch the full pillar
+                load["pillar_hash"] = ""
+                ret_pillar = yield self._send_load(load)
+                ret_pillar = self.apply_delta(delta_key, ret_pillar)
+
+        if not isinstance(ret_pillar, dict):
+            msg = "Got a bad pillar from master, type {}, expecting dict: {}".format(
+                type(ret_pillar).__name__, ret_pillar
+            )
+            log.error(msg)
+            # raise an exception! Pillar isn't empty, we can't sync it!
+            raise SaltClientError(msg)
+        raise salt.ext.tornado.gen.Return(ret_pillar)
+
+    @salt.ext.tornado.gen.coroutine
+    def _send_load(self, load):
+        """
+        Send a pillar request to the master and return its reply
+        """
         try:
             ret_pillar = yield self.channel.crypted_transfer_decode_dictentry(
                 load,
@@ -250,14 +495,6 @@ class AsyncRemotePillar(RemotePillarMixin):
         except Exception:  # pylint: disable=broad-except
             log.exception("Exception getting pillar:")
             raise SaltClientError("Exception getting pillar.")
-
-        if not isinstance(ret_pillar, dict):
-            msg = "Got a bad pillar from master, type {}, expecting dict: {}".format(
-                type(ret_pillar).__name__, ret_pillar
-            )
-            log.error(msg)
-            # raise an exception! Pillar isn't empty, we can't sync it!
-            raise SaltClientError(msg)
         raise salt.ext.tornado.gen.Return(ret_pillar)
 
     def destroy(self):
@@ -291,10 +528,12 @@ class RemotePillar(RemotePillarMixin):
         pillarenv=None,
         extra_minion_data=None,
         context=None,
+        clean_cache=False,
     ):
         self.opts = opts
         self.opts["saltenv"] = saltenv
         self.ext = ext
+        self.clean_cache = clean_cache
         self.grains = grains
         self.minion_id = minion_id
         self.channel = salt.transport.client.ReqChannel.factory(opts)
@@ -333,6 +572,8 @@ class RemotePillar(RemotePillarMixin):
         }
         if self.ext:
             load["ext"] = self.ext
+        if self.clean_cache:
+            load["clean_cache"] = self.clean_cache
         ret_pillar = self.channel.crypted_transfer_decode_dictentry(
             load,
             dictkey="pillar",
@@ -374,8 +615,20 @@ class PillarCache:
     {'minion_1':
         {'base': {'pilar_key_1' 'pillar_val_1'}
     }
+    ```
+
+    Along with the pillar dicts, the files and data sources they were compiled
+    from are stored under the ``__pillar_cache_deps__`` key of the minion. A
+    cached pillar is recompiled once one of those files has been modified, or
+    once the generation of one of its data sources has changed, for instance
+    because gitfs or git_pillar fetched new commits.
     """
 
+    DEPS_KEY = "__pillar_cache_deps__"
+    # The number of seconds after which the cache files are counted again, to
+    # account for the files added by the other processes
+    PRUNE_INTERVAL = 300
+
     # TODO ABC?
     def __init__(
         self,
@@ -389,6 +642,7 @@ class PillarCache:
         pillarenv=None,
         extra_minion_data=None,
         context=None,
+        clean_cache=False,
     ):
         # Yes, we need all of these because we need to route to the Pillar object
         # if we have no cache. This is another refactor target.
@@ -401,6 +655,9 @@ class PillarCache:
         self.functions = functions
         self.pillar_override = pillar_override
         self.pillarenv = pillarenv
+        self.clean_cache = clean_cache
+        # The dependencies of the last pillar compiled by fetch_pillar
+        self.deps = None
 
         if saltenv is None:
             self.saltenv = "base"
@@ -408,11 +665,23 @@ class PillarCache:
             self.saltenv = saltenv
 
         # Determine caching backend
-        self.cache = salt.utils.cache.CacheFactory.factory(
-            self.opts["pillar_cache_backend"],
-            self.opts["pillar_cache_ttl"],
-            minion_cache_path=self._minion_cache_path(minion_id),
-        )
+        if self.opts["pillar_cache_backend"] == "memory":
+            # The memory cache is shared by all the requests served by this
+            # process
+            global _MEMORY_PILLAR_CACHE
+            if _MEMORY_PILLAR_CACHE is None:
+                _MEMORY_PILLAR_CACHE = salt.utils.cache.CacheFactory.factory(
+                    "memory",
+                    self.opts["pillar_cache_ttl"],
+                    max_size=self.opts.get("pillar_cache_size", 0),
+                )
+            self.cache = _MEMORY_PILLAR_CACHE
+        else:
+            self.cache = salt.utils.cache.CacheFactory.factory(
+                self.opts["pillar_cache_backend"],
+                self.opts["pillar_cache_ttl"],
+                minion_cache_path=self._minion_cache_path(minion_id),
+            )
 
         self.context = context
 
@@ -424,6 +693,99 @@ class PillarCache:
         """
         return os.path.join(self.opts["cachedir"], "pillar_cache", minion_id)
 
+    def _prune(self):
+        """
+        Remove the least recently used minion cache files so that no more than
+        ``pillar_cache_size`` are kept. The files are only listed when the
+        files added since they were last counted may exceed the limit, or
+        after ``PRUNE_INTERVAL`` seconds.
+
+        Used only for disk-based backends
+        """
+        max_size = self.opts.get("pillar_cache_size", 0)
+        if not max_size or self.opts["pillar_cache_backend"] != "disk":
+            return
+        cache_dir = os.path.join(self.opts["cachedir"], "pillar_cache")
+        count, counted = _PILLAR_CACHE_COUNTS.get(cache_dir, (None, 0))
+        if count is not None:
+            count += 1
+            if count <= max_size and time.time() - counted < self.PRUNE_INTERVAL:
+                _PILLAR_CACHE_COUNTS[cache_dir] = (count, counted)
+                return
+        try:
+            paths = [
+                os.path.join(cache_dir, name)
+                for name in os.listdir(cache_dir)
+                if not name.startswith(".")
+            ]
+            paths.sort(key=os.path.getmtime)
+        except OSError:
+            return
+        _PILLAR_CACHE_COUNTS[cache_dir] = (min(len(paths), max_size), time.time())
+        for path in paths[: max(0, len(paths) - max_size)]:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            log.debug("Evicted pillar cache file %s", path)
+
+    def _dependencies(self, pillar):
+        """
+        Return the files and data source generations which the pillar data
+        compiled by ``pillar`` depends on
+        """
+        paths = set(pillar.sources)
+        # Adding or removing a file changes the mtime of its directory, which
+        # catches new SLS files matched by globs in the top file.
+        paths.update(os.path.dirname(path) for path in pillar.sources)
+        for roots in pillar.opts.get("pillar_roots", {}).values():
+            paths.update(roots)
+        files = {}
+        for path in paths:
+            try:
+                files[path] = os.path.getmtime(path)
+            except OSError:
+                files[path] = None
+        # Rendering the pillar may read files from the fileserver, by default
+        # from the base saltenv or the saltenv of the minion
+        sources = [
+            salt.utils.cache.fileserver_generation(saltenv)
+            for saltenv in sorted({"base", pillar.saltenv or "base"})
+        ]
+        if any(
+            isinstance(run, dict) and "git" in run
+            for run in pillar.opts.get("ext_pillar", [])
+        ):
+            sources.append("git_pillar")
+        return {
+            "files": files,
+            "generations": {
+                name: salt.utils.cache.get_generation(self.opts, name)
+                for name in sources
+            },
+        }
+
+    def _up_to_date(self, deps):
+        """
+        Return ``True`` if none of the dependencies of a cached pillar changed.
+        Pillars cached without their dependencies only expire with the TTL.
+        """
+        if not deps:
+            return True
+        for path, mtime in deps.get("files", {}).items():
+            try:
+                current = os.path.getmtime(path)
+            except OSError:
+                current = None
+            if current != mtime:
+                log.debug("Pillar cache file dependency %s changed", path)
+                return False
+        for name, generation in deps.get("generations", {}).items():
+            if salt.utils.cache.get_generation(self.opts, name) != generation:
+                log.debug("Pillar cache dependency %s changed", name)
+                return False
+        return True
+
     def fetch_pillar(self):
         """
         In the event of a cache miss, we need to incur the overhead of caching
@@ -441,7 +803,9 @@ class PillarCache:
             pillarenv=self.pillarenv,
             context=self.context,
         )
-        return fresh_pillar.compile_pillar()
+        ret = fresh_pillar.compile_pillar()
+        self.deps = self._dependencies(fresh_pillar)
+        return ret
 
     def clear_pillar(self):
         """
@@ -462,24 +826,42 @@ class PillarCache:
         else:
             cache_dict = self.cache._dict
 
+        if self.clean_cache and self.minion_id in self.cache:
+            log.debug("Clearing pillar cache for minion %s", self.minion_id)
+            del self.cache[self.minion_id]
+
         log.debug("Scanning cache: %s", cache_dict)
         # Check the cache!
         if self.minion_id in self.cache:  # Keyed by minion_id
             # TODO Compare grains, etc?
-            if self.pillarenv in self.cache[self.minion_id]:
+            minion_cache = self.cache[self.minion_id]
+            deps = minion_cache.get(self.DEPS_KEY, {}).get(self.pillarenv)
+            if self.pillarenv in minion_cache and self._up_to_date(deps):
                 # We have a cache hit! Send it back.
                 log.debug(
                     "Pillar cache hit for minion %s and pillarenv %s",
                     self.minion_id,
                     self.pillarenv,
                 )
-                return self.cache[self.minion_id][self.pillarenv]
+                if self.opts["pillar_cache_backend"] == "disk":
+                    try:
+                        # Mark the cache file as recently used
+                        os.utime(self._minion_cache_path(self.minion_id), None)
+                    except OSError:
+                        pass
+                return minion_cache[self.pillarenv]
             else:
-                # We found the minion but not the env. Store it.
+                # We found the minion but not the env, or the cached pillar is
+                # stale. Store it.
                 fresh_pillar = self.fetch_pillar()
 
-                minion_cache = self.cache[self.minion_id]
                 minion_cache[self.pillarenv] = fresh_pillar
+                if self.deps is not None:
+                    minion_cache.setdefault(self.DEPS_KEY, {})[
+                        self.pillarenv
+                    ] = self.deps
+                elif self.DEPS_KEY in minion_cache:
+                    minion_cache[self.DEPS_KEY].pop(self.pillarenv, None)
                 self.cache[self.minion_id] = minion_cache
 
                 log.debug(
@@ -491,12 +873,279 @@ class PillarCache:
         else:
             # We haven't seen this minion yet in the cache. Store it.
             fresh_pillar = self.fetch_pillar()
-            self.cache[self.minion_id] = {self.pillarenv: fresh_pillar}
+            minion_cache = {self.pillarenv: fresh_pillar}
+            if self.deps is not None:
+                minion_cache[self.DEPS_KEY] = {self.pillarenv: self.deps}
+            self.cache[self.minion_id] = minion_cache
+            self._prune()
             log.debug("Pillar cache miss for minion %s", self.minion_id)
             log.debug("Current pillar cache: %s", cache_dict)  # FIXME hack!
             return fresh_pillar
 
 
+class PillarRenderCache:
+    """
+    Keep the rendered output of pillar SLS files in memory so that they do not
+    have to be rendered again for every minion.
+
+    SLS files are inspected before they are rendered. Files which only use the
+    ``jinja``, ``yaml``, ``json``, ``yamlex`` and ``gpg`` renderers and whose
+    templates do not reference anything but literal grains are cached. The
+    cache key is the environment, the SLS name and the hash of the file. For
+    files referencing grains, the values of the referenced grains for the
+    minion are part of the key as well. Files which reference ``salt``,
+    ``pillar``, ``opts``, include other templates, use a Jinja filter reading
+    the network, the filesystem or the clock or use any other renderer are
+    never cached, unless they match one of the globs in
+    ``pillar_render_cache_static``.
+    """
+
+    CACHEABLE_RENDERERS = frozenset(("jinja", "yaml", "json", "yamlex", "gpg"))
+    # Template expressions
+    TEMPLATE_RE = re.compile(r"{{.*?}}|{%.*?%}", re.DOTALL)
+    # Anything which makes the rendered output depend on more than the
+    # contents of the file and the grains of the minion
+    UNCACHEABLE_RE = re.compile(
+        r"\b(?:salt|__salt__|pillar|__pillar__|__grains__|opts|__opts__|proxy|"
+        r"include|import|extends|import_yaml|import_json|import_text|random|"
+        r"random_hash|random_shuffle|random_sample|uuid|strftime)\b"
+    )
+    # The filters and globals registered by Salt which only transform their
+    # arguments. The others, like ``http_query``, ``dns_check`` or
+    # ``list_files``, read the network, the filesystem or the clock.
+    PURE_JINJA_NAMES = frozenset(
+        (
+            "append_dict_key_value",
+            "avg",
+            "base64_decode",
+            "base64_encode",
+            "check_whitelist_blacklist",
+            "compare_dicts",
+            "compare_lists",
+            "contains_whitespace",
+            "difference",
+            "exactly_n_true",
+            "exactly_one_true",
+            "extend_dict_key_value",
+            "filter_by_networks",
+            "hmac",
+            "hmac_compute",
+            "indent",
+            "intersect",
+            "ip_host",
+            "ipaddr",
+            "ipv4",
+            "ipv6",
+            "is_hex",
+            "is_ip",
+            "is_ipv4",
+            "is_ipv6",
+            "is_iter",
+            "is_list",
+            "json_decode_dict",
+            "json_decode_list",
+            "json_encode_dict",
+            "json_encode_list",
+            "json_query",
+            "mac_str_to_bytes",
+            "max",
+            "md5",
+            "min",
+            "mysql_to_dict",
+            "network_hosts",
+            "network_size",
+            "path_join",
+            "quote",
+            "raise",
+            "regex_escape",
+            "regex_match",
+            "regex_replace",
+            "regex_search",
+            "sequence",
+            "set_dict_key_value",
+            "sha1",
+            "sha256",
+            "sha512",
+            "skip",
+            "sorted_ignorecase",
+            "str_to_num",
+            "substring_in_list",
+            "symmetric_difference",
+            "to_bool",
+            "to_bytes",
+            "to_camelcase",
+            "to_num",
+            "to_snake_case",
+            "tojson",
+            "traverse",
+            "union",
+            "unique",
+            "update_dict_key_value",
+            "yaml_dquote",
+            "yaml_encode",
+            "yaml_squote",
+        )
+    )
+    # The names used in template expressions
+    NAME_RE = re.compile(r"\b[A-Za-z_]\w*\b")
+    # A grain read with a literal key, ``grains['os']``, ``grains.get('os')``
+    # or ``grains.os``. The names of the dict methods are not grains, calling
+    # them, ``grains.items()`` for instance, reads all of the grains.
+    GRAINS_RE = re.compile(
+        r"\bgrains(?:\s*\[\s*(['\"])([^'\"]+)\1\s*\]"
+        r"|\.get\(\s*(['\"])([^'\"]+)\3"
+        r"|\.(?!(?:{})\b)([A-Za-z_]\w*)\b(?!\s*\())".format(
+            "|".join(name for name in dir(dict) if not name.startswith("_"))
+        )
+    )
+
+    def __init__(self, size=1000):
+        self.size = size
+        self._cache = OrderedDict()
+        # Results of the inspection of SLS files, keyed by the file hash
+        self._analysis = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "uncacheable": 0}
+
+    def _lru_set(self, cache, key, value):
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > self.size:
+            cache.popitem(last=False)
+
+    def _renderers(self, first_line, default):
+        """
+        Return the names of the renderers used for a file
+        """
+        if first_line.startswith("#!") and not first_line.startswith("#!/"):
+            pipestr = first_line.strip()[2:]
+        else:
+            pipestr = default or ""
+        pipestr = OLD_STYLE_RENDERERS.get(pipestr, pipestr)
+        return [part.strip().split(" ", 1)[0] for part in pipestr.split("|")]
+
+    def _impure(self, name):
+        """
+        Return ``True`` if ``name`` is a filter or global registered by Salt
+        which does not only transform its arguments
+        """
+        if name in self.PURE_JINJA_NAMES:
+            return False
+        return (
+            name in JinjaFilter.salt_jinja_filters
+            or name in JinjaGlobal.salt_jinja_globals
+        )
+
+    def analyze(self, data, default_renderer):
+        """
+        Inspect the contents of a pillar SLS file. Return ``None`` if the
+        rendered output cannot be cached, otherwise return the sorted list of
+        top level grains referenced by the file.
+        """
+        first_line = data.split("\n", 1)[0]
+        renderers = self._renderers(first_line, default_renderer)
+        if not renderers or not self.CACHEABLE_RENDERERS.issuperset(renderers):
+            return None
+        if "jinja" not in renderers:
+            return []
+        grains = set()
+        for expr in self.TEMPLATE_RE.findall(data):
+            if self.UNCACHEABLE_RE.search(expr):
+                return None
+            if any(self._impure(name) for name in self.NAME_RE.findall(expr)):
+                return None
+            for match in self.GRAINS_RE.finditer(expr):
+                grain = match.group(2) or match.group(4) or match.group(5)
+                grains.add(grain.split(":", 1)[0])
+            if re.search(r"\bgrains\b", self.GRAINS_RE.sub("", expr)):
+                # The grains are referenced in a way which cannot be tracked,
+                # for instance with a variable as the key.
+                return None
+        return sorted(grains)
+
+    def key(self, path, saltenv, sls, opts):
+        """
+        Return the cache key for the rendered output of ``sls``, or ``None`` if
+        its output cannot be cached.
+        """
+        try:
+            with salt.utils.files.fopen(path, "rb") as fp_:
+                contents = fp_.read()
+        except OSError:
+            return None
+        digest = hashlib.sha256(contents).hexdigest()
+        if digest in self._analysis:
+            grains = self._analysis[digest]
+            self._analysis.move_to_end(digest)
+        else:
+            grains = self.analyze(
+                salt.utils.stringutils.to_unicode(contents, errors="replace"),
+                opts.get("renderer"),
+            )
+            self._lru_set(self._analysis, digest, grains)
+        if any(
+            fnmatch.fnmatch(sls, pattern)
+            for pattern in opts.get("pillar_render_cache_static") or []
+        ):
+            grains = []
+        if grains is None:
+            self.stats["uncacheable"] += 1
+            return None
+        if not grains:
+            return (saltenv, sls, digest)
+        minion_grains = opts.get("grains") or {}
+        subset = {grain: minion_grains.get(grain) for grain in grains}
+        return (
+            saltenv,
+            sls,
+            digest,
+            salt.utils.json.dumps(subset, sort_keys=True, default=repr),
+        )
+
+    def get(self, key):
+        """
+        Return a copy of the cached rendered output for ``key``, or ``None``
+        """
+        try:
+            state = self._cache[key]
+        except KeyError:
+            self.stats["misses"] += 1
+            return None
+        self._cache.move_to_end(key)
+        self.stats["hits"] += 1
+        return copy.deepcopy(state)
+
+    def store(self, key, state):
+        """
+        Store a copy of the rendered output for ``key``
+        """
+        self._lru_set(self._cache, key, copy.deepcopy(state))
+
+    def clear(self):
+        """
+        Clear the cached rendered output
+        """
+        self._cache.clear()
+        self._analysis.clear()
+
+
+_RENDER_CACHE = None
+
+
+def render_cache(opts):
+    """
+    Return the rendered pillar SLS cache of this process, or ``None`` if the
+    ``pillar_render_cache`` option is not enabled
+    """
+    global _RENDER_CACHE
+    if not opts.get("pillar_render_cache", False):
+        return None
+    size = opts.get("pillar_render_cache_size", 1000)
+    if _RENDER_CACHE is None:
+        _RENDER_CACHE = PillarRenderCache(size)
+    _RENDER_CACHE.size = size
+    return _RENDER_CACHE
+
+
 class Pillar:
     """
     Read over the pillar top files and render the pillar data
@@ -562,6 +1211,9 @@ class Pillar:
         if not isinstance(self.extra_minion_data, dict):
             self.extra_minion_data = {}
             log.error("Extra minion data must be a dictionary")
+        self.render_cache = render_cache(self.opts)
+        # The files the pillar data was rendered from
+        self.sources = set()
         self._closing = False
 
     def __valid_on_demand_ext_pillar(self, opts):
@@ -687,6 +1339,7 @@ class Pillar:
             for saltenv in saltenvs:
                 top = self.client.cache_file(self.opts["state_top"], saltenv)
                 if top:
+                    self.sources.add(top)
                     tops[saltenv].append(
                         compile_template(
                             top,
@@ -723,9 +1376,12 @@ class Pillar:
                     if sls in done[saltenv]:
                         continue
                     try:
+                        top = self.client.get_state(sls, saltenv).get("dest", False)
+                        if top:
+                            self.sources.add(top)
                         tops[saltenv].append(
                             compile_template(
-                                self.client.get_state(sls, saltenv).get("dest", False),
+                                top,
                                 self.rend,
                                 self.opts["renderer"],
                                 self.opts["renderer_blacklist"],
@@ -830,8 +1486,11 @@ class Pillar:
             if self.opts["pillarenv"]:
                 if saltenv != self.opts["pillarenv"]:
                     continue
+            confirm_top = salt.utils.topindex.confirm_top(
+                self.opts, body, self.matchers["confirm_top.confirm_top"]
+            )
             for match, data in body.items():
-                if self.matchers["confirm_top.confirm_top"](
+                if confirm_top(
                     match,
                     data,
                     self.opts.get("nodegroups", {}),
@@ -855,7 +1514,9 @@ class Pillar:
         errors = []
         state_data = self.client.get_state(sls, saltenv)
         fn_ = state_data.get("dest", False)
-        if not fn_:
+        if fn_:
+            self.sources.add(fn_)
+        else:
             if sls in self.ignored_pillars.get(saltenv, []):
                 log.debug(
                     "Skipping ignored and missing SLS '%s' in environment '%s'",
@@ -893,18 +1554,33 @@ class Pillar:
                 # return state, mods, errors
                 return None, mods, errors
         state = None
+        cache_key = None
+        if self.render_cache is not None and not defaults:
+            cache_key = self.render_cache.key(fn_, saltenv, sls, self.opts)
+            if cache_key is not None:
+                state = self.render_cache.get(cache_key)
+                if state is not None:
+                    log.debug(
+                        "Rendered pillar cache hit for SLS '%s' in environment '%s'",
+                        sls,
+                        saltenv,
+                    )
+                    cache_key = None
         try:
-            state = compile_template(
-                fn_,
-                self.rend,
-                self.opts["renderer"],
-                self.opts["renderer_blacklist"],
-                self.opts["renderer_whitelist"],
-                saltenv,
-                sls,
-                _pillar_rend=True,
-                **defaults
-            )
+            if state is None:
+                state = compile_template(
+                    fn_,
+                    self.rend,
+                    self.opts["renderer"],
+                    self.opts["renderer_blacklist"],
+                    self.opts["renderer_whitelist"],
+                    saltenv,
+                    sls,
+                    _pillar_rend=True,
+                    **defaults
+                )
+                if cache_key is not None and isinstance(state, dict):
+                    self.render_cache.store(cache_key, state)
         except Exception as exc:  # pylint: disable=broad-except
             msg = "Rendering SLS '{}' failed, render error:\n{}".format(sls, exc)
             log.critical(msg, exc_info=True)
@@ -1067,6 +1743,8 @@ class Pillar:
                         self.opts.get("pillar_merge_lists", False),
                     )
 
+        if self.render_cache is not None:
+            log.debug("Rendered pillar cache stats: %s", self.render_cache.stats)
         return pillar, errors
 
     def _external_pillar_data(self, pillar, val, key):
@@ -1151,6 +1829,11 @@ class Pillar:
                 self.opts.get("pillar_merge_lists", False),
             )
 
+        workers = self.opts.get("ext_pillar_workers", 1) or 1
+        timeout = self.opts.get("ext_pillar_timeout", 0) or None
+        if workers > 1 or timeout:
+            return self._ext_pillar_concurrent(pillar, errors, workers, timeout)
+
         for run in self.opts["ext_pillar"]:
             if not isinstance(run, dict):
                 errors.append('The "ext_pillar" option is malformed')
@@ -1189,6 +1872,133 @@ class Pillar:
                 ext = None
         return pillar, errors
 
+    def _ext_pillar_concurrent(self, pillar, errors, workers, timeout):
+        """
+        Render the external pillar data, running the external pillars in a
+        thread pool. External pillars listed in ``ext_pillar_sequential``
+        depend on the pillar data merged so far, so the external pillars
+        configured before them are merged before they are run. The results are
+        always merged in the configured order.
+        """
+        runs = []
+        for run in self.opts["ext_pillar"]:
+            if not isinstance(run, dict):
+                errors.append('The "ext_pillar" option is malformed')
+                log.critical(errors[-1])
+                return {}, errors
+            if next(iter(run.keys())) in self.opts.get("exclude_ext_pillar", []):
+                continue
+            for key, val in run.items():
+                if key not in self.ext_pillars:
+                    log.critical(
+                        "Specified ext_pillar interface %s is unavailable", key
+                    )
+                    continue
+                runs.append((key, val))
+
+        sequential = self.opts.get("ext_pillar_sequential") or []
+        started = {}
+
+        def _run(idx, key, val, pillar):
+            started[idx] = time.time()
+            return self._external_pillar_data(pillar, val, key)
+
+        def _collect(pillar, pending):
+            for idx, key, hung_key, future in pending:
+                while True:
+                    done, _ = concurrent.futures.wait([future], timeout=timeout)
+                    if done or idx in started:
+                        break
+                if not done:
+                    remaining = max(0, started[idx] + timeout - time.time())
+                    done, _ = concurrent.futures.wait([future], timeout=remaining)
+                if not done:
+                    errors.append(
+                        "Failed to load ext_pillar {}: timed out after {} "
+                        "seconds".format(key, timeout)
+                    )
+                    log.error(errors[-1])
+                    # The thread keeps running, do not start another one
+                    # until it is done
+                    with _HUNG_EXT_PILLARS_LOCK:
+                        _HUNG_EXT_PILLARS[hung_key] = future
+                    continue
+                try:
+                    ext = future.result()
+                except Exception as exc:  # pylint: disable=broad-except
+                    errors.append(
+                        "Failed to load ext_pillar {}: {}".format(
+                            key,
+                            exc.__str__(),
+                        )
+                    )
+                    log.error(
+                        "Exception caught loading ext_pillar '%s':\n%s",
+                        key,
+                        "".join(traceback.format_tb(exc.__traceback__)),
+                    )
+                    continue
+                log.profile(
+                    "Loaded ext_pillar %s in %.3f seconds",
+                    key,
+                    time.time() - started[idx],
+                )
+                if ext:
+                    pillar = merge(
+                        pillar,
+                        ext,
+                        self.merge_strategy,
+                        self.opts.get("renderer", "yaml"),
+                        self.opts.get("pillar_merge_lists", False),
+                    )
+            del pending[:]
+            return pillar
+
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+        try:
+            pending = []
+            for idx, (key, val) in enumerate(runs):
+                if key in sequential:
+                    pillar = _collect(pillar, pending)
+                hung_key = (key, repr(val))
+                with _HUNG_EXT_PILLARS_LOCK:
+                    hung = _HUNG_EXT_PILLARS.get(hung_key)
+                    if hung is not None and hung.done():
+                        del _HUNG_EXT_PILLARS[hung_key]
+                        hung = None
+                if hung is not None:
+                    errors.append(
+                        "Failed to load ext_pillar {}: a previous call which "
+                        "timed out is still running".format(key)
+                    )
+                    log.error(errors[-1])
+                    continue
+                # Each external pillar gets its own copy of the pillar data, as
+                # the results of the previous ones are merged into it while
+                # they run.
+                pending.append(
+                    (
+                        idx,
+                        key,
+                        hung_key,
+                        executor.submit(
+                            contextvars.copy_context().run,
+                            _run,
+                            idx,
+                            key,
+                            val,
+                            copy.deepcopy(pillar),
+                        ),
+                    )
+                )
+                if key in sequential:
+                    pillar = _collect(pillar, pending)
+            pillar = _collect(pillar, pending)
+        finally:
+            # Do not wait for the external pillars which timed out
+            executor.shutdown(wait=False)
+        return pillar, errors
+
     def compile_pillar(self, ext=True):
         """
         Render the pillar data and return
@@ -1214,6 +2024,8 @@ class Pillar:
         else:
             matches = self.top_matches(top)
             pillar, errors = self.render_pillar(matches)
+        # The Jinja environments of the pillar templates are not used again
+        salt.utils.templates.clear_jinja_envs()
         errors.extend(top_errors)
         if self.opts.get("pillar_opts", False):
             mopts = dict(self.opts)
@@ -12,11 +12,15 @@ The data sent to the state calls is as follows:
 """
 
 
+import collections
 import copy
 import datetime
 import fnmatch
+import heapq
 import importlib
 import logging
+import multiprocessing
+import multiprocessing.connection
 import os
 import random
 import re
@@ -29,6 +33,7 @@ from collections.abc import Mapping
 
 import salt.fileclient
 import salt.loader
+import salt.loader.lazy
 import salt.minion
 import salt.pillar
 import salt.syspaths as syspaths
@@ -42,9 +47,14 @@ import salt.utils.event
 import salt.utils.files
 import salt.utils.hashutils
 import salt.utils.immutabletypes as immutabletypes
+import salt.utils.jinja
 import salt.utils.msgpack
 import salt.utils.platform
 import salt.utils.process
+import salt.utils.renderprofile
+import salt.utils.statecache
+import salt.utils.templates
+import salt.utils.topindex
 import salt.utils.url
 
 # Explicit late import to avoid circular import. DO NOT MOVE THIS.
@@ -125,6 +135,28 @@ STATE_INTERNAL_KEYWORDS = STATE_REQUISITE_KEYWORDS.union(
     STATE_REQUISITE_IN_KEYWORDS
 ).union(STATE_RUNTIME_KEYWORDS)
 
+# The requisites which order the chunks run by the parallel executor
+PARALLEL_REQUISITES = (
+    "require",
+    "require_any",
+    "watch",
+    "watch_any",
+    "onfail",
+    "onfail_any",
+    "onfail_all",
+    "onchanges",
+    "onchanges_any",
+)
+# Chunks using these keywords are always run sequentially
+PARALLEL_UNSUPPORTED_KEYWORDS = (
+    "prereq",
+    "prerequired",
+    "__prereq__",
+    "__prerequired__",
+    "aggregate",
+)
+GLOB_CHARS = frozenset("*?[")
+
 
 def _odict_hashable(self):
     return id(self)
@@ -277,6 +309,158 @@ def find_sls_ids(sls, high):
     return ret
 
 
+class HighIndex:
+    """
+    Index of the high data used by ``State.requisite_in`` to look up the IDs
+    referenced by requisites without scanning all of the high data. The
+    lookups return the same results as ``find_name`` and ``find_sls_ids``.
+    """
+
+    def __init__(self, high):
+        self.high = high
+        self._args = {}
+        self._names = {}
+        self._sls = {}
+        for nid, item in high.items():
+            if not isinstance(item, dict):
+                continue
+            self._sls.setdefault(item.get("__sls__"), []).append(nid)
+            for state, run in item.items():
+                if state.startswith("__") or not isinstance(run, list):
+                    continue
+                for arg in run:
+                    if not isinstance(arg, dict):
+                        continue
+                    if "name" in arg and ishashable(arg["name"]):
+                        self._names.setdefault(arg["name"], (state, nid))
+                    if len(arg) != 1:
+                        continue
+                    value = arg[next(iter(arg))]
+                    if ishashable(value):
+                        self._args.setdefault((state, value), []).append(nid)
+
+    def find_name(self, name, state):
+        """
+        Return a list of (ID, state) tuples referencing the given name, see
+        ``find_name``
+        """
+        if name in self.high and state in self.high[name]:
+            return [(name, state)]
+        if not ishashable(name):
+            return find_name(name, state, self.high)
+        if state == "sls":
+            return [
+                (nid, next(iter(self.high[nid]))) for nid in self._sls.get(name, ())
+            ]
+        return [(nid, state) for nid in self._args.get((state, name), ())]
+
+    def find_sls_ids(self, sls):
+        """
+        Return a list of (ID, state) tuples of the IDs in the given sls, see
+        ``find_sls_ids``
+        """
+        if not ishashable(sls):
+            return find_sls_ids(sls, self.high)
+        return [
+            (nid, st_)
+            for nid in self._sls.get(sls, ())
+            for st_ in self.high[nid]
+            if not st_.startswith("__")
+        ]
+
+    def find_named(self, name):
+        """
+        Return the first (state, ID) tuple declaring the given ``name``
+        argument, or ``None``
+        """
+        if not ishashable(name):
+            return None
+        return self._names.get(name)
+
+
+class RequisiteIndex:
+    """
+    Index of the low chunks by name, id and sls used to resolve requisites
+    without scanning all of the chunks for every requisite. Glob requisites
+    are matched once per pattern and the result is cached.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self._size = len(chunks)
+        self._names = {}
+        self._sls = {}
+        self._globs = {}
+        for idx, chunk in enumerate(chunks):
+            for key in ("name", "__id__"):
+                value = chunk.get(key)
+                if isinstance(value, str):
+                    self._names.setdefault(os.path.normcase(value), set()).add(idx)
+            sls = chunk.get("__sls__")
+            if isinstance(sls, str):
+                self._sls.setdefault(os.path.normcase(sls), []).append(idx)
+
+    def valid_for(self, chunks):
+        """
+        Return ``True`` if the index was built from the given list of chunks
+        and the list has not changed in size since
+        """
+        return chunks is self.chunks and len(chunks) == self._size
+
+    def _match(self, key, pattern):
+        # Match the pattern with fnmatch the same way as scanning the chunks
+        # would, caching the result per pattern
+        try:
+            return self._globs[(key, pattern)]
+        except KeyError:
+            pass
+        if key == "sls":
+            ret = [
+                idx
+                for idx, chunk in enumerate(self.chunks)
+                if fnmatch.fnmatch(chunk["__sls__"], pattern)
+            ]
+        else:
+            ret = [
+                idx
+                for idx, chunk in enumerate(self.chunks)
+                if fnmatch.fnmatch(chunk["name"], pattern)
+                or fnmatch.fnmatch(chunk["__id__"], pattern)
+            ]
+        self._globs[(key, pattern)] = ret
+        return ret
+
+    def find_indexes(self, req_key, req_val):
+        """
+        Return the sorted indexes of the chunks matching the requisite
+        ``req_key: req_val``
+        """
+        if req_val is None or not self.chunks:
+            return []
+        if not isinstance(req_val, str):
+            raise TypeError(
+                "Invalid requisite value {!r} for {}".format(req_val, req_key)
+            )
+        if req_key == "sls":
+            if GLOB_CHARS.intersection(req_val):
+                return self._match("sls", req_val)
+            return self._sls.get(os.path.normcase(req_val), [])
+        if GLOB_CHARS.intersection(req_val):
+            found = self._match("name", req_val)
+        else:
+            found = sorted(self._names.get(os.path.normcase(req_val), ()))
+        if req_key == "id":
+            return found
+        return [idx for idx in found if self.chunks[idx]["state"] == req_key]
+
+    def find(self, req_key, req_val):
+        """
+        Return the chunks matching the requisite ``req_key: req_val`` in the
+        order of the chunks
+        """
+        return [self.chunks[idx] for idx in self.find_indexes(req_key, req_val)]
+
+
 def format_log(ret):
     """
     Format the state into a log message
@@ -769,6 +953,8 @@ class State:
         self.mod_init = set()
         self.pre = {}
         self.__run_num = 0
+        self._requisite_index = None
+        self.profile = None
         self.jid = jid
         self.instance_id = str(id(self))
         self.inject_globals = {}
@@ -1234,6 +1420,8 @@ class State:
                 log.error(
                     "Error encountered during module reload. Modules were not reloaded."
                 )
+        # What was installed may change the outcome of __virtual__
+        salt.loader.lazy.clear_virtual_cache(self.opts)
         self.load_modules()
         if not self.opts.get("local", False) and self.opts.get("multiprocessing", True):
             self.functions["saltutil.refresh_modules"]()
@@ -1787,6 +1975,7 @@ class State:
         disabled_reqs = self.opts.get("disabled_requisites", [])
         if not isinstance(disabled_reqs, list):
             disabled_reqs = [disabled_reqs]
+        high_index = HighIndex(high)
         for id_, body in high.items():
             if not isinstance(body, dict):
                 continue
@@ -1863,30 +2052,17 @@ class State:
                                         ]
                                         ind = {_ind_high[0]: ind}
                                     else:
-                                        found = False
-                                        for _id in iter(high):
-                                            for state in [
-                                                state
-                                                for state in iter(high[_id])
-                                                if not state.startswith("__")
-                                            ]:
-                                                for j in iter(high[_id][state]):
-                                                    if (
-                                                        isinstance(j, dict)
-                                                        and "name" in j
-                                                    ):
-                                                        if j["name"] == ind:
-                                                            ind = {state: _id}
-                                                            found = True
-                                        if not found:
+                                        named = high_index.find_named(ind)
+                                        if named is None:
                                             continue
+                                        ind = {named[0]: named[1]}
                                 if len(ind) < 1:
                                     continue
                                 pstate = next(iter(ind))
                                 pname = ind[pstate]
                                 if pstate == "sls":
                                     # Expand hinges here
-                                    hinges = find_sls_ids(pname, high)
+                                    hinges = high_index.find_sls_ids(pname)
                                 else:
                                     hinges.append((pname, pstate))
                                 if "." in pstate:
@@ -1915,7 +2091,7 @@ class State:
                                         )
                                     if key == "prereq":
                                         # Add prerequired to prereqs
-                                        ext_ids = find_name(name, _state, high)
+                                        ext_ids = high_index.find_name(name, _state)
                                         for ext_id, _req_state in ext_ids:
                                             if ext_id not in extend:
                                                 extend[ext_id] = OrderedDict()
@@ -1928,7 +2104,7 @@ class State:
                                     if key == "use_in":
                                         # Add the running states args to the
                                         # use_in states
-                                        ext_ids = find_name(name, _state, high)
+                                        ext_ids = high_index.find_name(name, _state)
                                         for ext_id, _req_state in ext_ids:
                                             if not ext_id:
                                                 continue
@@ -1955,7 +2131,7 @@ class State:
                                     if key == "use":
                                         # Add the use state's args to the
                                         # running state
-                                        ext_ids = find_name(name, _state, high)
+                                        ext_ids = high_index.find_name(name, _state)
                                         for ext_id, _req_state in ext_ids:
                                             if not ext_id:
                                                 continue
@@ -2519,20 +2695,26 @@ class State:
                         chunks.remove(low)
                         break
         running = {}
-        for low in chunks:
-            if "__FAILHARD__" in running:
-                running.pop("__FAILHARD__")
+        graph = self._requisite_graph(chunks)
+        if graph is not None:
+            running = self._call_chunks_parallel(chunks, graph)
+            if running.pop("__FAILHARD__", None):
                 return running
-            tag = _gen_tag(low)
-            if tag not in running:
-                # Check if this low chunk is paused
-                action = self.check_pause(low)
-                if action == "kill":
-                    break
-                running = self.call_chunk(low, running, chunks)
-                if self.check_failhard(low, running):
+        else:
+            for low in chunks:
+                if "__FAILHARD__" in running:
+                    running.pop("__FAILHARD__")
                     return running
-            self.active = set()
+                tag = _gen_tag(low)
+                if tag not in running:
+                    # Check if this low chunk is paused
+                    action = self.check_pause(low)
+                    if action == "kill":
+                        break
+                    running = self.call_chunk(low, running, chunks)
+                    if self.check_failhard(low, running):
+                        return running
+                self.active = set()
         while True:
             if self.reconcile_procs(running):
                 break
@@ -2540,6 +2722,353 @@ class State:
         ret = dict(list(disabled.items()) + list(running.items()))
         return ret
 
+    def _requisite_graph(self, chunks):
+        """
+        Return a list with the set of the indexes of the chunks which each
+        chunk requires, or ``None`` if the chunks are to be run sequentially.
+        The chunks are run sequentially if ``state_parallel_workers`` is not
+        set or if they use requisites or features which depend on the
+        sequential execution, such as ``prereq`` or aggregation.
+        """
+        workers = self.opts.get("state_parallel_workers") or 0
+        if (
+            workers < 2
+            or len(chunks) < 2
+            or salt.utils.platform.spawning_platform()
+            or self.functions["config.option"]("state_aggregate")
+        ):
+            return None
+        disabled_reqs = self.opts.get("disabled_requisites", [])
+        if not isinstance(disabled_reqs, list):
+            disabled_reqs = [disabled_reqs]
+        for low in chunks:
+            if any(key in low for key in PARALLEL_UNSUPPORTED_KEYWORDS):
+                return None
+        index = self.get_requisite_index(chunks)
+        graph = []
+        for idx, low in enumerate(chunks):
+            deps = set()
+            for r_state in PARALLEL_REQUISITES:
+                if r_state in disabled_reqs or not low.get(r_state):
+                    continue
+                for req in low[r_state]:
+                    if isinstance(req, str):
+                        req = {"id": req}
+                    req = trim_req(req)
+                    req_key = next(iter(req))
+                    req_val = req[req_key]
+                    if req_val is None:
+                        continue
+                    if not isinstance(req_val, str):
+                        # Let the sequential run report the invalid requisite
+                        return None
+                    deps.update(index.find_indexes(req_key, req_val))
+            deps.discard(idx)
+            graph.append(deps)
+        return graph
+
+    def _order_tiers(self, chunks):
+        """
+        Return the order tier of every chunk. A chunk only starts once all of
+        the chunks of the previous tiers are done. The orders assigned by
+        ``state_auto_order`` all belong to the same tier, so only the
+        ``order`` options set in the SLS files separate tiers.
+        """
+        # BaseHighState.iorder starts at 10000 and the order of the chunks
+        # without an order is 100 above the highest order
+        auto_max = 10100 + len(chunks)
+        tiers = []
+        tier = 0
+        prev = None
+        for low in chunks:
+            order = low.get("order")
+            if isinstance(order, (int, float)):
+                key = "auto" if 10000 <= order < auto_max else int(order)
+            else:
+                key = order
+            if tiers and key != prev:
+                tier += 1
+            prev = key
+            tiers.append(tier)
+        return tiers
+
+    @staticmethod
+    def _runs_in_parent(low):
+        """
+        Return ``True`` if the chunk reloads the modules, grains or pillar, in
+        which case it must run in the main process. The modules reloaded by
+        :py:meth:`check_refresh` for the other chunks, after a package or a
+        Python file was installed for instance, are reloaded by the main
+        process once the result of the chunk is merged.
+        """
+        return any(
+            low.get(key)
+            for key in (
+                "reload_modules",
+                "reload_grains",
+                "reload_pillar",
+                "force_reload_modules",
+            )
+        )
+
+    @staticmethod
+    def _runs_in_package_lane(low):
+        """
+        Return ``True`` if the chunk runs a package manager. The package
+        managers lock their database, so these chunks run one at a time, as
+        they would in a sequential run.
+        """
+        return low["state"] in ("pkg", "pkgrepo", "ports", "pip")
+
+    def _chunk_worker(self, conn, chunks):
+        """
+        Run the chunks sent by the main process in a worker process of the
+        parallel executor, and send the new entries of the running dictionary
+        back, until the main process sends ``None``
+        """
+        # The main process fires the events and refreshes its modules once
+        # the results are merged, the workers are then replaced
+        self.event = lambda *args, **kwargs: None
+        self.check_refresh = lambda data, ret: None
+        running = {}
+        while True:
+            try:
+                msg = conn.recv()
+            except (EOFError, OSError):
+                break
+            if msg is None:
+                break
+            low, new = msg
+            running.update(new)
+            done = set(running)
+            try:
+                self.call_chunk(low, running, chunks)
+                while not self.reconcile_procs(running):
+                    time.sleep(0.01)
+                ret = {tag: data for tag, data in running.items() if tag not in done}
+            except Exception:  # pylint: disable=broad-except
+                trb = traceback.format_exc()
+                ret = {
+                    _gen_tag(low): {
+                        "result": False,
+                        "name": low["name"],
+                        "changes": {},
+                        "comment": "An exception occurred in this state: {}".format(
+                            trb
+                        ),
+                        "__sls__": low.get("__sls__"),
+                    }
+                }
+                running.update(ret)
+            self.active = set()
+            try:
+                conn.send(ret)
+            except OSError:
+                break
+        conn.close()
+
+    def _call_chunks_parallel(self, chunks, graph):
+        """
+        Run the chunks on a bounded pool of worker processes, starting every
+        chunk as soon as the chunks it requires and the chunks of the
+        previous order tiers are done
+        """
+        workers = self.opts.get("state_parallel_workers")
+        tiers = self._order_tiers(chunks)
+        tier_left = collections.Counter(tiers)
+        tier = 0
+        waiting = [len(deps) for deps in graph]
+        dependents = [[] for _ in chunks]
+        for idx, deps in enumerate(graph):
+            for dep in deps:
+                dependents[dep].append(idx)
+        tags = {_gen_tag(low): idx for idx, low in enumerate(chunks)}
+        ready = [idx for idx, count in enumerate(waiting) if not count]
+        heapq.heapify(ready)
+        started = set()
+        done = set()
+        inflight = {}
+        running = {}
+        stop = False
+        # Whether a chunk running a package manager is in flight
+        lane_busy = False
+
+        def _done(new):
+            for tag in new:
+                idx = tags.get(tag)
+                if idx is None or idx in done:
+                    continue
+                done.add(idx)
+                started.add(idx)
+                tier_left[tiers[idx]] -= 1
+                for dependent in dependents[idx]:
+                    waiting[dependent] -= 1
+                    if not waiting[dependent]:
+                        heapq.heappush(ready, dependent)
+
+        def _failhard(low):
+            if "__FAILHARD__" in running or self.check_failhard(low, running):
+                running["__FAILHARD__"] = True
+                return True
+            return False
+
+        def _next():
+            # Return the next chunk which can be started, if any
+            nonlocal tier
+            while tier < len(chunks) and not tier_left[tier]:
+                tier += 1
+            while ready and ready[0] in started:
+                heapq.heappop(ready)
+            if ready and tiers[ready[0]] <= tier:
+                return heapq.heappop(ready)
+            return None
+
+        # The pool of worker processes, a worker is sent a chunk with the
+        # entries of the running dictionary it did not get yet
+        pool = []
+        idle = []
+
+        def _spawn():
+            conn, child_conn = multiprocessing.Pipe()
+            proc = salt.utils.process.Process(
+                target=self._chunk_worker, args=(child_conn, chunks)
+            )
+            proc.start()
+            child_conn.close()
+            worker = {"proc": proc, "conn": conn, "sent": set(), "retired": False}
+            pool.append(worker)
+            return worker
+
+        def _stop(worker):
+            pool.remove(worker)
+            try:
+                worker["conn"].send(None)
+            except OSError:
+                pass
+            worker["conn"].close()
+            worker["proc"].join()
+
+        def _recycle():
+            # The modules, grains or pillar of the main process were
+            # reloaded, the chunks started from now on run in new workers
+            for worker in list(pool):
+                worker["retired"] = True
+            while idle:
+                _stop(idle.pop())
+
+        def _call_in_parent(idx):
+            low = chunks[idx]
+            started.add(idx)
+            before = set(running)
+            functions = self.functions
+            self.call_chunk(low, running, chunks)
+            self.active = set()
+            new = [tag for tag in running if tag not in before]
+            new.append(_gen_tag(low))
+            if self._runs_in_parent(low) or self.functions is not functions:
+                _recycle()
+            _done(new)
+            return _failhard(low)
+
+        log.debug("Running %d state chunks with up to %d workers", len(chunks), workers)
+        try:
+            while len(done) < len(chunks) and (not stop or inflight):
+                deferred = []
+                while not stop and len(inflight) < workers:
+                    idx = _next()
+                    if idx is None:
+                        break
+                    low = chunks[idx]
+                    if lane_busy and self._runs_in_package_lane(low):
+                        deferred.append(idx)
+                        continue
+                    if self.check_pause(low) == "kill":
+                        stop = True
+                        break
+                    if self._runs_in_parent(low):
+                        stop = _call_in_parent(idx)
+                        continue
+                    started.add(idx)
+                    if self._runs_in_package_lane(low):
+                        lane_busy = True
+                    worker = idle.pop() if idle else _spawn()
+                    new = {
+                        tag: data
+                        for tag, data in running.items()
+                        if tag not in worker["sent"]
+                    }
+                    worker["sent"].update(new)
+                    try:
+                        worker["conn"].send((low, new))
+                    except OSError:
+                        pass
+                    inflight[worker["conn"]] = (idx, worker)
+                for idx in deferred:
+                    heapq.heappush(ready, idx)
+                if not inflight:
+                    if not stop and len(done) < len(chunks):
+                        # The remaining chunks require each other or chunks of
+                        # later order tiers, run the next one the sequential way
+                        stop = _call_in_parent(min(set(range(len(chunks))) - done))
+                    continue
+                for conn in multiprocessing.connection.wait(list(inflight)):
+                    idx, worker = inflight.pop(conn)
+                    low = chunks[idx]
+                    if self._runs_in_package_lane(low):
+                        lane_busy = False
+                    try:
+                        ret = conn.recv()
+                    except (EOFError, OSError):
+                        ret = {
+                            _gen_tag(low): {
+                                "result": False,
+                                "name": low["name"],
+                                "changes": {},
+                                "comment": "Parallel process failed to return",
+                                "__sls__": low.get("__sls__"),
+                            }
+                        }
+                        worker["retired"] = True
+                    if worker["retired"]:
+                        _stop(worker)
+                    else:
+                        # The worker has the entries it added
+                        worker["sent"].update(ret)
+                        idle.append(worker)
+                    if ret.pop("__FAILHARD__", False):
+                        running["__FAILHARD__"] = True
+                    for tag, data in sorted(
+                        ret.items(), key=lambda item: item[1].get("__run_num__", 0)
+                    ):
+                        if tag in running:
+                            continue
+                        data["__run_num__"] = self.__run_num
+                        self.__run_num += 1
+                        running[tag] = data
+                        if tag == _gen_tag(low):
+                            self.event(
+                                data, len(chunks), fire_event=low.get("fire_event")
+                            )
+                    # The chunk and the chunks it required ran in the worker,
+                    # which does not refresh its modules
+                    functions = self.functions
+                    for tag, data in ret.items():
+                        if tag in tags:
+                            self.check_refresh(chunks[tags[tag]], data)
+                    if self.functions is not functions:
+                        _recycle()
+                    _done(list(ret) + [_gen_tag(low)])
+                    if _failhard(low):
+                        stop = True
+        finally:
+            for worker in list(pool):
+                if worker["conn"] not in inflight:
+                    _stop(worker)
+            for conn, (_, worker) in inflight.items():
+                worker["proc"].terminate()
+                worker["proc"].join()
+        return running
+
     def check_failhard(self, low, running):
         """
         Check if the low data chunk should send a failhard signal
@@ -2637,6 +3166,15 @@ class State:
                     retset.add(False)
         return False not in retset
 
+    def get_requisite_index(self, chunks):
+        """
+        Return the requisite index of the given chunks, building it if the
+        chunks changed since the last call
+        """
+        if self._requisite_index is None or not self._requisite_index.valid_for(chunks):
+            self._requisite_index = RequisiteIndex(chunks)
+        return self._requisite_index
+
     def check_requisite(self, low, running, chunks, pre=False):
         """
         Look into the running data to check the status of all requisite
@@ -2698,6 +3236,7 @@ class State:
         }
         if pre:
             reqs["prerequired"] = []
+        index = self.get_requisite_index(chunks)
         for r_state in reqs:
             if r_state in low and low[r_state] is not None:
                 if r_state in disabled_reqs:
@@ -2709,43 +3248,22 @@ class State:
                     if isinstance(req, str):
                         req = {"id": req}
                     req = trim_req(req)
-                    found = False
-                    for chunk in chunks:
-                        req_key = next(iter(req))
-                        req_val = req[req_key]
-                        if req_val is None:
-                            continue
-                        if req_key == "sls":
-                            # Allow requisite tracking of entire sls files
-                            if fnmatch.fnmatch(chunk["__sls__"], req_val):
-                                found = True
-                                reqs[r_state].append(chunk)
-                            continue
-                        try:
-                            if isinstance(req_val, str):
-                                if fnmatch.fnmatch(
-                                    chunk["name"], req_val
-                                ) or fnmatch.fnmatch(chunk["__id__"], req_val):
-                                    if req_key == "id" or chunk["state"] == req_key:
-                                        found = True
-                                        reqs[r_state].append(chunk)
-                            else:
-                                raise KeyError
-                        except KeyError as exc:
-                            raise SaltRenderError(
-                                "Could not locate requisite of [{}] present in state"
-                                " with name [{}]".format(req_key, chunk["name"])
-                            )
-                        except TypeError:
-                            # On Python 2, the above req_val, being an OrderedDict, will raise a KeyError,
-                            # however on Python 3 it will raise a TypeError
-                            # This was found when running tests.unit.test_state.StateCompilerTestCase.test_render_error_on_invalid_requisite
-                            raise SaltRenderError(
-                                "Could not locate requisite of [{}] present in state"
-                                " with name [{}]".format(req_key, chunk["name"])
-                            )
+                    req_key = next(iter(req))
+                    req_val = req[req_key]
+                    if (
+                        req_val is not None
+                        and not isinstance(req_val, str)
+                        and req_key != "sls"
+                        and chunks
+                    ):
+                        raise SaltRenderError(
+                            "Could not locate requisite of [{}] present in state"
+                            " with name [{}]".format(req_key, chunks[0]["name"])
+                        )
+                    found = index.find(req_key, req_val)
                     if not found:
                         return "unmet", ()
+                    reqs[r_state].extend(found)
         fun_stats = set()
         for r_state, chunks in reqs.items():
             req_stats = set()
@@ -2916,6 +3434,7 @@ class State:
         if status == "unmet":
             lost = {}
             reqs = []
+            index = self.get_requisite_index(chunks)
             for requisite in requisites:
                 lost[requisite] = []
                 if requisite not in low:
@@ -2924,30 +3443,15 @@ class State:
                     if isinstance(req, str):
                         req = {"id": req}
                     req = trim_req(req)
-                    found = False
                     req_key = next(iter(req))
                     req_val = req[req_key]
-                    for chunk in chunks:
-                        if req_val is None:
-                            continue
-                        if req_key == "sls":
-                            # Allow requisite tracking of entire sls files
-                            if fnmatch.fnmatch(chunk["__sls__"], req_val):
-                                if requisite == "prereq":
-                                    chunk["__prereq__"] = True
-                                reqs.append(chunk)
-                                found = True
-                            continue
-                        if fnmatch.fnmatch(chunk["name"], req_val) or fnmatch.fnmatch(
-                            chunk["__id__"], req_val
-                        ):
-                            if req_key == "id" or chunk["state"] == req_key:
-                                if requisite == "prereq":
-                                    chunk["__prereq__"] = True
-                                elif requisite == "prerequired":
-                                    chunk["__prerequired__"] = True
-                                reqs.append(chunk)
-                                found = True
+                    found = index.find(req_key, req_val)
+                    for chunk in found:
+                        if requisite == "prereq":
+                            chunk["__prereq__"] = True
+                        elif requisite == "prerequired" and req_key != "sls":
+                            chunk["__prerequired__"] = True
+                        reqs.append(chunk)
                     if not found:
                         lost[requisite].append(req)
             if (
@@ -3190,8 +3694,11 @@ class State:
         """
         listeners = []
         crefs = {}
+        refs = {}
         for chunk in chunks:
             crefs[(chunk["state"], chunk["__id__"], chunk["name"])] = chunk
+            refs.setdefault(chunk["__id__"], chunk)
+            refs.setdefault(chunk["name"], chunk)
             if "listen" in chunk:
                 listeners.append(
                     {(chunk["state"], chunk["__id__"], chunk["name"]): chunk["listen"]}
@@ -3202,6 +3709,11 @@ class State:
                         listeners.append(
                             {(key, val, "lookup"): [{chunk["state"]: chunk["__id__"]}]}
                         )
+        # Index the chunks by state and any of the state, id and name
+        cref_index = {}
+        for cref, data in crefs.items():
+            for value in set(cref):
+                cref_index.setdefault((cref[0], value), []).append(data)
 
         mod_watchers = []
         errors = {}
@@ -3209,18 +3721,12 @@ class State:
             for key, val in l_dict.items():
                 for listen_to in val:
                     if not isinstance(listen_to, dict):
-                        found = False
-                        for chunk in chunks:
-                            if (
-                                chunk["__id__"] == listen_to
-                                or chunk["name"] == listen_to
-                            ):
-                                listen_to = {chunk["state"]: chunk["__id__"]}
-                                found = True
-                        if not found:
+                        chunk = refs.get(listen_to) if ishashable(listen_to) else None
+                        if chunk is None:
                             continue
+                        listen_to = {chunk["state"]: chunk["__id__"]}
                     for lkey, lval in listen_to.items():
-                        if not any(lkey == cref[0] and lval in cref for cref in crefs):
+                        if not ishashable(lval) or (lkey, lval) not in cref_index:
                             rerror = {
                                 _l_tag(lkey, lval): {
                                     "comment": (
@@ -3235,19 +3741,12 @@ class State:
                             }
                             errors.update(rerror)
                             continue
-                        to_tags = [
-                            _gen_tag(data)
-                            for cref, data in crefs.items()
-                            if lkey == cref[0] and lval in cref
-                        ]
+                        to_tags = [_gen_tag(data) for data in cref_index[(lkey, lval)]]
                         for to_tag in to_tags:
                             if to_tag not in running:
                                 continue
                             if running[to_tag]["changes"]:
-                                if not any(
-                                    key[0] == cref[0] and key[1] in cref
-                                    for cref in crefs
-                                ):
+                                if (key[0], key[1]) not in cref_index:
                                     rerror = {
                                         _l_tag(key[0], key[1]): {
                                             "comment": (
@@ -3265,12 +3764,7 @@ class State:
                                     errors.update(rerror)
                                     continue
 
-                                new_chunks = [
-                                    data
-                                    for cref, data in crefs.items()
-                                    if key[0] == cref[0] and key[1] in cref
-                                ]
-                                for chunk in new_chunks:
+                                for chunk in cref_index[(key[0], key[1])]:
                                     low = chunk.copy()
                                     low["sfun"] = chunk["fun"]
                                     low["fun"] = "mod_watch"
@@ -3313,27 +3807,46 @@ class State:
         """
         Process a high data call and ensure the defined states.
         """
+        chunks, errors = self.compile_high(high, orchestration_jid)
+        if errors:
+            return errors
+        return self.call_low_chunks(chunks)
+
+    def compile_high(self, high, orchestration_jid=None):
+        """
+        Verify the high data and compile it into low chunks. Return a tuple of
+        the low chunks and a list of errors.
+        """
+        span = salt.utils.renderprofile.span
         self.inject_default_call(high)
         errors = []
         # If there is extension data reconcile it
-        high, ext_errors = self.reconcile_extend(high)
+        with span(self.profile, "reconcile_extend"):
+            high, ext_errors = self.reconcile_extend(high)
         errors.extend(ext_errors)
-        errors.extend(self.verify_high(high))
+        with span(self.profile, "verify_high"):
+            errors.extend(self.verify_high(high))
         if errors:
-            return errors
-        high, req_in_errors = self.requisite_in(high)
+            return [], errors
+        with span(self.profile, "requisite_in"):
+            high, req_in_errors = self.requisite_in(high)
         errors.extend(req_in_errors)
         high = self.apply_exclude(high)
         # Verify that the high data is structurally sound
         if errors:
-            return errors
+            return [], errors
         # Compile and verify the raw chunks
-        chunks = self.compile_high_data(high, orchestration_jid)
+        with span(self.profile, "compile_high_data"):
+            chunks = self.compile_high_data(high, orchestration_jid)
+        return chunks, errors
 
-        # If there are extensions in the highstate, process them and update
-        # the low data chunks
-        if errors:
-            return errors
+    def call_low_chunks(self, chunks, orchestration_jid=None):
+        """
+        Execute the low chunks compiled from high data and return the results
+        """
+        if orchestration_jid is not None:
+            for chunk in chunks:
+                chunk["__orchestration_jid__"] = orchestration_jid
         ret = self.call_chunks(chunks)
         ret = self.call_listen(chunks, ret)
         ret = self.call_beacons(chunks, ret)
@@ -3532,6 +4045,8 @@ class BaseHighState:
         self.iorder = 10000
         self.avail = self.__gather_avail()
         self.building_highstate = OrderedDict()
+        self.profile = None
+        self.template_sources = None
 
     def __gather_avail(self):
         """
@@ -3999,12 +4514,15 @@ class BaseHighState:
             if self.opts["saltenv"]:
                 if saltenv != self.opts["saltenv"]:
                     continue
+            confirm_top = salt.utils.topindex.confirm_top(
+                self.opts, body, self.matchers["confirm_top.confirm_top"]
+            )
             for match, data in body.items():
 
                 def _filter_matches(_match, _data, _opts):
                     if isinstance(_data, str):
                         _data = [_data]
-                    if self.matchers["confirm_top.confirm_top"](_match, _data, _opts):
+                    if confirm_top(_match, _data, _opts):
                         if saltenv not in matches:
                             matches[saltenv] = []
                         for item in _data:
@@ -4057,10 +4575,49 @@ class BaseHighState:
             self.state.opts["pillar"] = self.state._gather_pillar()
         self.state.module_refresh()
 
+    def start_render_profile(self):
+        """
+        Start recording the time spent to compile the highstate, see
+        :py:mod:`salt.utils.renderprofile`
+        """
+        self.profile = salt.utils.renderprofile.RenderProfile()
+        self.state.profile = self.profile
+        self.profile.track(self.client)
+        return self.profile
+
+    def stop_render_profile(self):
+        """
+        Stop recording the time spent to compile the highstate, write the
+        folded stacks to the cachedir and return the recorded data
+        """
+        profile = self.profile
+        if profile is None:
+            return {}
+        profile.untrack()
+        self.profile = self.state.profile = None
+        report = profile.report()
+        report["folded"] = profile.save(self.opts, self.state.jid)
+        log.info(
+            "Rendered %d SLS files in %s ms (%d of %d fetches cached), "
+            "render profile written to %s",
+            len(report["sls"]),
+            report["phases"].get("render_highstate", 0),
+            report["cache_hits"],
+            report["fetches"],
+            report["folded"],
+        )
+        return report
+
     def render_state(self, sls, saltenv, mods, matches, local=False, context=None):
         """
         Render a state file and retrieve all of the include states
         """
+        if self.profile is None:
+            return self._render_state(sls, saltenv, mods, matches, local, context)
+        with self.profile.sls(saltenv, sls):
+            return self._render_state(sls, saltenv, mods, matches, local, context)
+
+    def _render_state(self, sls, saltenv, mods, matches, local=False, context=None):
         errors = []
         if not local:
             state_data = self.client.get_state(sls, saltenv)
@@ -4083,6 +4640,9 @@ class BaseHighState:
                 # Make sure SaltCacheLoader use correct fileclient
                 if context is None:
                     context = {"fileclient": self.client}
+                if self.template_sources is not None:
+                    # Share the templates loaded by all the SLS of this run
+                    context = dict(context, _template_sources=self.template_sources)
                 state = compile_template(
                     fn_,
                     self.state.rend,
@@ -4093,6 +4653,7 @@ class BaseHighState:
                     sls,
                     rendered_sls=mods,
                     context=context,
+                    profile=self.profile,
                 )
             except SaltRenderError as exc:
                 msg = "Rendering SLS '{}:{}' failed: {}".format(saltenv, sls, exc)
@@ -4218,7 +4779,7 @@ class BaseHighState:
                             )
                             mod_tgt = "{}:{}".format(r_env, sls_target)
                             if mod_tgt not in mods:
-                                nstate, err = self.render_state(
+                                nstate, err = self._render_include(
                                     sls_target, r_env, mods, matches
                                 )
                                 if nstate:
@@ -4256,6 +4817,14 @@ class BaseHighState:
             state = {}
         return state, errors
 
+    def _render_include(self, sls, saltenv, mods, matches):
+        """
+        Render an SLS file included by another one, in the ``include`` frame
+        of the render profile
+        """
+        with salt.utils.renderprofile.span(self.profile, "include"):
+            return self.render_state(sls, saltenv, mods, matches)
+
     def _handle_iorder(self, state):
         """
         Take a state and apply the iorder system
@@ -4402,6 +4971,35 @@ class BaseHighState:
         Gather the state files and render them into a single unified salt
         high data structure.
         """
+        if self.template_sources is None:
+            self.template_sources = salt.utils.jinja.TemplateSourceCache()
+            parsed = salt.utils.jinja.parsed_data_cache.stats()
+            try:
+                return self._render_highstate(matches, context)
+            finally:
+                log.debug(
+                    "Loaded %d templates while rendering the highstate, %d times"
+                    " from the templates already loaded",
+                    len(self.template_sources.sources),
+                    self.template_sources.hits,
+                )
+                stats = salt.utils.jinja.parsed_data_cache.stats()
+                log.debug(
+                    "Deserialized YAML/JSON data %d times while rendering the"
+                    " highstate, reused cached data %d times",
+                    stats["misses"] - parsed["misses"],
+                    stats["hits"] - parsed["hits"],
+                )
+                if self.profile is not None:
+                    self.profile.parsed_data = {
+                        "parses": stats["misses"] - parsed["misses"],
+                        "hits": stats["hits"] - parsed["hits"],
+                    }
+                self.template_sources = None
+                salt.utils.templates.clear_jinja_envs()
+        return self._render_highstate(matches, context)
+
+    def _render_highstate(self, matches, context=None):
         highstate = self.building_highstate
         all_errors = []
         mods = set()
@@ -4511,6 +5109,56 @@ class BaseHighState:
                     ret_matches[env].append(sls)
         return ret_matches
 
+    def _render_call_highstate(self, ret, tag_name, exclude, force, whitelist):
+        """
+        Render the top file and the highstate for :py:meth:`call_highstate`.
+
+        Return the data :py:meth:`call_highstate` returns as is when the top
+        file cannot be used or ``None``, the matches, the high data and the
+        errors.
+        """
+        span = salt.utils.renderprofile.span
+        err = []
+        high = {}
+        try:
+            with span(self.profile, "top"):
+                top = self.get_top()
+        except SaltRenderError as exc:
+            ret[tag_name]["comment"] = "Unable to render top file: "
+            ret[tag_name]["comment"] += str(exc.error)
+            return ret, None, high, err
+        except Exception:  # pylint: disable=broad-except
+            trb = traceback.format_exc()
+            err.append(trb)
+            return err, None, high, err
+        err += self.verify_tops(top)
+        with span(self.profile, "top_matches"):
+            matches = self.top_matches(top)
+        if not matches:
+            msg = (
+                "No Top file or master_tops data matches found. Please see "
+                "master log for details."
+            )
+            ret[tag_name]["comment"] = msg
+            return ret, matches, high, err
+        matches = self.matches_whitelist(matches, whitelist)
+        self.load_dynamic(matches)
+        if not self._check_pillar(force):
+            err += ["Pillar failed to render with the following messages:"]
+            err += self.state.opts["pillar"]["_errors"]
+        else:
+            with span(self.profile, "render_highstate"):
+                high, errors = self.render_highstate(matches)
+            if exclude:
+                if isinstance(exclude, str):
+                    exclude = exclude.split(",")
+                if "__exclude__" in high:
+                    high["__exclude__"].extend(exclude)
+                else:
+                    high["__exclude__"] = exclude
+            err += errors
+        return None, matches, high, err
+
     def call_highstate(
         self,
         exclude=None,
@@ -4541,42 +5189,38 @@ class BaseHighState:
                 with salt.utils.files.fopen(cfn, "rb") as fp_:
                     high = salt.payload.load(fp_)
                     return self.state.call_high(high, orchestration_jid)
+        span = salt.utils.renderprofile.span
+        if salt.utils.renderprofile.enabled(self.opts):
+            self.start_render_profile()
+        compile_cache = None
+        if salt.utils.statecache.enabled(self.opts) and self._check_pillar():
+            compile_cache = salt.utils.statecache.CompiledHighStateCache(
+                self, cache_name
+            )
+            with span(self.profile, "compile_cache"):
+                compiled = compile_cache.fetch(exclude, whitelist)
+            if compiled is not None:
+                self.stop_render_profile()
+                self.load_dynamic(compiled["matches"])
+                ret = self.state.call_low_chunks(compiled["chunks"], orchestration_jid)
+                ret.update(compile_cache.state_return())
+                return ret
+            compile_cache.track()
         # File exists so continue
-        err = []
         try:
-            top = self.get_top()
-        except SaltRenderError as err:
-            ret[tag_name]["comment"] = "Unable to render top file: "
-            ret[tag_name]["comment"] += str(err.error)
-            return ret
-        except Exception:  # pylint: disable=broad-except
-            trb = traceback.format_exc()
-            err.append(trb)
-            return err
-        err += self.verify_tops(top)
-        matches = self.top_matches(top)
-        if not matches:
-            msg = (
-                "No Top file or master_tops data matches found. Please see "
-                "master log for details."
+            early_ret, matches, high, err = self._render_call_highstate(
+                ret, tag_name, exclude, force, whitelist
             )
-            ret[tag_name]["comment"] = msg
-            return ret
-        matches = self.matches_whitelist(matches, whitelist)
-        self.load_dynamic(matches)
-        if not self._check_pillar(force):
-            err += ["Pillar failed to render with the following messages:"]
-            err += self.state.opts["pillar"]["_errors"]
-        else:
-            high, errors = self.render_highstate(matches)
-            if exclude:
-                if isinstance(exclude, str):
-                    exclude = exclude.split(",")
-                if "__exclude__" in high:
-                    high["__exclude__"].extend(exclude)
-                else:
-                    high["__exclude__"] = exclude
-            err += errors
+        except Exception:  # pylint: disable=broad-except
+            self.stop_render_profile()
+            raise
+        finally:
+            if compile_cache is not None:
+                compile_cache.untrack()
+        if early_ret is not None or err or not high:
+            self.stop_render_profile()
+        if early_ret is not None:
+            return early_ret
         if err:
             return err
         if not high:
@@ -4599,22 +5243,43 @@ class BaseHighState:
             except OSError:
                 log.error('Unable to write to "state.highstate" cache file %s', cfn)
 
-        return self.state.call_high(high, orchestration_jid)
+        if compile_cache is None and self.profile is None:
+            return self.state.call_high(high, orchestration_jid)
+        chunks, errors = self.state.compile_high(high)
+        self.stop_render_profile()
+        if errors:
+            return errors
+        if compile_cache is None:
+            return self.state.call_low_chunks(chunks, orchestration_jid)
+        compile_cache.store(matches, chunks)
+        ret = self.state.call_low_chunks(chunks, orchestration_jid)
+        ret.update(compile_cache.state_return())
+        return ret
 
     def compile_highstate(self):
         """
         Return just the highstate or the errors
         """
+        span = salt.utils.renderprofile.span
         err = []
-        top = self.get_top()
+        with span(self.profile, "top"):
+            top = self.get_top()
         err += self.verify_tops(top)
-        matches = self.top_matches(top)
-        high, errors = self.render_highstate(matches)
+        with span(self.profile, "top_matches"):
+            matches = self.top_matches(top)
+        with span(self.profile, "render_highstate"):
+            high, errors = self.render_highstate(matches)
         err += errors
 
         if err:
             return err
 
+        if self.profile is not None:
+            # The high data is not verified here, the profile reports how long
+            # its verification takes when the highstate runs
+            with span(self.profile, "verify_high"):
+                self.state.verify_high(high)
+
         return high
 
     def compile_low_chunks(self):
@@ -33,6 +33,7 @@ def compile_template(
     sls="",
     input_data="",
     context=None,
+    profile=None,
     **kwargs
 ):
     """
@@ -45,6 +46,10 @@ def compile_template(
         Mask value for debugging purposes (prevent sensitive information etc)
         example: "mask_value="pass*". All "passwd", "password", "pass" will
         be masked (as text).
+
+    :param profile:
+        A :py:class:`salt.utils.renderprofile.RenderProfile` recording the
+        time spent in each renderer of the render pipe
     """
 
     # if any error occurs, we return an empty dictionary
@@ -95,12 +100,17 @@ def compile_template(
         render_kwargs.update(kwargs)
         if argline:
             render_kwargs["argline"] = argline
+        renderer = render.__module__.split(".")[-1]
         start = time.time()
-        ret = render(input_data, saltenv, sls, **render_kwargs)
+        if profile is not None:
+            with profile.renderer(renderer):
+                ret = render(input_data, saltenv, sls, **render_kwargs)
+        else:
+            ret = render(input_data, saltenv, sls, **render_kwargs)
         log.profile(
             "Time (in seconds) to render '%s' using '%s' renderer: %s",
             template,
-            render.__module__.split(".")[-1],
+            renderer,
             time.time() - start,
         )
         if ret is None:
@@ -2,8 +2,12 @@
 Utilies for beacons
 """
 
+import contextlib
 import copy
 
+# The metrics sampled during the current beacons pass, see sampling_pass
+_SAMPLES = None
+
 
 def remove_hidden_options(config, whitelist):
     """
@@ -24,3 +28,32 @@ def list_to_dict(config):
     _config = {}
     list(map(_config.update, config))
     return _config
+
+
+@contextlib.contextmanager
+def sampling_pass():
+    """
+    Share the metrics sampled with :py:func:`sample` between the beacons run
+    within the block, so that each metric is sampled once per pass
+    """
+    global _SAMPLES
+    previous = _SAMPLES
+    _SAMPLES = {}
+    try:
+        yield
+    finally:
+        _SAMPLES = previous
+
+
+def sample(key, func, *args, **kwargs):
+    """
+    Return ``func(*args, **kwargs)``. During a :py:func:`sampling_pass`,
+    ``func`` is only called once for a given ``key`` and arguments, the
+    beacons sampling the same metric get the same value.
+    """
+    if _SAMPLES is None:
+        return func(*args, **kwargs)
+    sample_key = (key, args, tuple(sorted(kwargs.items())))
+    if sample_key not in _SAMPLES:
+        _SAMPLES[sample_key] = func(*args, **kwargs)
+    return _SAMPLES[sample_key]
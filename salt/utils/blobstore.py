@@ -0,0 +1,270 @@
+"""
+Content-addressed storage for files cached by the minion file client
+
+.. versionadded:: 3005
+
+Files fetched from the master are stored once per content hash under
+``<cachedir>/blobs/<hash_type>/<xx>/<hash>`` and the per-saltenv views in
+``<cachedir>/files/<saltenv>/...`` are hard links to those blobs. This means
+that identical files served from many environments (for example gitfs
+branches mapped to environments) only use disk space once, and a file which
+the master reports with a hash that is already present in the store does not
+need to be transferred again.
+"""
+
+import errno
+import logging
+import os
+import shutil
+import time
+
+import salt.utils.files
+import salt.utils.hashutils
+import salt.utils.path
+import salt.utils.stringutils
+
+log = logging.getLogger(__name__)
+
+# Adding blobs prunes the store at most once per this many seconds
+PRUNE_INTERVAL = 300
+
+
+def enabled(opts):
+    """
+    Return ``True`` if the content-addressed file cache is enabled
+    """
+    return bool(opts.get("file_client_blob_cache", False))
+
+
+class BlobStore:
+    """
+    A content-addressed store of cached files with an LRU size cap
+
+    Blobs are kept in the minion cachedir. A blob shares its inode with the
+    cached files linked to it, so its last use is recorded in the modification
+    time of an empty file under ``blobs/.access``, which is what
+    :py:meth:`prune` uses to decide which blobs were least recently used.
+    """
+
+    def __init__(self, opts):
+        self.opts = opts
+        self.root = os.path.join(opts["cachedir"], "blobs")
+        self.access_root = os.path.join(self.root, ".access")
+        self.prune_stamp = os.path.join(self.root, ".pruned")
+        # The size cap is configured in megabytes, 0 disables eviction
+        self.max_size = int(opts.get("file_client_blob_cache_max_size", 0)) * 1048576
+
+    @staticmethod
+    def _unpack_hash(hash_info):
+        """
+        Return a tuple of (hash_type, hsum) from the dict returned by the
+        fileserver ``_file_hash`` command, or ``(None, None)``
+        """
+        try:
+            hsum = hash_info["hsum"]
+            hash_type = hash_info["hash_type"]
+        except (KeyError, TypeError):
+            return None, None
+        if not hsum or not hash_type:
+            return None, None
+        return (
+            salt.utils.stringutils.to_str(hash_type),
+            salt.utils.stringutils.to_str(hsum),
+        )
+
+    def blob_path(self, hash_info):
+        """
+        Return the path at which the blob for ``hash_info`` is stored, or
+        ``None`` if the hash information is not usable
+        """
+        hash_type, hsum = self._unpack_hash(hash_info)
+        if hsum is None or not hsum.isalnum() or not hash_type.isalnum():
+            return None
+        return os.path.join(self.root, hash_type, hsum[:2], hsum)
+
+    def find(self, hash_info):
+        """
+        Return the path to the blob matching ``hash_info`` if it is present in
+        the store, otherwise return ``None``
+        """
+        path = self.blob_path(hash_info)
+        if path is None or not os.path.isfile(path):
+            return None
+        self._touch(path)
+        return path
+
+    def _access_path(self, blob):
+        return os.path.join(self.access_root, os.path.relpath(blob, self.root))
+
+    def _touch(self, blob):
+        """
+        Mark ``blob`` as recently used
+        """
+        path = self._access_path(blob)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with salt.utils.files.fopen(path, "a"):
+                pass
+            os.utime(path, None)
+        except OSError as exc:
+            log.debug("Unable to record the use of blob %s: %s", blob, exc)
+
+    def add(self, path, hash_info):
+        """
+        Add the file at ``path`` to the store, verifying that its contents
+        match ``hash_info``. Return the path to the blob or ``None`` if the
+        file could not be stored.
+        """
+        blob = self.blob_path(hash_info)
+        if blob is None or not os.path.isfile(path):
+            return None
+        if os.path.isfile(blob):
+            return self.find(hash_info)
+        hash_type, hsum = self._unpack_hash(hash_info)
+        if salt.utils.hashutils.get_hash(path, form=hash_type) != hsum:
+            log.debug("Not adding %s to the blob cache, hash mismatch", path)
+            return None
+        try:
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            os.link(path, blob)
+        except OSError as exc:
+            if exc.errno == errno.EEXIST:
+                return blob
+            log.debug("Unable to add %s to the blob cache: %s", path, exc)
+            return None
+        self._touch(blob)
+        self._prune_due()
+        return blob
+
+    def _prune_due(self):
+        """
+        Prune the store if it was not pruned in the last ``PRUNE_INTERVAL``
+        seconds, walking the store on every added blob would not scale
+        """
+        if self.max_size <= 0:
+            return
+        try:
+            if time.time() - os.stat(self.prune_stamp).st_mtime < PRUNE_INTERVAL:
+                return
+        except OSError:
+            pass
+        try:
+            with salt.utils.files.fopen(self.prune_stamp, "a"):
+                pass
+            os.utime(self.prune_stamp, None)
+        except OSError:
+            pass
+        self.prune()
+
+    def materialize(self, hash_info, dest, link=True):
+        """
+        Place the blob matching ``hash_info`` at ``dest``. When ``link`` is
+        ``True`` a hard link is used if possible, otherwise the blob is copied.
+        Return ``True`` if ``dest`` was populated from the store.
+        """
+        blob = self.find(hash_info)
+        if blob is None:
+            return False
+        destdir = os.path.dirname(dest)
+        try:
+            if os.path.isdir(dest):
+                salt.utils.files.rm_rf(dest)
+            elif os.path.lexists(dest):
+                os.remove(dest)
+            os.makedirs(destdir, exist_ok=True)
+        except OSError as exc:
+            log.debug("Unable to prepare %s for the blob cache: %s", dest, exc)
+            return False
+        if link:
+            try:
+                os.link(blob, dest)
+                return True
+            except OSError as exc:
+                log.debug("Unable to link %s to %s, copying: %s", blob, dest, exc)
+        try:
+            shutil.copyfile(blob, dest)
+        except OSError as exc:
+            log.debug("Unable to copy %s to %s: %s", blob, dest, exc)
+            return False
+        return True
+
+    def unshare(self, path):
+        """
+        Remove ``path`` if it is a hard link to a blob, so that writing to it
+        does not modify the blob in place
+        """
+        try:
+            if os.path.isfile(path) and os.stat(path).st_nlink > 1:
+                os.remove(path)
+        except OSError:
+            pass
+
+    def prune(self):
+        """
+        Evict the least recently used blobs until the store is within
+        ``file_client_blob_cache_max_size``, along with the cached files linked
+        to them which would otherwise keep their data on disk. Return the
+        number of evicted blobs.
+        """
+        if self.max_size <= 0 or not os.path.isdir(self.root):
+            return 0
+        blobs = []
+        total = 0
+        for hash_type in os.listdir(self.root):
+            if hash_type.startswith("."):
+                continue
+            for root, _, files in salt.utils.path.os_walk(
+                os.path.join(self.root, hash_type)
+            ):
+                for name in files:
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    try:
+                        used = os.stat(self._access_path(path)).st_mtime
+                    except OSError:
+                        used = stat.st_mtime
+                    total += stat.st_size
+                    blobs.append((used, stat.st_size, path, stat))
+        evicted = 0
+        if total <= self.max_size:
+            return evicted
+        linked = set()
+        blobs.sort(key=lambda blob: blob[:3])
+        for _, size, path, stat in blobs:
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            try:
+                os.remove(self._access_path(path))
+            except OSError:
+                pass
+            if stat.st_nlink > 1:
+                linked.add((stat.st_dev, stat.st_ino))
+            total -= size
+            evicted += 1
+        if linked:
+            self._evict_views(linked)
+        log.debug("Evicted %d blob(s) from the blob cache", evicted)
+        return evicted
+
+    def _evict_views(self, inodes):
+        """
+        Remove the cached files which are links to the evicted blobs, given as
+        a set of ``(st_dev, st_ino)`` tuples
+        """
+        filesdir = os.path.join(self.opts["cachedir"], "files")
+        for root, _, files in salt.utils.path.os_walk(filesdir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.lstat(path)
+                    if (stat.st_dev, stat.st_ino) in inodes:
+                        os.remove(path)
+                except OSError:
+                    continue
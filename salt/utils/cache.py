@@ -7,6 +7,8 @@ import logging
 import os
 import re
 import time
+import urllib.parse
+import uuid
 
 import salt.config
 import salt.payload
@@ -29,6 +31,8 @@ class CacheFactory:
     def factory(cls, backend, ttl, *args, **kwargs):
         log.debug("Factory backend: %s", backend)
         if backend == "memory":
+            # The path is only used by the disk backend
+            kwargs.pop("minion_cache_path", None)
             return CacheDict(ttl, *args, **kwargs)
         elif backend == "disk":
             return CacheDisk(ttl, kwargs["minion_cache_path"], *args, **kwargs)
@@ -39,13 +43,37 @@ class CacheFactory:
 class CacheDict(dict):
     """
     Subclass of dict that will lazily delete items past ttl
+
+    .. versionchanged:: 3005
+        If ``max_size`` is set, the least recently used items are deleted
+        once the dict holds more than ``max_size`` items.
     """
 
-    def __init__(self, ttl, *args, **kwargs):
+    def __init__(self, ttl, *args, max_size=0, **kwargs):
         dict.__init__(self, *args, **kwargs)
         self._ttl = ttl
+        self._max_size = max_size
         self._key_cache_time = {}
 
+    def _enforce_max_size(self):
+        """
+        Delete the least recently used items until there are no more than
+        ``max_size`` items left
+        """
+        if not self._max_size:
+            return
+        while dict.__len__(self) > self._max_size:
+            key = next(iter(dict.keys(self)))
+            self._key_cache_time.pop(key, None)
+            dict.__delitem__(self, key)
+
+    def _touch(self, key):
+        """
+        Mark a key as the most recently used one
+        """
+        if self._max_size and dict.__contains__(self, key):
+            dict.__setitem__(self, key, dict.pop(self, key))
+
     def _enforce_ttl_key(self, key):
         """
         Enforce the TTL to a specific key, delete if its past TTL
@@ -61,6 +89,7 @@ class CacheDict(dict):
         Check if the key is ttld out, then do the get
         """
         self._enforce_ttl_key(key)
+        self._touch(key)
         return dict.__getitem__(self, key)
 
     def __setitem__(self, key, val):
@@ -68,7 +97,16 @@ class CacheDict(dict):
         Make sure to update the key cache time
         """
         self._key_cache_time[key] = time.time()
+        self._touch(key)
         dict.__setitem__(self, key, val)
+        self._enforce_max_size()
+
+    def __delitem__(self, key):
+        """
+        Make sure to remove the key cache time
+        """
+        self._key_cache_time.pop(key, None)
+        dict.__delitem__(self, key)
 
     def __contains__(self, key):
         self._enforce_ttl_key(key)
@@ -173,6 +211,55 @@ class CacheDisk(CacheDict):
             salt.utils.msgpack.dump(cache, fp_, use_bin_type=True)
 
 
+def _generation_path(opts, name):
+    return os.path.join(opts["cachedir"], "generations", name)
+
+
+def get_generation(opts, name):
+    """
+    .. versionadded:: 3005
+
+    Return the current generation of the data source ``name``. Caches which
+    depend on a data source record its generation, and consider their entries
+    stale once it no longer matches. An empty string is returned if the
+    generation has never been bumped.
+    """
+    try:
+        with salt.utils.files.fopen(_generation_path(opts, name), "r") as fp_:
+            return fp_.read().strip()
+    except OSError:
+        return ""
+
+
+def fileserver_generation(saltenv):
+    """
+    .. versionadded:: 3005
+
+    Return the name of the data source of the fileserver data of ``saltenv``,
+    for :py:func:`get_generation` and :py:func:`bump_generation`
+    """
+    return "fileserver_{}".format(urllib.parse.quote(str(saltenv), safe=""))
+
+
+def bump_generation(opts, name):
+    """
+    .. versionadded:: 3005
+
+    Start a new generation of the data source ``name``, marking the cached
+    data which depends on it as stale in all processes.
+    """
+    path = _generation_path(opts, name)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with salt.utils.atomicfile.atomic_open(path, "w") as fp_:
+            fp_.write(uuid.uuid4().hex)
+    except OSError as exc:
+        log.error("Unable to update the generation of %s: %s", name, exc)
+        return False
+    log.debug("Started a new generation of %s", name)
+    return True
+
+
 class CacheCli:
     """
     Connection client for the ConCache. Should be used by all
@@ -7,6 +7,8 @@ import os
 import shutil
 
 import salt.fileclient
+import salt.loader
+import salt.loader.lazy
 import salt.utils.files
 import salt.utils.hashutils
 import salt.utils.path
@@ -146,4 +148,12 @@ def sync(opts, form, saltenv=None, extmod_whitelist=None, extmod_blacklist=None)
                         shutil.rmtree(emptydir, ignore_errors=True)
         except Exception as exc:  # pylint: disable=broad-except
             log.error("Failed to sync %s module: %s", form, exc)
+    if touched:
+        # Do not wait for the mtime of the module directories to invalidate
+        # the file mappings and __virtual__ outcomes cached by the loaders
+        salt.loader.lazy.clear_file_mapping_cache(opts)
+        salt.loader.lazy.clear_virtual_cache(opts)
+        if form == "grains":
+            # The cached results of the grains functions may be outdated
+            salt.loader.clear_grains_funcs_cache(opts)
     return ret, touched
@@ -3,6 +3,7 @@ Classes which provide the shared base for GitFS, git_pillar, and winrepo
 """
 
 
+import concurrent.futures
 import contextlib
 import copy
 import errno
@@ -16,12 +17,16 @@ import shlex
 import shutil
 import stat
 import subprocess
+import threading
 import time
 import weakref
 from datetime import datetime
 
 import salt.ext.tornado.ioloop
 import salt.fileserver
+import salt.payload
+import salt.utils.atomicfile
+import salt.utils.cache
 import salt.utils.configparser
 import salt.utils.data
 import salt.utils.files
@@ -51,6 +56,9 @@ GLOBAL_ONLY = ()
 
 SYMLINK_RECURSE_DEPTH = 100
 
+# Maximum number of tree indexes (see GitProvider.tree_index) kept in memory
+TREE_INDEX_CACHE_SIZE = 64
+
 # Auth support (auth params can be global or per-remote, too)
 AUTH_PROVIDERS = ("pygit2",)
 AUTH_PARAMS = ("user", "password", "pubkey", "privkey", "passphrase", "insecure_auth")
@@ -60,6 +68,26 @@ AUTH_PARAMS = ("user", "password", "pubkey", "privkey", "passphrase", "insecure_
 # constructor for the GitProvider subclasses.
 PER_SALTENV_PARAMS = ("mountpoint", "root", "ref")
 
+_TREE_INDEX_CACHE = OrderedDict()
+
+# The IDs of the remotes, by cache root, whose fetch was abandoned on timeout
+# and then updated them. The next fetch in this process reports them as
+# changed.
+_LATE_CHANGES = {}
+_LATE_CHANGES_LOCK = threading.Lock()
+
+
+def _load_tree_index(path):
+    """
+    Load a tree index written by GitProvider.tree_index
+    """
+    with salt.utils.files.fopen(path, "rb") as fp_:
+        index = salt.payload.load(fp_)
+    # The directories are stored as a list
+    index["dirs"] = set(index["dirs"])
+    return index
+
+
 _RECOMMEND_GITPYTHON = (
     "GitPython is installed, you may wish to set %s_provider to "
     "'gitpython' to use GitPython for %s support."
@@ -458,6 +486,8 @@ class GitProvider:
         self.cachedir = salt.utils.path.join(cache_root, self.cachedir_basename)
         self.linkdir = salt.utils.path.join(cache_root, "links", self.cachedir_basename)
 
+        self.tree_index_dir = salt.utils.path.join(cache_root, "tree_index")
+
         if not os.path.isdir(self.cachedir):
             os.makedirs(self.cachedir)
 
@@ -814,6 +844,16 @@ class GitProvider:
         """
         try:
             with self.gen_lock(lock_type="update"):
+                if (
+                    self.opts.get("{}_fetch_check_refs".format(self.role), False)
+                    and self.refs_up_to_date()
+                ):
+                    log.debug(
+                        "Refs for %s remote '%s' are unchanged, skipping fetch",
+                        self.role,
+                        self.id,
+                    )
+                    return None
                 log.debug("Fetching %s remote '%s'", self.role, self.id)
                 # Run provider-specific fetch code
                 return self._fetch()
@@ -833,6 +873,77 @@ class GitProvider:
                 )
             return False
 
+    def local_refs(self):
+        """
+        This function must be overridden in a sub-class
+        """
+        raise NotImplementedError()
+
+    def remote_refs(self):
+        """
+        This function must be overridden in a sub-class
+        """
+        raise NotImplementedError()
+
+    def refs_up_to_date(self):
+        """
+        Compare the refs advertised by the remote (i.e. the output of ``git
+        ls-remote``) to the local refs they are fetched into, using the
+        configured refspecs. Return True if a fetch would not change any refs.
+        """
+        try:
+            remote_refs = self.remote_refs()
+        except Exception as exc:  # pylint: disable=broad-except
+            log.debug(
+                "Failed to list refs for %s remote '%s': %s", self.role, self.id, exc
+            )
+            return False
+        if remote_refs is None:
+            return False
+
+        refspecs = []
+        for refspec in self.refspecs:
+            try:
+                src, dst = refspec.lstrip("+").split(":", 1)
+            except ValueError:
+                # Refspecs without a destination do not update local refs
+                continue
+            refspecs.append((src, dst))
+
+        expected = {}
+        for name, oid in remote_refs.items():
+            if name.endswith("^{}"):
+                # Peeled tag, the tag itself is listed separately
+                continue
+            for src, dst in refspecs:
+                if "*" in src:
+                    src_prefix, src_suffix = src.split("*", 1)
+                    if (
+                        name.startswith(src_prefix)
+                        and name.endswith(src_suffix)
+                        and len(name) >= len(src_prefix) + len(src_suffix)
+                    ):
+                        matched = name[len(src_prefix) : len(name) - len(src_suffix)]
+                        expected[dst.replace("*", matched, 1)] = oid
+                elif name == src:
+                    expected[dst] = oid
+
+        def _tracked(name):
+            for _, dst in refspecs:
+                if "*" in dst:
+                    dst_prefix, dst_suffix = dst.split("*", 1)
+                    if name.startswith(dst_prefix) and name.endswith(dst_suffix):
+                        return True
+                elif name == dst:
+                    return True
+            return False
+
+        local = {name: oid for name, oid in self.local_refs().items() if _tracked(name)}
+        # The symbolic HEAD ref of the remote is not a ref which gets updated
+        local.pop("refs/remotes/origin/HEAD", None)
+        expected.pop("refs/remotes/origin/HEAD", None)
+        return local == expected
+
     def _lock(self, lock_type="update", failhard=False):
         """
         Place a lock file if (and only if) it does not already exist.
@@ -1104,6 +1215,181 @@ class GitProvider:
         # No matches found
         return None
 
+    def get_tree_id(self, tree):
+        """
+        This function must be overridden in a sub-class
+        """
+        raise NotImplementedError()
+
+    def get_blob(self, oid, mode, path):
+        """
+        This function must be overridden in a sub-class
+        """
+        raise NotImplementedError()
+
+    def walk_tree(self, tree):
+        """
+        This function must be overridden in a sub-class
+        """
+        raise NotImplementedError()
+
+    @property
+    def use_tree_index(self):
+        """
+        Whether or not file and directory lookups should use tree indexes,
+        only gitfs looks files up in the trees
+        """
+        return self.role == "gitfs" and self.opts.get("gitfs_tree_index", False)
+
+    def _build_tree_index(self, tree):
+        """
+        Walk the tree and return a dict mapping each path to a tuple of the
+        blob's object ID, mode and size, along with the directories and the
+        targets of symlinks in the tree.
+        """
+        index = {"files": {}, "dirs": set(), "symlinks": {}}
+        for path, oid, mode, size, link_tgt in self.walk_tree(tree):
+            if oid is None:
+                index["dirs"].add(path)
+                continue
+            index["files"][path] = (oid, mode, size)
+            if link_tgt is not None:
+                index["symlinks"][path] = link_tgt
+        return index
+
+    def tree_index(self, tgt_env):
+        """
+        Return the index of the tree to which the specified environment
+        currently points, or None if the environment does not exist.
+
+        Indexes are keyed by the tree's object ID, so an index only needs to be
+        built once per tree and is never invalidated. After building it, the
+        index is written to the cachedir so that other processes (e.g. the
+        master's MWorkers) can load it instead of walking the tree again.
+        """
+        tree = self.get_tree(tgt_env)
+        if not tree:
+            return None
+        tree_id = self.get_tree_id(tree)
+        try:
+            index = _TREE_INDEX_CACHE.pop(tree_id)
+        except KeyError:
+            index = None
+            index_path = salt.utils.path.join(self.tree_index_dir, tree_id + ".p")
+            try:
+                index = _load_tree_index(index_path)
+            except OSError as exc:
+                if exc.errno != errno.ENOENT:
+                    log.error("Failed to read tree index %s: %s", index_path, exc)
+            except Exception as exc:  # pylint: disable=broad-except
+                log.error("Failed to load tree index %s: %s", index_path, exc)
+            if index is None:
+                start = time.time()
+                index = self._build_tree_index(tree)
+                log.debug(
+                    "Built tree index for %s remote '%s' (tree %s) in %s seconds",
+                    self.role,
+                    self.id,
+                    tree_id,
+                    time.time() - start,
+                )
+                try:
+                    os.makedirs(self.tree_index_dir, exist_ok=True)
+                    with salt.utils.atomicfile.atomic_open(index_path, "wb") as fp_:
+                        fp_.write(
+                            salt.payload.dumps(dict(index, dirs=sorted(index["dirs"])))
+                        )
+                except OSError as exc:
+                    log.error("Failed to write tree index %s: %s", index_path, exc)
+        _TREE_INDEX_CACHE[tree_id] = index
+        while len(_TREE_INDEX_CACHE) > TREE_INDEX_CACHE_SIZE:
+            _TREE_INDEX_CACHE.popitem(last=False)
+        return index
+
+    def _index_prefix(self, tgt_env, index):
+        """
+        Return the path prefix for the configured root, or None if the root
+        does not exist in the indexed tree
+        """
+        root = self.root(tgt_env).strip("/")
+        if not root:
+            return ""
+        if root not in index["dirs"]:
+            return None
+        return root + "/"
+
+    def indexed_dir_list(self, tgt_env):
+        """
+        Get a list of directories for the target environment using the tree
+        index
+        """
+        ret = set()
+        index = self.tree_index(tgt_env)
+        if index is None:
+            return ret
+        prefix = self._index_prefix(tgt_env, index)
+        if prefix is None:
+            return ret
+        for path in index["dirs"]:
+            if path.startswith(prefix):
+                ret.add(
+                    salt.utils.path.join(
+                        self.mountpoint(tgt_env),
+                        path[len(prefix) :],
+                        use_posixpath=True,
+                    )
+                )
+        if self.mountpoint(tgt_env):
+            ret.add(self.mountpoint(tgt_env))
+        return ret
+
+    def indexed_file_list(self, tgt_env):
+        """
+        Get file list for the target environment using the tree index
+        """
+        files = set()
+        symlinks = {}
+        index = self.tree_index(tgt_env)
+        if index is None:
+            return files, symlinks
+        prefix = self._index_prefix(tgt_env, index)
+        if prefix is None:
+            return files, symlinks
+        for path in index["files"]:
+            if not path.startswith(prefix):
+                continue
+            file_path = salt.utils.path.join(
+                self.mountpoint(tgt_env), path[len(prefix) :], use_posixpath=True
+            )
+            files.add(file_path)
+            if path in index["symlinks"]:
+                symlinks[file_path] = index["symlinks"][path]
+        return files, symlinks
+
+    def indexed_find_file(self, path, tgt_env):
+        """
+        Find the specified file in the specified environment using the tree
+        index
+        """
+        index = self.tree_index(tgt_env)
+        if index is None:
+            return None, None, None
+        depth = 0
+        while depth < SYMLINK_RECURSE_DEPTH:
+            depth += 1
+            try:
+                oid, mode, _ = index["files"][path]
+            except KeyError:
+                # File not found or path points to a directory
+                return None, None, None
+            if path in index["symlinks"]:
+                path = salt.utils.path.join(
+                    os.path.dirname(path), index["symlinks"][path], use_posixpath=True
+                )
+                continue
+            return self.get_blob(oid, mode, path), oid, mode
+        return None, None, None
+
     def get_url(self):
         """
         Examine self.id and assign self.url (and self.branch, for git_pillar)
@@ -1309,6 +1595,8 @@ class GitPython(GitProvider):
         """
         Get list of directories for the target environment using GitPython
         """
+        if self.use_tree_index:
+            return self.indexed_dir_list(tgt_env)
         ret = set()
         tree = self.get_tree(tgt_env)
         if not tree:
@@ -1375,10 +1663,35 @@ class GitPython(GitProvider):
         cleaned = self.clean_stale_refs()
         return True if (new_objs or cleaned) else None
 
+    def local_refs(self):
+        """
+        Return a dict mapping the refs in the local repo to their object IDs
+        """
+        ret = {}
+        output = self.repo.git.for_each_ref("--format=%(objectname) %(refname)")
+        for line in output.splitlines():
+            oid, _, name = line.partition(" ")
+            ret[name] = oid
+        return ret
+
+    def remote_refs(self):
+        """
+        Return a dict mapping the refs advertised by the remote to their object
+        IDs
+        """
+        ret = {}
+        output = self.repo.git.ls_remote(self.repo.remotes[0].name)
+        for line in output.splitlines():
+            oid, _, name = line.partition("\t")
+            ret[name] = oid
+        return ret
+
     def file_list(self, tgt_env):
         """
         Get file list for the target environment using GitPython
         """
+        if self.use_tree_index:
+            return self.indexed_file_list(tgt_env)
         files = set()
         symlinks = {}
         tree = self.get_tree(tgt_env)
@@ -1414,6 +1727,8 @@ class GitPython(GitProvider):
         """
         Find the specified file in the specified environment
         """
+        if self.use_tree_index:
+            return self.indexed_find_file(path, tgt_env)
         tree = self.get_tree(tgt_env)
         if not tree:
             # Branch/tag/SHA not found in repo
@@ -1454,6 +1769,18 @@ class GitPython(GitProvider):
             return blob, blob.hexsha, blob.mode
         return None, None, None
 
+    def get_blob(self, oid, mode, path):
+        """
+        Return a git.Blob object for the specified object ID
+        """
+        return git.Blob(self.repo, bytes.fromhex(oid), mode, path)
+
+    def get_tree_id(self, tree):
+        """
+        Return the object ID of a git.Tree object
+        """
+        return tree.hexsha
+
     def get_tree_from_branch(self, ref):
         """
         Return a git.Tree object matching a head ref fetched into
@@ -1484,6 +1811,24 @@ class GitPython(GitProvider):
         except (gitdb.exc.ODBError, AttributeError):
             return None
 
+    def walk_tree(self, tree):
+        """
+        Yield a tuple of (path, oid, mode, size, link target) for each file in
+        the git.Tree object. Directories are yielded with all but the path set
+        to None.
+        """
+        for obj in tree.traverse():
+            if isinstance(obj, git.Tree):
+                yield obj.path, None, None, None, None
+            elif isinstance(obj, git.Blob):
+                link_tgt = None
+                if stat.S_ISLNK(obj.mode):
+                    stream = io.BytesIO()
+                    obj.stream_data(stream)
+                    link_tgt = salt.utils.stringutils.to_str(stream.getvalue())
+                    stream.close()
+                yield obj.path, obj.hexsha, obj.mode, obj.size, link_tgt
+
     def write_file(self, blob, dest):
         """
         Using the blob object, write the file to the destination path
@@ -1789,6 +2134,8 @@ class Pygit2(GitProvider):
         """
         Get a list of directories for the target environment using pygit2
         """
+        if self.use_tree_index:
+            return self.indexed_dir_list(tgt_env)
 
         def _traverse(tree, blobs, prefix):
             """
@@ -1919,10 +2266,44 @@ class Pygit2(GitProvider):
         cleaned = self.clean_stale_refs(local_refs=refs_post)
         return True if (received_objects or refs_pre != refs_post or cleaned) else None
 
+    def local_refs(self):
+        """
+        Return a dict mapping the refs in the local repo to their object IDs
+        """
+        ret = {}
+        for name in self.repo.listall_references():
+            target = self.repo.lookup_reference(name).target
+            # Symbolic refs have the name of another ref as their target
+            if not isinstance(target, str):
+                ret[name] = str(target)
+        return ret
+
+    def remote_refs(self):
+        """
+        Return a dict mapping the refs advertised by the remote to their object
+        IDs, or None if this version of pygit2 cannot list remote refs
+        """
+        origin = self.repo.remotes[0]
+        if hasattr(origin, "list_heads"):
+            heads = [
+                (head.name, head.oid)
+                for head in origin.list_heads(callbacks=self.remotecallbacks)
+            ]
+        elif hasattr(origin, "ls_remotes"):
+            heads = [
+                (head["name"], head["oid"])
+                for head in origin.ls_remotes(callbacks=self.remotecallbacks)
+            ]
+        else:
+            return None
+        return {name: str(oid) for name, oid in heads}
+
     def file_list(self, tgt_env):
         """
         Get file list for the target environment using pygit2
         """
+        if self.use_tree_index:
+            return self.indexed_file_list(tgt_env)
 
         def _traverse(tree, blobs, prefix):
             """
@@ -1984,6 +2365,8 @@ class Pygit2(GitProvider):
         """
         Find the specified file in the specified environment
         """
+        if self.use_tree_index:
+            return self.indexed_find_file(path, tgt_env)
         tree = self.get_tree(tgt_env)
         if not tree:
             # Branch/tag/SHA not found in repo
@@ -2021,6 +2404,18 @@ class Pygit2(GitProvider):
             return blob, blob.hex, mode
         return None, None, None
 
+    def get_blob(self, oid, mode, path):
+        """
+        Return a pygit2.Blob object for the specified object ID
+        """
+        return self.repo[oid]
+
+    def get_tree_id(self, tree):
+        """
+        Return the object ID of a pygit2.Tree object
+        """
+        return str(tree.id)
+
     def get_tree_from_branch(self, ref):
         """
         Return a pygit2.Tree object matching a head ref fetched into
@@ -2210,6 +2605,27 @@ class Pygit2(GitProvider):
             )
             failhard(self.role)
 
+    def walk_tree(self, tree, prefix=""):
+        """
+        Yield a tuple of (path, oid, mode, size, link target) for each file in
+        the pygit2.Tree object. Directories are yielded with all but the path
+        set to None.
+        """
+        for entry in iter(tree):
+            if entry.id not in self.repo:
+                # Entry is a submodule, skip it
+                continue
+            obj = self.repo[entry.id]
+            path = salt.utils.path.join(prefix, entry.name, use_posixpath=True)
+            if isinstance(obj, pygit2.Blob):
+                link_tgt = None
+                if stat.S_ISLNK(entry.filemode):
+                    link_tgt = salt.utils.stringutils.to_str(obj.data)
+                yield path, str(entry.id), entry.filemode, obj.size, link_tgt
+            elif isinstance(obj, pygit2.Tree):
+                yield path, None, None, None, None
+                yield from self.walk_tree(obj, path)
+
     def write_file(self, blob, dest):
         """
         Using the blob object, write the file to the destination path
@@ -2294,6 +2710,8 @@ class GitBase:
         self.file_list_cachedir = salt.utils.path.join(
             self.opts["cachedir"], "file_lists", self.role
         )
+        self.fetch_durations = {}
+        self.changed_remotes = []
         if init_remotes:
             self.init_remotes(
                 remotes if remotes is not None else [],
@@ -2449,7 +2867,7 @@ class GitBase:
                 pass
         to_remove = []
         for item in cachedir_ls:
-            if item in ("hash", "refs"):
+            if item in ("hash", "refs", "tree_index", "blob_hash"):
                 continue
             path = salt.utils.path.join(self.cache_root, item)
             if os.path.isdir(path):
@@ -2528,28 +2946,150 @@ class GitBase:
             )
             remotes = []
 
-        changed = False
+        to_fetch = []
         for repo in self.remotes:
             name = getattr(repo, "name", None)
             if not remotes or (repo.id, name) in remotes or name in remotes:
-                try:
-                    if repo.fetch():
-                        # We can't just use the return value from repo.fetch()
-                        # because the data could still have changed if old
-                        # remotes were cleared above. Additionally, we're
-                        # running this in a loop and later remotes without
-                        # changes would override this value and make it
-                        # incorrect.
+                to_fetch.append(repo)
+
+        workers = self.opts.get("{}_fetch_workers".format(self.role), 1) or 1
+        timeout = self.opts.get("{}_fetch_timeout".format(self.role), 0)
+        # Each call collects its own results, an abandoned fetch finishing
+        # later must not touch those of the calls made after it
+        durations = {}
+        changed_remotes = []
+        changed = False
+        with _LATE_CHANGES_LOCK:
+            late = _LATE_CHANGES.pop(self.cache_root, set())
+        for repo in self.remotes:
+            if repo.id in late:
+                log.info(
+                    "The abandoned fetch of %s remote '%s' updated it",
+                    self.role,
+                    repo.id,
+                )
+                changed_remotes.append(repo)
+                changed = True
+        try:
+            if workers <= 1 and not timeout:
+                for repo in to_fetch:
+                    # We can't just use the return value from repo.fetch()
+                    # because the data could still have changed if old remotes
+                    # were cleared above. Additionally, we're running this in a
+                    # loop and later remotes without changes would override
+                    # this value and make it incorrect.
+                    if self._fetch_remote(repo, durations, changed_remotes):
                         changed = True
-                except Exception as exc:  # pylint: disable=broad-except
+                return changed
+            if self._fetch_concurrently(
+                to_fetch, workers, timeout, durations, changed_remotes
+            ):
+                changed = True
+            return changed
+        finally:
+            self.fetch_durations = dict(durations)
+            self.changed_remotes = list(changed_remotes)
+
+    def _fetch_concurrently(self, to_fetch, workers, timeout, durations, changed):
+        """
+        Fetch the remotes in ``to_fetch`` in ``workers`` threads, abandoning
+        the fetches which take more than ``timeout`` seconds. Return True if
+        any remote was updated.
+        """
+        # Threads cannot be killed, so a remote which exceeds the timeout is
+        # abandoned rather than stopped. It keeps holding its update lock,
+        # which makes the next update skip it until the fetch has finished.
+        started = {}
+        results = {}
+        abandoned = set()
+        updated = False
+        lock = threading.Lock()
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(1, min(workers, len(to_fetch))),
+            thread_name_prefix="{}-fetch".format(self.role),
+        )
+        try:
+
+            def _run(repo):
+                started[repo.id] = time.time()
+                repo_durations = {}
+                repo_changed = []
+                ret = self._fetch_remote(repo, repo_durations, repo_changed)
+                with lock:
+                    results[repo.id] = ret
+                    if repo.id not in abandoned:
+                        durations.update(repo_durations)
+                        changed.extend(repo_changed)
+                    elif ret:
+                        # Too late for this call, the next one reports it
+                        with _LATE_CHANGES_LOCK:
+                            _LATE_CHANGES.setdefault(self.cache_root, set()).add(
+                                repo.id
+                            )
+                return ret
+
+            pending = {executor.submit(_run, repo): repo for repo in to_fetch}
+            while pending:
+                done, _ = concurrent.futures.wait(
+                    pending,
+                    timeout=1 if timeout else None,
+                    return_when=concurrent.futures.FIRST_COMPLETED,
+                )
+                for future in done:
+                    if future.result():
+                        updated = True
+                    pending.pop(future)
+                if not timeout:
+                    continue
+                now = time.time()
+                for future, repo in list(pending.items()):
+                    if repo.id not in started or now - started[repo.id] <= timeout:
+                        continue
+                    with lock:
+                        if repo.id in results:
+                            # It finished meanwhile, the next wait returns it
+                            continue
+                        abandoned.add(repo.id)
                     log.error(
-                        "Exception caught while fetching %s remote '%s': %s",
+                        "Fetch of %s remote '%s' did not complete within %s "
+                        "seconds, abandoning it",
                         self.role,
                         repo.id,
-                        exc,
-                        exc_info=True,
+                        timeout,
                     )
-        return changed
+                    durations[repo.id] = now - started[repo.id]
+                    pending.pop(future)
+        finally:
+            executor.shutdown(wait=False)
+        return updated
+
+    def _fetch_remote(self, repo, durations, changed):
+        """
+        Fetch a single remote, recording how long the fetch took in
+        ``durations`` and adding the remote to ``changed`` if it was updated.
+        Return True if the remote was updated.
+        """
+        start = time.time()
+        try:
+            if repo.fetch():
+                changed.append(repo)
+                return True
+            return False
+        except Exception as exc:  # pylint: disable=broad-except
+            log.error(
+                "Exception caught while fetching %s remote '%s': %s",
+                self.role,
+                repo.id,
+                exc,
+                exc_info=True,
+            )
+            return False
+        finally:
+            duration = time.time() - start
+            durations[repo.id] = duration
+            log.profile(
+                "%s fetch remote=%s duration=%s seconds", self.role, repo.id, duration
+            )
 
     def lock(self, remote=None):
         """
@@ -2586,14 +3126,31 @@ class GitBase:
         # data for the fileserver event
         data = {"changed": False, "backend": "gitfs"}
 
-        data["changed"] = self.clear_old_remotes()
+        cleared = self.clear_old_remotes()
+        data["changed"] = cleared
         if self.fetch_remotes(remotes=remotes):
             data["changed"] = True
+        data["fetch_durations"] = self.fetch_durations
 
         # A masterless minion will need a new env cache file even if no changes
         # were fetched.
         refresh_env_cache = self.opts["__role"] == "minion"
 
+        if data["changed"] is True and self.role == "gitfs":
+            # Mark the cached data rendered from the saltenvs of the updated
+            # remotes as stale, and from all of them if remotes were removed
+            saltenvs = set(self.envs()) if cleared else set()
+            for repo in self.changed_remotes:
+                saltenvs.update(repo.envs())
+                for env_list in repo.saltenv_revmap.values():
+                    saltenvs.update(env_list)
+            for saltenv in saltenvs:
+                salt.utils.cache.bump_generation(
+                    self.opts, salt.utils.cache.fileserver_generation(saltenv)
+                )
+            if self.opts.get("gitfs_tree_index", False):
+                self.prune_tree_index()
+
         if data["changed"] is True or not os.path.isfile(self.env_cache):
             env_cachedir = os.path.dirname(self.env_cache)
             if not os.path.exists(env_cachedir):
@@ -2624,6 +3181,73 @@ class GitBase:
             # Hash file won't exist if no files have yet been served up
             pass
 
+    def prune_tree_index(self):
+        """
+        Remove the tree indexes of the trees which no environment points to
+        anymore, and the hashes cached for the blobs which are not in any of
+        the remaining indexes
+        """
+        index_dir = salt.utils.path.join(self.cache_root, "tree_index")
+        try:
+            index_files = os.listdir(index_dir)
+        except OSError:
+            return
+        keep = set()
+        for repo in self.remotes:
+            try:
+                for tgt_env in repo.envs():
+                    tree = repo.get_tree(tgt_env)
+                    if tree:
+                        keep.add(repo.get_tree_id(tree))
+            except Exception as exc:  # pylint: disable=broad-except
+                log.error(
+                    "Unable to list the trees of %s remote '%s', not pruning "
+                    "the tree indexes: %s",
+                    self.role,
+                    repo.id,
+                    exc,
+                )
+                return
+        blobs = set()
+        prune_blobs = True
+        for name in index_files:
+            tree_id, ext = os.path.splitext(name)
+            if ext != ".p":
+                continue
+            path = salt.utils.path.join(index_dir, name)
+            if tree_id in keep:
+                try:
+                    index = _load_tree_index(path)
+                except Exception as exc:  # pylint: disable=broad-except
+                    log.error("Failed to load tree index %s: %s", path, exc)
+                    prune_blobs = False
+                else:
+                    blobs.update(oid for oid, _, _ in index["files"].values())
+                continue
+            _TREE_INDEX_CACHE.pop(tree_id, None)
+            try:
+                os.remove(path)
+                log.debug("Removed %s tree index %s", self.role, tree_id)
+            except OSError as exc:
+                if exc.errno != errno.ENOENT:
+                    log.error("Unable to remove tree index %s: %s", path, exc)
+        if not prune_blobs:
+            return
+        blob_dir = salt.utils.path.join(self.cache_root, "blob_hash")
+        try:
+            hash_files = os.listdir(blob_dir)
+        except OSError:
+            return
+        for name in hash_files:
+            if name.startswith(".") or name.split(".", 1)[0] in blobs:
+                # The hash is used, or is being written
+                continue
+            try:
+                os.remove(salt.utils.path.join(blob_dir, name))
+            except OSError as exc:
+                if exc.errno != errno.ENOENT:
+                    log.error("Unable to remove blob hash %s: %s", name, exc)
+
     def update_intervals(self):
         """
         Returns a dictionary mapping remote IDs to their intervals, designed to
@@ -2991,6 +3615,7 @@ class GitFS(GitBase):
                     fnd["stat"] = [mode]
                 return fnd
 
+            fnd["blob_sha"] = blob_hexsha
             salt.fileserver.wait_lock(lk_fn, dest)
             try:
                 with salt.utils.files.fopen(blobshadest, "r") as fp_:
@@ -3072,11 +3697,20 @@ class GitFS(GitBase):
         ret = {"hash_type": self.opts["hash_type"]}
         relpath = fnd["rel"]
         path = fnd["path"]
-        hashdest = salt.utils.path.join(
-            self.hash_cachedir,
-            load["saltenv"],
-            "{}.hash.{}".format(relpath, self.opts["hash_type"]),
-        )
+        if self.opts.get("gitfs_tree_index", False) and fnd.get("blob_sha"):
+            # The contents of a blob never change, so its hash can be shared
+            # by every path and saltenv which serves the same blob.
+            hashdest = salt.utils.path.join(
+                self.cache_root,
+                "blob_hash",
+                "{}.hash.{}".format(fnd["blob_sha"], self.opts["hash_type"]),
+            )
+        else:
+            hashdest = salt.utils.path.join(
+                self.hash_cachedir,
+                load["saltenv"],
+                "{}.hash.{}".format(relpath, self.opts["hash_type"]),
+            )
         try:
             with salt.utils.files.fopen(hashdest, "rb") as fp_:
                 ret["hsum"] = fp_.read()
@@ -3092,7 +3726,9 @@ class GitFS(GitBase):
                 raise
 
         ret["hsum"] = salt.utils.hashutils.get_hash(path, self.opts["hash_type"])
-        with salt.utils.files.fopen(hashdest, "w+") as fp_:
+        # The hash of a blob is read by the requests for any path serving it,
+        # they must not read a partly written hash
+        with salt.utils.atomicfile.atomic_open(hashdest, "w") as fp_:
             fp_.write(ret["hsum"])
         return ret
 
@@ -4,11 +4,15 @@ Jinja loading utils to enable a more powerful backend for jinja templates
 
 
 import atexit
+import collections
+import copy
+import hashlib
 import logging
 import os.path
 import pipes
 import pprint
 import re
+import threading
 import time
 import uuid
 import warnings
@@ -18,7 +22,9 @@ from xml.dom import minidom
 from xml.etree.ElementTree import Element, SubElement, tostring
 
 import jinja2
+import jinja2.bccache
 import salt.fileclient
+import salt.utils.atomicfile
 import salt.utils.data
 import salt.utils.files
 import salt.utils.json
@@ -42,12 +48,48 @@ except ImportError:
 
 log = logging.getLogger(__name__)
 
-__all__ = ["SaltCacheLoader", "SerializerExtension"]
+__all__ = ["SaltCacheLoader", "SerializerExtension", "TemplateSourceCache"]
 
 GLOBAL_UUID = uuid.UUID("91633EBF-1C86-5E33-935A-28061F4B480E")
 JINJA_VERSION = LooseVersion(jinja2.__version__)
 
 
+class TemplateSourceCache:
+    """
+    The sources of the templates loaded by :py:class:`SaltCacheLoader` during
+    a single run, for example while rendering all the SLS files of a
+    highstate. A template is fetched, which compares the hash of the cached
+    copy with the one of the master, and read at most once per run.
+
+    .. versionadded:: 3005
+    """
+
+    def __init__(self):
+        self.sources = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+        Return the ``(contents, filepath)`` of the template ``key``, ``False``
+        if the template was not found in this run or ``None`` if it was not
+        loaded yet
+        """
+        source = self.sources.get(key)
+        if source is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return source
+
+    def set(self, key, source):
+        """
+        Remember the ``(contents, filepath)`` of the template ``key``, or
+        ``False`` if the template does not exist
+        """
+        self.sources[key] = source
+
+
 class SaltCacheLoader(BaseLoader):
     """
     A special jinja Template Loader for salt.
@@ -77,6 +119,7 @@ class SaltCacheLoader(BaseLoader):
         encoding="utf-8",
         pillar_rend=False,
         _file_client=None,
+        _template_sources=None,
     ):
         self.opts = opts
         self.saltenv = saltenv
@@ -91,6 +134,7 @@ class SaltCacheLoader(BaseLoader):
             self.searchpath = [os.path.join(opts["cachedir"], "files", saltenv)]
         log.debug("Jinja search path: %s", self.searchpath)
         self.cached = []
+        self.template_sources = _template_sources
         self._file_client = _file_client
         # Instantiate the fileclient
         self.file_client()
@@ -165,7 +209,13 @@ class SaltCacheLoader(BaseLoader):
                 )
                 raise TemplateNotFound(template)
 
-        self.check_cache(_template)
+        sources = self.template_sources
+        key = (self.pillar_rend, self.saltenv, _template)
+        source = sources.get(key) if sources is not None else None
+        if source is False:
+            raise TemplateNotFound(template)
+        if source is None:
+            self.check_cache(_template)
 
         if environment and template:
             tpldir = os.path.dirname(_template).replace("\\", "/")
@@ -180,6 +230,10 @@ class SaltCacheLoader(BaseLoader):
             }
             environment.globals.update(tpldata)
 
+        if source is not None:
+            # Already fetched and read in this run
+            return source[0], source[1], lambda: sources.sources.get(key) is source
+
         # pylint: disable=cell-var-from-loop
         for spath in self.searchpath:
             filepath = os.path.join(spath, _template)
@@ -187,6 +241,8 @@ class SaltCacheLoader(BaseLoader):
                 with salt.utils.files.fopen(filepath, "rb") as ifile:
                     contents = ifile.read().decode(self.encoding)
                     mtime = os.path.getmtime(filepath)
+                    if sources is not None:
+                        sources.set(key, (contents, filepath))
 
                     def uptodate():
                         try:
@@ -201,12 +257,239 @@ class SaltCacheLoader(BaseLoader):
         # pylint: enable=cell-var-from-loop
 
         # there is no template file within searchpaths
+        if sources is not None:
+            sources.set(key, False)
         raise TemplateNotFound(template)
 
 
 atexit.register(SaltCacheLoader.shutdown)
 
 
+# The Environment attributes which change the code compiled from a template
+_COMPILE_ATTRS = (
+    "block_start_string",
+    "block_end_string",
+    "variable_start_string",
+    "variable_end_string",
+    "comment_start_string",
+    "comment_end_string",
+    "line_statement_prefix",
+    "line_comment_prefix",
+    "trim_blocks",
+    "lstrip_blocks",
+    "newline_sequence",
+    "keep_trailing_newline",
+    "optimized",
+    "autoescape",
+)
+
+
+class SaltBytecodeCache(jinja2.BytecodeCache):
+    """
+    Cache of the code compiled from Jinja templates, keyed by the hash of the
+    template source, its name and the options of the environment which
+    compiled it. The compiled code is kept in memory for the life of the
+    process and, if ``directory`` is set, stored in files in that directory
+    so that it survives restarts.
+
+    .. versionadded:: 3005
+    """
+
+    def __init__(self, directory=None, max_entries=1024):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._memory = collections.OrderedDict()
+        if directory is not None:
+            try:
+                os.makedirs(directory, mode=0o700, exist_ok=True)
+            except OSError as exc:
+                log.warning(
+                    "Unable to create the Jinja bytecode cache %s: %s", directory, exc
+                )
+                self.directory = None
+
+    def get_bucket(self, environment, name, filename, source):
+        checksum = self.get_source_checksum(source)
+        signature = [environment.__class__.__name__, name, filename, checksum]
+        signature.extend(
+            repr(getattr(environment, attr, None)) for attr in _COMPILE_ATTRS
+        )
+        signature.extend(sorted(environment.extensions))
+        key = hashlib.sha256("|".join(map(str, signature)).encode("utf-8")).hexdigest()
+        bucket = jinja2.bccache.Bucket(environment, key, checksum)
+        self.load_bytecode(bucket)
+        return bucket
+
+    def _path(self, key):
+        return os.path.join(self.directory, "{}.cache".format(key))
+
+    def load_bytecode(self, bucket):
+        code = self._memory.get(bucket.key)
+        if code is not None:
+            self._memory.move_to_end(bucket.key)
+            bucket.code = code
+            return
+        if self.directory is None:
+            return
+        try:
+            with salt.utils.files.fopen(self._path(bucket.key), "rb") as fp_:
+                bucket.load_bytecode(fp_)
+        except OSError:
+            return
+        except Exception as exc:  # pylint: disable=broad-except
+            log.debug("Unable to load the Jinja bytecode %s: %s", bucket.key, exc)
+            bucket.reset()
+            return
+        if bucket.code is not None:
+            self._remember(bucket)
+
+    def dump_bytecode(self, bucket):
+        self._remember(bucket)
+        if self.directory is None:
+            return
+        try:
+            with salt.utils.atomicfile.atomic_open(self._path(bucket.key), "wb") as fp_:
+                bucket.write_bytecode(fp_)
+        except Exception as exc:  # pylint: disable=broad-except
+            log.debug("Unable to store the Jinja bytecode %s: %s", bucket.key, exc)
+
+    def _remember(self, bucket):
+        self._memory[bucket.key] = bucket.code
+        self._memory.move_to_end(bucket.key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def clear(self):
+        self._memory.clear()
+        if self.directory is None:
+            return
+        for name in os.listdir(self.directory):
+            if name.endswith(".cache"):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+
+_bytecode_caches = {}
+
+
+def get_bytecode_cache(opts):
+    """
+    Return the bytecode cache shared by the Jinja environments created with
+    ``opts``. The compiled code is only stored in the cachedir if the
+    ``jinja_bytecode_cache`` option is set.
+
+    .. versionadded:: 3005
+    """
+    directory = None
+    if opts.get("jinja_bytecode_cache", False) and opts.get("cachedir"):
+        directory = os.path.join(opts["cachedir"], "jinja_bytecode")
+    bcc = _bytecode_caches.get(directory)
+    if bcc is None:
+        bcc = _bytecode_caches[directory] = SaltBytecodeCache(directory)
+    return bcc
+
+
+def template_from_string(environment, source):
+    """
+    Return the template compiled from ``source`` like
+    ``environment.from_string`` does, reusing the code compiled for the same
+    source by the bytecode cache of the environment
+    """
+    bcc = environment.bytecode_cache
+    if bcc is None:
+        return environment.from_string(source)
+    bucket = bcc.get_bucket(environment, None, None, source)
+    code = bucket.code
+    if code is None:
+        code = bucket.code = environment.compile(source)
+        bcc.set_bucket(bucket)
+    return environment.template_class.from_code(
+        environment, code, environment.make_globals(None), None
+    )
+
+
+def _copy_data(data):
+    """
+    Return a copy of the deserialized ``data``, which is faster than
+    ``copy.deepcopy`` for the types returned by the YAML and JSON loaders
+    """
+    if isinstance(data, dict):
+        copied = ((key, _copy_data(value)) for key, value in data.items())
+        if data.__class__ is dict:
+            return dict(copied)
+        return data.__class__(copied)
+    if isinstance(data, list):
+        return [_copy_data(value) for value in data]
+    if isinstance(data, set):
+        return {_copy_data(value) for value in data}
+    if isinstance(data, tuple) and data.__class__ is tuple:
+        return tuple(_copy_data(value) for value in data)
+    if isinstance(data, (str, bytes, int, float, bool, type(None))):
+        return data
+    return copy.deepcopy(data)
+
+
+class ParsedDataCache:
+    """
+    Bounded cache of the data deserialized by the ``load_yaml`` and
+    ``load_json`` filters and tags, and therefore by ``import_yaml`` and
+    ``import_json``, keyed by the hash of the serialized data.
+
+    The cached data is never handed to a template, each lookup returns a copy
+    of it so that a template modifying the data it loaded cannot change what
+    another template loads.
+
+    .. versionadded:: 3005
+    """
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, kind, value, loader):
+        """
+        Return a copy of ``loader(value)``, deserializing ``value`` only if
+        data with the same ``kind`` and contents is not already cached
+        """
+        if not isinstance(value, str):
+            return loader(value)
+        key = (kind, hashlib.sha256(value.encode("utf-8", "surrogatepass")).digest())
+        with self._lock:
+            try:
+                data = self._data[key]
+            except KeyError:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._data.move_to_end(key)
+                return _copy_data(data)
+        data = loader(value)
+        with self._lock:
+            self._data[key] = data
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+        return _copy_data(data)
+
+    def stats(self):
+        """
+        Return the number of lookups served from the cache and of the
+        lookups which had to deserialize the data
+        """
+        return {"hits": self.hits, "misses": self.misses}
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+parsed_data_cache = ParsedDataCache()
+
+
 class PrintableDict(OrderedDict):
     """
     Ensures that dict str() and repr() are YAML friendly.
@@ -1026,7 +1309,7 @@ class SerializerExtension(Extension):
         if isinstance(value, TemplateModule):
             value = str(value)
         try:
-            return salt.utils.data.decode(salt.utils.yaml.safe_load(value))
+            return parsed_data_cache.load("yaml", value, self._load_yaml)
         except salt.utils.yaml.YAMLError as exc:
             msg = "Encountered error loading yaml: "
             try:
@@ -1047,11 +1330,15 @@ class SerializerExtension(Extension):
         except AttributeError:
             raise TemplateRuntimeError("Unable to load yaml from {}".format(value))
 
+    @staticmethod
+    def _load_yaml(value):
+        return salt.utils.data.decode(salt.utils.yaml.safe_load(value))
+
     def load_json(self, value):
         if isinstance(value, TemplateModule):
             value = str(value)
         try:
-            return salt.utils.json.loads(value)
+            return parsed_data_cache.load("json", value, salt.utils.json.loads)
         except (ValueError, TypeError, AttributeError):
             raise TemplateRuntimeError("Unable to load json from {}".format(value))
 
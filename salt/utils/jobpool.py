@@ -0,0 +1,215 @@
+"""
+A pool of pre-forked processes running the jobs of a minion
+
+.. versionadded:: 3005
+
+When :conf_minion:`minion_job_pool_size` is set, the minion keeps that many
+processes, forked from the minion process with its modules already loaded,
+waiting for jobs. A job is sent to an idle worker over a pipe instead of
+forking a new process for it. A worker exits after running
+:conf_minion:`minion_job_pool_max_jobs` jobs and the workers are replaced when
+the modules of the minion are refreshed.
+
+A worker writes its PID in the proc file of the job it runs, like the process
+forked for a job does, so that ``saltutil.kill_job`` and
+``saltutil.term_job`` signal the worker running the job, which is then
+replaced.
+"""
+
+import logging
+import multiprocessing
+import os
+
+import salt.utils.crypt
+import salt.utils.process
+
+log = logging.getLogger(__name__)
+
+
+def _clear_context(minion):
+    """
+    Empty the ``__context__`` of the loaders of ``minion``, a process forked
+    for a job loads the modules again with an empty ``__context__``
+    """
+    cleared = []
+    for name in ("functions", "returners", "executors", "utils"):
+        loader = getattr(minion, name, None)
+        pack = getattr(loader, "pack", None)
+        if not pack:
+            continue
+        context = pack.get("__context__")
+        if context is None or any(context is seen for seen in cleared):
+            continue
+        context.clear()
+        cleared.append(context)
+
+
+def _run_jobs(target, minion, conn, max_jobs):
+    """
+    Run the jobs received on ``conn`` with ``target`` until ``max_jobs`` jobs
+    were run, the pool asks to stop or the minion exits
+    """
+    # The modules of the minion are not loaded again for every job
+    minion.job_pool_worker = True
+    ppid = os.getppid()
+    jobs = 0
+    while not max_jobs or jobs < max_jobs:
+        try:
+            if not conn.poll(5):
+                if os.getppid() != ppid:
+                    # The minion is gone
+                    break
+                continue
+            msg = conn.recv()
+        except (EOFError, OSError):
+            break
+        if msg is None:
+            break
+        data, connected = msg
+        jobs += 1
+        minion.connected = connected
+        # The previous job must not leave anything to this one
+        _clear_context(minion)
+        try:
+            target(minion, minion.opts, data, connected)
+        except Exception:  # pylint: disable=broad-except
+            log.exception("Failed to run job %s", data.get("jid"))
+        finally:
+            # The proc file is removed when the job returns, but not if the
+            # return failed, and the worker outlives the job
+            proc_dir = getattr(minion, "proc_dir", None)
+            if proc_dir:
+                try:
+                    os.remove(os.path.join(proc_dir, data["jid"]))
+                except OSError:
+                    pass
+        try:
+            conn.send(data["jid"])
+        except OSError:
+            break
+
+
+class _Worker:
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        self.jid = None
+        self.jobs = 0
+        self.retired = False
+
+
+class JobPool:
+    """
+    Pre-forked processes running the jobs of ``minion``, at most ``max_jobs``
+    jobs each when it is not 0
+    """
+
+    def __init__(self, minion, size, max_jobs=0):
+        self.minion = minion
+        self.size = size
+        self.max_jobs = max_jobs
+        self.workers = []
+        # The pool is copied in the processes forked by the minion, only the
+        # minion process manages it
+        self._pid = os.getpid()
+
+    def _spawn(self):
+        parent_conn, child_conn = multiprocessing.Pipe()
+        process = salt.utils.process.SignalHandlingProcess(
+            target=_run_jobs,
+            name="JobWorker",
+            args=(self.minion._target, self.minion, child_conn, self.max_jobs),
+        )
+        process.register_after_fork_method(salt.utils.crypt.reinit_crypto)
+        process.start()
+        child_conn.close()
+        self.workers.append(_Worker(process, parent_conn))
+        log.debug("Started job worker with PID %s", process.pid)
+
+    def _reap(self):
+        """
+        Record the jobs finished by the workers and forget the workers which
+        exited
+        """
+        for worker in list(self.workers):
+            try:
+                while worker.jid is not None and worker.conn.poll():
+                    worker.conn.recv()
+                    worker.jid = None
+            except (EOFError, OSError):
+                worker.retired = True
+            if worker.process.is_alive():
+                continue
+            if worker.jid is not None:
+                log.info(
+                    "Job worker with PID %s exited while running job %s",
+                    worker.process.pid,
+                    worker.jid,
+                )
+            worker.process.join()
+            worker.conn.close()
+            self.workers.remove(worker)
+
+    def _fill(self):
+        active = [worker for worker in self.workers if not worker.retired]
+        for _ in range(self.size - len(active)):
+            self._spawn()
+
+    def dispatch(self, data, connected):
+        """
+        Send the job ``data`` to an idle worker and return ``True``, or return
+        ``False`` if no worker is idle
+        """
+        if os.getpid() != self._pid:
+            return False
+        self._reap()
+        dispatched = False
+        for worker in self.workers:
+            if worker.retired or worker.jid is not None:
+                continue
+            try:
+                worker.conn.send((data, connected))
+            except OSError:
+                worker.retired = True
+                continue
+            worker.jid = data["jid"]
+            worker.jobs += 1
+            if self.max_jobs and worker.jobs >= self.max_jobs:
+                # The worker exits once it ran this job
+                worker.retired = True
+            log.debug(
+                "Sent job %s to the job worker with PID %s",
+                data["jid"],
+                worker.process.pid,
+            )
+            dispatched = True
+            break
+        # Replace the workers which exited or are about to, so that the next
+        # jobs find a worker ready
+        self._fill()
+        return dispatched
+
+    def recycle(self):
+        """
+        Replace the workers, once they are done with their current job, by
+        workers forked from the minion as it is now, for example after its
+        modules were refreshed
+        """
+        if os.getpid() != self._pid:
+            return
+        for worker in self.workers:
+            if not worker.retired:
+                worker.retired = True
+                try:
+                    worker.conn.send(None)
+                except OSError:
+                    pass
+        self._reap()
+
+    def stop(self):
+        """
+        Stop the workers, a worker running a job exits once the job is done,
+        like a process forked for a job is not interrupted when the minion
+        stops
+        """
+        self.recycle()
@@ -18,6 +18,7 @@ import salt.payload
 import salt.pillar
 import salt.utils.atomicfile
 import salt.utils.files
+import salt.utils.mine
 import salt.utils.minions
 import salt.utils.platform
 import salt.utils.stringutils
@@ -531,6 +532,10 @@ class MasterPillarUtil:
                     self.cache.store(bank, "data", {"pillar": minion_pillar})
                 if clear_mine:
                     # Delete the whole mine file
+                    if self.opts.get("mine_index", False):
+                        mine_data = self.cache.fetch(bank, "mine")
+                        if isinstance(mine_data, dict):
+                            salt.utils.mine.touch_index(self.cache, mine_data)
                     self.cache.flush(bank, "mine")
                 elif clear_mine_func is not None:
                     # Delete a specific function from the mine file
@@ -538,6 +543,10 @@ class MasterPillarUtil:
                     if isinstance(mine_data, dict):
                         if mine_data.pop(clear_mine_func, False):
                             self.cache.store(bank, "mine", mine_data)
+                            if self.opts.get("mine_index", False):
+                                salt.utils.mine.touch_index(
+                                    self.cache, [clear_mine_func]
+                                )
         except OSError:
             return True
         return True
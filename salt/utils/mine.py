@@ -3,9 +3,14 @@ This module contains routines used for the salt mine
 """
 
 
+import collections
+import hashlib
 import logging
+import uuid
 
 import salt.utils.data
+import salt.utils.json
+import salt.utils.stringutils
 
 log = logging.getLogger(__name__)
 
@@ -13,6 +18,13 @@ MINE_ITEM_ACL_ID = "__saltmine_acl__"
 MINE_ITEM_ACL_VERSION = 1
 MINE_ITEM_ACL_DATA = "__data__"
 
+# Returned by the master when it cannot apply a mine delta
+MINE_DELTA_KEY = "__mine_delta__"
+
+# The cache bank holding a stamp per mine function, changed whenever the mine
+# data of the function changes for any minion
+MINE_INDEX_BANK = "mine_index"
+
 
 def minion_side_acl_denied(minion_acl_cache, mine_minion, mine_function, req_minion):
     """
@@ -108,3 +120,113 @@ def parse_function_definition(function_definition):
     )
 
     return (function_name, function_args, function_kwargs, minion_acl)
+
+
+def function_hash(function_data):
+    """
+    Return a hash of the mine data of a function which does not depend on the
+    order of its keys, or ``None`` if the data cannot be hashed
+    """
+    try:
+        data = salt.utils.json.dumps(function_data, sort_keys=True, default=repr)
+    except (TypeError, ValueError):
+        return None
+    return hashlib.sha256(salt.utils.stringutils.to_bytes(data)).hexdigest()
+
+
+def _index_key(function):
+    # Function aliases are free form, they are not safe as cache keys
+    return hashlib.sha1(salt.utils.stringutils.to_bytes(function)).hexdigest()
+
+
+def touch_index(cache, functions):
+    """
+    Record in ``cache`` that the mine data of ``functions`` changed, which
+    invalidates the data of these functions in the :py:class:`MineIndex` of
+    every master process
+    """
+    for function in functions:
+        cache.store(MINE_INDEX_BANK, _index_key(function), uuid.uuid4().hex)
+
+
+class MineIndex:
+    """
+    The mine data of the minions, indexed per function in the memory of a
+    master process.
+
+    The data of a function is kept until its stamp in the ``mine_index`` cache
+    bank changes, see :py:func:`touch_index`. The data returned for the last
+    ``size`` queries is also kept, until the targeted minions or the stamp of
+    one of the functions change.
+    """
+
+    def __init__(self, cache, size=100):
+        self.cache = cache
+        self.size = size
+        # {function: {"stamp": stamp, "entries": {minion: entry}, "loaded": set()}}
+        self.functions = {}
+        self.results = collections.OrderedDict()
+
+    def _stamps(self, functions):
+        stamps = []
+        for function in functions:
+            stamp = self.cache.fetch(MINE_INDEX_BANK, _index_key(function)) or None
+            index = self.functions.get(function)
+            if index is None or index["stamp"] != stamp:
+                self.functions[function] = {
+                    "stamp": stamp,
+                    "entries": {},
+                    "loaded": set(),
+                }
+            stamps.append(stamp)
+        return tuple(stamps)
+
+    def _load(self, minions, functions):
+        """
+        Fetch the mine data of the minions which are not yet in the index of
+        all of ``functions``
+        """
+        indexes = [self.functions[function] for function in functions]
+        for minion in minions:
+            missing = [
+                (function, index)
+                for function, index in zip(functions, indexes)
+                if minion not in index["loaded"]
+            ]
+            if not missing:
+                continue
+            mine_data = self.cache.fetch("minions/{}".format(minion), "mine")
+            if not isinstance(mine_data, dict):
+                mine_data = {}
+            for function, index in missing:
+                index["loaded"].add(minion)
+                if function in mine_data:
+                    index["entries"][minion] = mine_data[function]
+
+    def get(self, query, minions, functions):
+        """
+        Return the mine data of ``functions`` for ``minions``, as a dict of
+        minion IDs to dicts of function names to mine entries. ``query``
+        identifies the targeting used to find the minions.
+        """
+        functions = list(functions)
+        stamps = self._stamps(functions)
+        minions = frozenset(minions)
+        key = (query, tuple(functions))
+        cached = self.results.get(key)
+        if cached is not None and cached[0] == stamps and cached[1] == minions:
+            self.results.move_to_end(key)
+            return cached[2]
+
+        self._load(minions, functions)
+        ret = {}
+        for function in functions:
+            entries = self.functions[function]["entries"]
+            for minion in minions:
+                if minion in entries:
+                    ret.setdefault(minion, {})[function] = entries[minion]
+        self.results[key] = (stamps, minions, ret)
+        self.results.move_to_end(key)
+        while len(self.results) > self.size:
+            self.results.popitem(last=False)
+        return ret
@@ -0,0 +1,246 @@
+"""
+Profiling of the render phase of a highstate
+
+.. versionadded:: 3005
+
+When the ``state_render_profile`` option is enabled, or when
+``state.show_highstate`` is called with ``profile=True``, the time spent to
+compile the highstate is recorded:
+
+- Per SLS file, the time spent in each renderer of its render pipe (for
+  example ``jinja`` and ``yaml``), the time spent fetching the SLS file and
+  the templates it includes or imports, the number of those fetches which
+  were served from the minion file cache and the depth of the SLS in the
+  include graph
+- The time spent in the top file, in the reconciliation of the ``extend``
+  declarations, in the verification of the high data, in the resolution of
+  the requisites and in the compilation of the low chunks
+- The number of times the templates deserialized YAML or JSON data, and the
+  number of times they reused data already deserialized
+
+The recorded stacks are written, with their self time in microseconds, in the
+folded format used by flamegraph tools to
+``<cachedir>/render_profile/<jid>.folded``:
+
+.. code-block:: bash
+
+    flamegraph.pl /var/cache/salt/minion/render_profile/highstate.folded > render.svg
+
+The per SLS data can be displayed as a table with the ``profile`` outputter.
+"""
+
+import contextlib
+import logging
+import os
+import time
+
+import salt.utils.files
+import salt.utils.url
+
+log = logging.getLogger(__name__)
+
+
+def enabled(opts):
+    """
+    Return ``True`` if the render phase of highstates is profiled
+    """
+    return bool(opts.get("state_render_profile", False))
+
+
+@contextlib.contextmanager
+def span(profile, name):
+    """
+    Record the time spent in the block as the frame ``name`` of ``profile``,
+    do nothing if ``profile`` is ``None``
+    """
+    if profile is None:
+        yield
+        return
+    profile.push(name)
+    try:
+        yield
+    finally:
+        profile.pop()
+
+
+def _ms(seconds):
+    return round(seconds * 1000.0, 4)
+
+
+class RenderProfile:
+    """
+    The frames and per SLS statistics recorded while compiling a highstate
+    """
+
+    def __init__(self):
+        self.folded = {}
+        self.phases = {}
+        self.sls_stats = {}
+        self.fetches = 0
+        self.cache_hits = 0
+        # The YAML/JSON data loaded by templates, see ParsedDataCache
+        self.parsed_data = {"parses": 0, "hits": 0}
+        self._stack = []
+        self._sls_stack = []
+        self._get_file = None
+        self._client = None
+
+    def push(self, name):
+        """
+        Start the frame ``name`` in the current frame
+        """
+        self._stack.append([name, time.perf_counter(), 0.0])
+
+    def pop(self):
+        """
+        End the current frame and return the time spent in it in seconds
+        """
+        name, start, children = self._stack.pop()
+        elapsed = time.perf_counter() - start
+        key = ";".join([frame[0] for frame in self._stack] + [name])
+        self.folded[key] = self.folded.get(key, 0.0) + elapsed - children
+        if self._stack:
+            self._stack[-1][2] += elapsed
+        else:
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed
+        return elapsed
+
+    @contextlib.contextmanager
+    def sls(self, saltenv, sls):
+        """
+        Record the rendering of an SLS file, including the SLS files it
+        includes
+        """
+        stats = self.sls_stats.setdefault(
+            "{}:{}".format(saltenv, sls),
+            {
+                "saltenv": saltenv,
+                "sls": sls,
+                "depth": len(self._sls_stack),
+                "render": {},
+                "fetch": 0.0,
+                "fetches": 0,
+                "cache_hits": 0,
+                "total": 0.0,
+            },
+        )
+        self._sls_stack.append(stats)
+        self.push("sls:{}:{}".format(saltenv, sls))
+        try:
+            yield
+        finally:
+            stats["total"] += self.pop()
+            self._sls_stack.pop()
+
+    @contextlib.contextmanager
+    def renderer(self, name):
+        """
+        Record the time spent in the renderer ``name`` of a render pipe
+        """
+        self.push("render:{}".format(name))
+        try:
+            yield
+        finally:
+            elapsed = self.pop()
+            if self._sls_stack:
+                render = self._sls_stack[-1]["render"]
+                render[name] = render.get(name, 0.0) + elapsed
+
+    def _fetched(self, elapsed, hit):
+        self.fetches += 1
+        self.cache_hits += int(hit)
+        if self._sls_stack:
+            stats = self._sls_stack[-1]
+            stats["fetch"] += elapsed
+            stats["fetches"] += 1
+            stats["cache_hits"] += int(hit)
+
+    def track(self, client):
+        """
+        Record the files fetched by the file client ``client`` until
+        :py:meth:`untrack` is called. A fetch is a cache hit if the file was
+        already cached and was not fetched again.
+        """
+        get_file = self._get_file = client.get_file
+        self._client = client
+
+        def _get_file(path, dest="", makedirs=False, saltenv="base", *args, **kwargs):
+            if not path.startswith("salt://"):
+                return get_file(path, dest, makedirs, saltenv, *args, **kwargs)
+            url, senv = salt.utils.url.parse(path)
+            cached = client.is_cached(path, senv or saltenv)
+            try:
+                mtime = os.path.getmtime(cached) if cached else None
+            except OSError:
+                mtime = None
+            self.push("fetch:{}".format(salt.utils.url.create(url)))
+            try:
+                ret = get_file(path, dest, makedirs, saltenv, *args, **kwargs)
+            finally:
+                elapsed = self.pop()
+            try:
+                hit = mtime is not None and os.path.getmtime(cached) == mtime
+            except OSError:
+                hit = False
+            self._fetched(elapsed, hit)
+            return ret
+
+        client.get_file = _get_file
+
+    def untrack(self):
+        """
+        Stop recording the files fetched by the file client
+        """
+        if self._get_file is not None:
+            self._client.get_file = self._get_file
+            self._get_file = None
+            self._client = None
+
+    def write_folded(self, path):
+        """
+        Write the recorded stacks to ``path`` in the folded format, with their
+        self time in microseconds
+        """
+        with salt.utils.files.fopen(path, "w") as fp_:
+            for key, seconds in sorted(self.folded.items()):
+                fp_.write("{} {}\n".format(key, max(int(seconds * 1000000), 0)))
+
+    def save(self, opts, name=None):
+        """
+        Write the folded stacks to the ``render_profile`` directory of the
+        cachedir and return the path of the file, or ``None`` on failure
+        """
+        profile_dir = os.path.join(opts["cachedir"], "render_profile")
+        path = os.path.join(profile_dir, "{}.folded".format(name or "highstate"))
+        try:
+            os.makedirs(profile_dir, exist_ok=True)
+            self.write_folded(path)
+        except OSError as exc:
+            log.error("Unable to write the render profile to %s: %s", path, exc)
+            return None
+        return path
+
+    def report(self):
+        """
+        Return the recorded data, with the times in milliseconds and the SLS
+        files sorted by decreasing render time
+        """
+        sls = []
+        for stats in sorted(
+            self.sls_stats.values(), key=lambda item: item["total"], reverse=True
+        ):
+            stats = dict(stats)
+            stats["render"] = {
+                name: _ms(seconds) for name, seconds in stats["render"].items()
+            }
+            stats["fetch"] = _ms(stats["fetch"])
+            stats["total"] = _ms(stats["total"])
+            sls.append(stats)
+        return {
+            "phases": {name: _ms(seconds) for name, seconds in self.phases.items()},
+            "sls": sls,
+            "fetches": self.fetches,
+            "cache_hits": self.cache_hits,
+            "parsed_data": dict(self.parsed_data),
+            "include_depth": max([stats["depth"] for stats in sls] or [0]),
+        }
@@ -174,6 +174,10 @@ class Schedule:
         self.schedule_returner = self.option("schedule_returner")
         # Keep track of the lowest loop interval needed in this variable
         self.loop_interval = sys.maxsize
+        # The jobs which do not need to be evaluated until they are due, as
+        # {name: (data, due time)}, see _cache_eval
+        self._eval_cache = {}
+        self._eval_globals = None
         if not self.standalone:
             clean_proc_dir(opts)
         if cleanup:
@@ -222,9 +226,20 @@ class Schedule:
                             del schedule[job][item]
         return schedule
 
-    def _check_max_running(self, func, data, opts, now):
+    def _get_running_jobs(self):
+        """
+        Return the jobs currently running
+        """
+        if self.opts["__role"] == "master":
+            return salt.utils.master.get_running_jobs(self.opts)
+        return salt.utils.minion.running(self.opts)
+
+    def _check_max_running(self, func, data, opts, now, current_jobs=None):
         """
         Return the schedule data structure
+
+        ``current_jobs`` are the jobs currently running, they are read from
+        the proc directory when not passed
         """
         # Check to see if there are other jobs with this
         # signature running.  If there are more than maxrunning
@@ -238,10 +253,8 @@ class Schedule:
             return data
         if "jid_include" not in data or data["jid_include"]:
             jobcount = 0
-            if self.opts["__role"] == "master":
-                current_jobs = salt.utils.master.get_running_jobs(self.opts)
-            else:
-                current_jobs = salt.utils.minion.running(self.opts)
+            if current_jobs is None:
+                current_jobs = self._get_running_jobs()
             for job in current_jobs:
                 if "schedule" in job:
                     log.debug(
@@ -345,6 +358,7 @@ class Schedule:
         self.enabled = True
         self.splay = None
         self.opts["schedule"] = {}
+        self._eval_cache = {}
 
     def delete_job_prefix(self, name, persist=True):
         """
@@ -941,6 +955,71 @@ class Schedule:
                         # Let's make sure we exit the process!
                         sys.exit(salt.defaults.exitcodes.EX_GENERIC)
 
+    # The items of a job set by eval for the last evaluation only
+    _EVAL_TRANSIENT_ITEMS = (
+        "_continue",
+        "_error",
+        "_enabled",
+        "_skipped",
+        "_skip_reason",
+        "_skipped_time",
+    )
+
+    def _cache_eval(self, job, data):
+        """
+        Record when the job ``data``, which was just evaluated, is due. Until
+        then, evaluating it again does not change it unless it is modified,
+        which avoids parsing its schedule again and again.
+
+        Only the jobs run at intervals or by cron, and without an explicit run
+        time, are cached. Their next fire time only changes when they run, or
+        are skipped.
+        """
+        if (
+            not isinstance(data, dict)
+            or not self.enabled
+            or not data.get("enabled", True)
+            or data.get("_run_on_start")
+            or data.get("_continue")
+            or data.get("_error")
+            or any(item in data for item in ("when", "once", "run_explicit"))
+            or ("_seconds" not in data and "cron" not in data)
+        ):
+            return
+        if data.get("_splay"):
+            due = data["_splay"]
+        elif data.get("_next_fire_time"):
+            # A job is run once the current second is the one it is due
+            due = data["_next_fire_time"] - datetime.timedelta(
+                microseconds=data["_next_fire_time"].microsecond
+            )
+        else:
+            return
+        try:
+            snapshot = copy.deepcopy(
+                {
+                    key: value
+                    for key, value in data.items()
+                    if key not in self._EVAL_TRANSIENT_ITEMS
+                }
+            )
+        except Exception:  # pylint: disable=broad-except
+            return
+        self._eval_cache[job] = (snapshot, due)
+
+    def _cached_eval(self, job, data, now):
+        """
+        Return ``True`` if the job ``data`` is not due and has not been
+        modified since it was evaluated, in which case evaluating it is a
+        no-op
+        """
+        cached = self._eval_cache.get(job)
+        if cached is None or now >= cached[1]:
+            return False
+        for item in self._EVAL_TRANSIENT_ITEMS:
+            data.pop(item, None)
+        return data == cached[0]
+
     def eval(self, now=None):
         """
         Evaluate and execute the schedule
@@ -1453,6 +1532,25 @@ class Schedule:
         if "splay" in schedule:
             self.splay = schedule["splay"]
 
+        _globals = (
+            self.enabled,
+            self.splay,
+            self.skip_function,
+            self.skip_during_range,
+        )
+        if _globals != self._eval_globals:
+            self._eval_cache = {}
+            self._eval_globals = copy.deepcopy(_globals)
+        for name in list(self._eval_cache):
+            if name not in schedule:
+                del self._eval_cache[name]
+
+        if not now:
+            now = datetime.datetime.now()
+
+        # The jobs currently running, read once when a job is about to run
+        running_jobs = None
+
         _hidden = ["enabled", "skip_function", "skip_during_range", "splay"]
         for job, data in schedule.items():
 
@@ -1460,15 +1558,14 @@ class Schedule:
             if job in _hidden:
                 continue
 
+            # Skip the jobs which are not due and were not modified since they
+            # were last evaluated
+            if self._cached_eval(job, data, now):
+                continue
+            self._eval_cache.pop(job, None)
+
             # Clear these out between runs
-            for item in [
-                "_continue",
-                "_error",
-                "_enabled",
-                "_skipped",
-                "_skip_reason",
-                "_skipped_time",
-            ]:
+            for item in self._EVAL_TRANSIENT_ITEMS:
                 if item in data:
                     del data[item]
             run = False
@@ -1511,9 +1608,6 @@ class Schedule:
             ):
                 data["_run_on_start"] = True
 
-            if not now:
-                now = datetime.datetime.now()
-
             # Used for quick lookups when detecting invalid option
             # combinations.
             schedule_keys = set(data.keys())
@@ -1741,7 +1835,11 @@ class Schedule:
 
                     if not self.standalone:
                         data["run"] = run
-                        data = self._check_max_running(func, data, self.opts, now)
+                        if running_jobs is None and data["jid_include"]:
+                            running_jobs = self._get_running_jobs()
+                        data = self._check_max_running(
+                            func, data, self.opts, now, current_jobs=running_jobs
+                        )
                         run = data["run"]
 
                 # Check run again, just in case _check_max_running
@@ -1775,6 +1873,7 @@ class Schedule:
                         data["_next_fire_time"] = now + datetime.timedelta(
                             seconds=data["_seconds"]
                         )
+            self._cache_eval(job, data)
         return jids
 
     def _run_job(self, func, data, jid=None):
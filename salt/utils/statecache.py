@@ -0,0 +1,247 @@
+"""
+Cache of the compiled highstate of a minion
+
+.. versionadded:: 3005
+
+Running a highstate renders the top file and every matching SLS file, then
+reconciles ``extend`` declarations, resolves the ``require_in`` style
+requisites and compiles the result into low chunks. When the
+``state_compile_cache`` option is enabled, the low chunks are stored in the
+minion cachedir together with the hashes of everything they were compiled
+from:
+
+- The grains and pillar of the minion and the options used to render states
+- The ``master_tops`` data of the minion
+- Every file fetched from the fileserver while rendering, which includes the
+  top files, the SLS files and the templates they include or import, as well
+  as the files which were looked for but did not exist
+- The list of available SLS files in each matching environment
+
+The next highstate only fetches the hashes of those files from the fileserver
+and, if nothing changed, executes the cached low chunks without rendering
+anything. The cache assumes that rendering only depends on these inputs, SLS
+files which render differently on every run (for example because they call
+execution modules or use the current time) must not use this cache.
+
+The cache lives in the minion cachedir, so ``saltutil.clear_cache`` also
+removes it.
+"""
+
+import hashlib
+import logging
+import os
+
+import salt.payload
+import salt.utils.atomicfile
+import salt.utils.files
+import salt.utils.json
+import salt.utils.url
+import salt.version
+
+log = logging.getLogger(__name__)
+
+# The options which change how states are rendered and compiled
+RENDER_OPTS = (
+    "id",
+    "saltenv",
+    "pillarenv",
+    "test",
+    "renderer",
+    "renderer_blacklist",
+    "renderer_whitelist",
+    "state_top",
+    "state_top_saltenv",
+    "top_file_merging_strategy",
+    "env_order",
+    "default_top",
+    "file_roots",
+    "nodegroups",
+    "state_auto_order",
+    "jinja_env",
+    "jinja_sls_env",
+    "jinja_lstrip_blocks",
+    "jinja_trim_blocks",
+)
+
+
+def enabled(opts):
+    """
+    Return ``True`` if compiled highstates are cached
+    """
+    return bool(opts.get("state_compile_cache", False))
+
+
+def _digest(data):
+    """
+    Return a hash of ``data`` which does not depend on the order of the keys
+    of its dictionaries
+    """
+    return hashlib.sha256(
+        salt.utils.json.dumps(data, sort_keys=True, default=repr).encode("utf-8")
+    ).hexdigest()
+
+
+class CompiledHighStateCache:
+    """
+    The compiled highstate of a minion, stored in the minion cachedir
+
+    :param highstate: The :py:class:`salt.state.BaseHighState` running the
+        highstate
+    :param str cache_name: The name of the highstate cache
+    """
+
+    def __init__(self, highstate, cache_name="highstate"):
+        self.highstate = highstate
+        self.opts = highstate.opts
+        self.path = os.path.join(
+            self.opts["cachedir"], "{}.compiled.p".format(cache_name)
+        )
+        self.cache_name = cache_name
+        self.files = set()
+        self.hit = False
+        self.reason = None
+        self._key = None
+        self._get_file = None
+
+    def key(self, exclude=None, whitelist=None):
+        """
+        Return the hash of the inputs of the highstate which are known before
+        rendering anything
+        """
+        if self._key is None:
+            self._key = _digest(
+                {
+                    "version": salt.version.__version__,
+                    "opts": {opt: self.opts.get(opt) for opt in RENDER_OPTS},
+                    "grains": self.opts.get("grains", {}),
+                    "pillar": self.highstate.state.opts.get("pillar", {}),
+                    "master_tops": self.highstate._master_tops(),
+                    "exclude": exclude,
+                    "whitelist": whitelist,
+                }
+            )
+        return self._key
+
+    def _load(self):
+        if not os.path.isfile(self.path):
+            return None
+        try:
+            with salt.utils.files.fopen(self.path, "rb") as fp_:
+                return salt.payload.load(fp_)
+        except Exception as exc:  # pylint: disable=broad-except
+            log.debug("Unable to read the compiled highstate %s: %s", self.path, exc)
+            return None
+
+    def _avail(self, envs):
+        return {saltenv: _digest(self.highstate.avail[saltenv]) for saltenv in envs}
+
+    def _hashes(self, files):
+        return [
+            [path, saltenv, self.highstate.client.hash_file(path, saltenv)]
+            for path, saltenv in sorted(files)
+        ]
+
+    def _miss_reason(self, entry, key):
+        """
+        Return why the cached ``entry`` cannot be used, or ``None`` if it can
+        """
+        if entry is None:
+            return "no compiled highstate is cached"
+        if not isinstance(entry, dict) or entry.get("key") != key:
+            return "the grains, pillar, master_tops or options changed"
+        avail = self._avail(entry["avail"])
+        for saltenv, digest in entry["avail"].items():
+            if avail[saltenv] != digest:
+                return "the SLS files of saltenv {} changed".format(saltenv)
+        for path, saltenv, hash_info in entry["files"]:
+            if self.highstate.client.hash_file(path, saltenv) != hash_info:
+                return "{} in saltenv {} changed".format(path, saltenv)
+        return None
+
+    def fetch(self, exclude=None, whitelist=None):
+        """
+        Return the cached compiled highstate, a dictionary with the
+        ``matches`` of the top file and the low ``chunks``, if none of its
+        inputs changed. Otherwise return ``None``.
+        """
+        entry = self._load()
+        try:
+            self.reason = self._miss_reason(entry, self.key(exclude, whitelist))
+        except Exception as exc:  # pylint: disable=broad-except
+            self.reason = "unable to verify the compiled highstate: {}".format(exc)
+        self.hit = self.reason is None
+        log.info(
+            "Compiled highstate cache %s for %s%s",
+            "hit" if self.hit else "miss",
+            self.opts.get("id"),
+            "" if self.hit else ": {}".format(self.reason),
+        )
+        return entry if self.hit else None
+
+    def state_return(self):
+        """
+        Return the result of a pseudo state reporting whether the compiled
+        highstate was reused and why not, listed before the states of the
+        highstate
+        """
+        if self.hit:
+            comment = "The compiled highstate was reused"
+        else:
+            comment = "The highstate was compiled again: {}".format(self.reason)
+        return {
+            "state_compile_cache_|-compiled_highstate_|-{}_|-{}".format(
+                self.cache_name, "hit" if self.hit else "miss"
+            ): {
+                "result": True,
+                "comment": comment,
+                "name": self.cache_name,
+                "changes": {},
+                "__id__": "compiled_highstate",
+                "__run_num__": -1,
+                "__sls__": None,
+            }
+        }
+
+    def track(self):
+        """
+        Record the files fetched from the fileserver by the file client of the
+        highstate until :py:meth:`untrack` is called
+        """
+        client = self.highstate.client
+        get_file = self._get_file = client.get_file
+        files = self.files
+
+        def _get_file(path, dest="", makedirs=False, saltenv="base", *args, **kwargs):
+            if path.startswith("salt://"):
+                url, senv = salt.utils.url.parse(path)
+                files.add((salt.utils.url.create(url), senv or saltenv))
+            return get_file(path, dest, makedirs, saltenv, *args, **kwargs)
+
+        client.get_file = _get_file
+
+    def untrack(self):
+        """
+        Stop recording the files fetched by the file client of the highstate
+        """
+        if self._get_file is not None:
+            self.highstate.client.get_file = self._get_file
+            self._get_file = None
+
+    def store(self, matches, chunks):
+        """
+        Store the low chunks compiled for the ``matches`` of the top file
+        """
+        self.untrack()
+        try:
+            entry = {
+                "key": self.key(),
+                "avail": self._avail(matches),
+                "files": self._hashes(self.files),
+                "matches": matches,
+                "chunks": chunks,
+            }
+            with salt.utils.files.set_umask(0o077):
+                with salt.utils.atomicfile.atomic_open(self.path, "w+b") as fp_:
+                    salt.payload.dump(entry, fp_)
+        except Exception as exc:  # pylint: disable=broad-except
+            log.debug("Unable to cache the compiled highstate: %s", exc)
@@ -6,6 +6,7 @@ import logging
 import os
 import sys
 import tempfile
+import threading
 import traceback
 from pathlib import Path
 
@@ -377,22 +378,46 @@ def _get_jinja_error(trace, context=None):
     return line, out
 
 
-def render_jinja_tmpl(tmplstr, context, tmplpath=None):
-    opts = context["opts"]
-    saltenv = context["saltenv"]
-    loader = None
-    newline = False
-    file_client = context.get("fileclient", None)
+# The Jinja environments reused across the renders of a highstate or a
+# pillar, see _get_jinja_env and clear_jinja_envs
+_JINJA_ENVS = OrderedDict()
+_JINJA_ENVS_MAX = 32
 
-    if tmplstr and not isinstance(tmplstr, str):
-        # https://jinja.palletsprojects.com/en/2.11.x/api/#unicode
-        tmplstr = tmplstr.decode(SLS_ENCODING)
 
-    if tmplstr.endswith(os.linesep):
-        newline = os.linesep
-    elif tmplstr.endswith("\n"):
-        newline = "\n"
+def _get_jinja_env(opts, saltenv, tmplpath, context, env_args):
+    """
+    Return a Jinja environment for rendering a template with the given
+    ``env_args``, reusing the environment of a previous render in this thread
+    with the same options, saltenv, file client and environment settings.
+
+    The globals and the template cache of a reused environment are reset, the
+    compiled code of the templates is reused through the bytecode cache.
+    """
+    file_client = context.get("fileclient", None)
+    pillar_rend = context.get("_pillar_rend", False)
+    key = (
+        threading.get_ident(),
+        id(opts),
+        id(file_client),
+        saltenv,
+        pillar_rend,
+        None if saltenv else tmplpath and os.path.dirname(tmplpath),
+        opts.get("allow_undefined", False),
+        repr(sorted(env_args.items())),
+    )
+    entry = _JINJA_ENVS.get(key)
+    if entry is not None and entry[0] is opts and entry[1] is file_client:
+        _JINJA_ENVS.move_to_end(key)
+        jinja_env, base_globals = entry[2], entry[3]
+        jinja_env.globals.clear()
+        jinja_env.globals.update(base_globals)
+        jinja_env.cache.clear()
+        if isinstance(jinja_env.loader, salt.utils.jinja.SaltCacheLoader):
+            jinja_env.loader.cached = []
+            jinja_env.loader.template_sources = context.get("_template_sources")
+        return jinja_env
 
+    loader = None
     if not saltenv:
         if tmplpath:
             loader = jinja2.FileSystemLoader(os.path.dirname(tmplpath))
@@ -400,19 +425,81 @@ def render_jinja_tmpl(tmplstr, context, tmplpath=None):
         loader = salt.utils.jinja.SaltCacheLoader(
             opts,
             saltenv,
-            pillar_rend=context.get("_pillar_rend", False),
+            pillar_rend=pillar_rend,
             _file_client=file_client,
+            _template_sources=context.get("_template_sources"),
         )
 
-    env_args = {"extensions": [], "loader": loader}
-
+    extensions = []
     if hasattr(jinja2.ext, "with_"):
-        env_args["extensions"].append("jinja2.ext.with_")
+        extensions.append("jinja2.ext.with_")
     if hasattr(jinja2.ext, "do"):
-        env_args["extensions"].append("jinja2.ext.do")
+        extensions.append("jinja2.ext.do")
     if hasattr(jinja2.ext, "loopcontrols"):
-        env_args["extensions"].append("jinja2.ext.loopcontrols")
-    env_args["extensions"].append(salt.utils.jinja.SerializerExtension)
+        extensions.append("jinja2.ext.loopcontrols")
+    extensions.append(salt.utils.jinja.SerializerExtension)
+
+    env_args = dict(
+        env_args,
+        extensions=extensions,
+        loader=loader,
+        bytecode_cache=salt.utils.jinja.get_bytecode_cache(opts),
+    )
+    if opts.get("allow_undefined", False):
+        jinja_env = jinja2.sandbox.SandboxedEnvironment(**env_args)
+    else:
+        jinja_env = jinja2.sandbox.SandboxedEnvironment(
+            undefined=jinja2.StrictUndefined, **env_args
+        )
+
+    indent_filter = jinja_env.filters.get("indent")
+    jinja_env.tests.update(JinjaTest.salt_jinja_tests)
+    jinja_env.filters.update(JinjaFilter.salt_jinja_filters)
+    if salt.utils.jinja.JINJA_VERSION >= LooseVersion("2.11"):
+        # Use the existing indent filter on Jinja versions where it's not broken
+        jinja_env.filters["indent"] = indent_filter
+    jinja_env.globals.update(JinjaGlobal.salt_jinja_globals)
+
+    # globals
+    jinja_env.globals["odict"] = OrderedDict
+    jinja_env.globals["show_full_context"] = salt.utils.jinja.show_full_context
+
+    jinja_env.tests["list"] = salt.utils.data.is_list
+
+    _JINJA_ENVS[key] = (opts, file_client, jinja_env, dict(jinja_env.globals))
+    while len(_JINJA_ENVS) > _JINJA_ENVS_MAX:
+        _JINJA_ENVS.popitem(last=False)
+    return jinja_env
+
+
+def clear_jinja_envs():
+    """
+    Drop the Jinja environments kept by this thread, and by the threads which
+    exited, once a highstate or a pillar is rendered. They hold the options
+    and the file client of the render, which are not used again.
+    """
+    alive = {thread.ident for thread in threading.enumerate()}
+    alive.discard(threading.get_ident())
+    for key in list(_JINJA_ENVS):
+        if key[0] not in alive:
+            _JINJA_ENVS.pop(key, None)
+
+
+def render_jinja_tmpl(tmplstr, context, tmplpath=None):
+    opts = context["opts"]
+    saltenv = context["saltenv"]
+    newline = False
+
+    if tmplstr and not isinstance(tmplstr, str):
+        # https://jinja.palletsprojects.com/en/2.11.x/api/#unicode
+        tmplstr = tmplstr.decode(SLS_ENCODING)
+
+    if tmplstr.endswith(os.linesep):
+        newline = os.linesep
+    elif tmplstr.endswith("\n"):
+        newline = "\n"
+
+    env_args = {}
 
     opt_jinja_env = opts.get("jinja_env", {})
     opt_jinja_sls_env = opts.get("jinja_sls_env", {})
@@ -455,26 +542,7 @@ def render_jinja_tmpl(tmplstr, context, tmplpath=None):
     else:
         opt_jinja_env_helper(opt_jinja_env, "jinja_env")
 
-    if opts.get("allow_undefined", False):
-        jinja_env = jinja2.sandbox.SandboxedEnvironment(**env_args)
-    else:
-        jinja_env = jinja2.sandbox.SandboxedEnvironment(
-            undefined=jinja2.StrictUndefined, **env_args
-        )
-
-    indent_filter = jinja_env.filters.get("indent")
-    jinja_env.tests.update(JinjaTest.salt_jinja_tests)
-    jinja_env.filters.update(JinjaFilter.salt_jinja_filters)
-    if salt.utils.jinja.JINJA_VERSION >= LooseVersion("2.11"):
-        # Use the existing indent filter on Jinja versions where it's not broken
-        jinja_env.filters["indent"] = indent_filter
-    jinja_env.globals.update(JinjaGlobal.salt_jinja_globals)
-
-    # globals
-    jinja_env.globals["odict"] = OrderedDict
-    jinja_env.globals["show_full_context"] = salt.utils.jinja.show_full_context
-
-    jinja_env.tests["list"] = salt.utils.data.is_list
+    jinja_env = _get_jinja_env(opts, saltenv, tmplpath, context, env_args)
 
     decoded_context = {}
     for key, value in context.items():
@@ -498,7 +566,7 @@ def render_jinja_tmpl(tmplstr, context, tmplpath=None):
 
     jinja_env.globals.update(decoded_context)
     try:
-        template = jinja_env.from_string(tmplstr)
+        template = salt.utils.jinja.template_from_string(jinja_env, tmplstr)
         output = template.render(**decoded_context)
     except jinja2.exceptions.UndefinedError as exc:
         trace = traceback.extract_tb(sys.exc_info()[2])
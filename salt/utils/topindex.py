@@ -0,0 +1,192 @@
+"""
+Index of the targets of a top file
+
+.. versionadded:: 3005
+
+Matching a top file against a minion calls the ``confirm_top`` matcher for
+every target of the top file. For top files with thousands of targets, most of
+which are minion IDs or globs, this is where most of the time goes. When the
+``top_file_index`` option is enabled, the targets of each environment of a top
+file are classified once:
+
+- Minion IDs and lists of minion IDs are kept in a hash map
+- Globs are grouped by their literal prefix, so that only the globs whose
+  prefix is also a prefix of the minion ID are evaluated
+- Grain targets are grouped by their top level grain, so that they are only
+  evaluated when the minion has that grain
+
+All other targets, such as compound or PCRE targets, are still passed to the
+``confirm_top`` matcher. The index is cached per process, keyed by the hash of
+the targets, so that it is built once and then reused for every minion.
+"""
+
+import fnmatch
+import hashlib
+import logging
+import os
+
+from salt.defaults import DEFAULT_TARGET_DELIM
+from salt.utils.minions import parse_target
+from salt.utils.odict import OrderedDict
+
+log = logging.getLogger(__name__)
+
+# The number of indexes kept by each process
+INDEX_CACHE_SIZE = 32
+_INDEX_CACHE = OrderedDict()
+
+GLOB_CHARS = frozenset("*?[")
+COMPOUND_OPERATORS = frozenset(("and", "or", "not", "(", ")"))
+
+
+def enabled(opts):
+    """
+    Return ``True`` if top file targets are indexed
+    """
+    return bool(opts.get("top_file_index", False))
+
+
+def _matcher(data):
+    """
+    Return the name of the matcher used for the data of a top file target
+    """
+    matcher = "compound"
+    if isinstance(data, (list, tuple)):
+        for item in data:
+            if isinstance(item, dict) and "match" in item:
+                matcher = item["match"]
+    return matcher
+
+
+class TopIndex:
+    """
+    The index of the targets of an environment of a top file
+    """
+
+    def __init__(self, targets):
+        # Minion IDs mapped to the targets naming them
+        self.ids = {}
+        # Minion IDs from lists of minion IDs, which are case sensitive
+        self.list_ids = {}
+        # Globs grouped by their literal prefix
+        self.globs = {}
+        # Grain targets mapped to their top level grain
+        self.grains = {}
+        # Targets which are decided by looking up the minion ID
+        self.id_targets = set()
+        for tgt, matcher in targets:
+            self._add(tgt, matcher)
+
+    def _add_glob(self, tgt, pattern):
+        pattern = os.path.normcase(pattern)
+        if not GLOB_CHARS.intersection(pattern):
+            self.ids.setdefault(pattern, set()).add(tgt)
+        else:
+            prefix = pattern
+            for idx, char in enumerate(pattern):
+                if char in GLOB_CHARS:
+                    prefix = pattern[:idx]
+                    break
+            self.globs.setdefault(prefix, []).append((pattern, tgt))
+        self.id_targets.add(tgt)
+
+    def _add_list(self, tgt, pattern):
+        for minion_id in pattern.split(","):
+            self.list_ids.setdefault(minion_id, set()).add(tgt)
+        self.id_targets.add(tgt)
+
+    def _add_grain(self, tgt, pattern):
+        grain = pattern.split(DEFAULT_TARGET_DELIM, 1)[0]
+        if DEFAULT_TARGET_DELIM in pattern and grain != "*":
+            self.grains[tgt] = grain
+
+    def _add(self, tgt, matcher):
+        if not isinstance(tgt, str):
+            return
+        if matcher == "glob":
+            self._add_glob(tgt, tgt)
+        elif matcher == "list":
+            self._add_list(tgt, tgt)
+        elif matcher == "grain":
+            self._add_grain(tgt, tgt)
+        elif matcher == "compound":
+            words = tgt.split()
+            if len(words) != 1 or tgt in COMPOUND_OPERATORS:
+                return
+            target_info = parse_target(tgt)
+            if not target_info["engine"]:
+                self._add_glob(tgt, target_info["pattern"])
+            elif target_info["engine"] == "L":
+                self._add_list(tgt, target_info["pattern"])
+            elif target_info["engine"] == "G" and not target_info["delimiter"]:
+                self._add_grain(tgt, target_info["pattern"])
+
+    def id_matches(self, minion_id, list_id):
+        """
+        Return the targets decided by the minion ID which match the minion
+        """
+        matches = set(self.list_ids.get(list_id, ()))
+        minion_id = os.path.normcase(minion_id)
+        matches.update(self.ids.get(minion_id, ()))
+        for idx in range(len(minion_id) + 1):
+            for pattern, tgt in self.globs.get(minion_id[:idx], ()):
+                if fnmatch.fnmatchcase(minion_id, pattern):
+                    matches.add(tgt)
+        return matches
+
+    def confirm_top(self, opts, body, confirm):
+        """
+        Return a function with the same signature as the ``confirm_top``
+        matcher, which uses the index to decide the targets of ``body`` for
+        the minion and only calls ``confirm`` for the others.
+        """
+        minion_id = str(opts.get("minion_id", opts.get("id")))
+        matches = self.id_matches(minion_id, str(opts.get("id")))
+        grains = opts.get("grains") or {}
+
+        def _confirm_top(match, data, nodegroups=None):
+            try:
+                orig = body[match]
+            except (KeyError, TypeError):
+                orig = None
+            # Targets of subfilters are not part of the index
+            if orig is data or (isinstance(orig, str) and data == [orig]):
+                if match in self.id_targets:
+                    return match in matches
+                if match in self.grains and self.grains[match] not in grains:
+                    return False
+            return confirm(match, data, nodegroups)
+
+        return _confirm_top
+
+
+def get_index(body):
+    """
+    Return the index of the targets of ``body``, an environment of a top
+    file, from the cache of this process or build it
+    """
+    targets = [(tgt, _matcher(data)) for tgt, data in body.items()]
+    digest = hashlib.sha256(repr(targets).encode("utf-8")).hexdigest()
+    try:
+        index = _INDEX_CACHE[digest]
+        _INDEX_CACHE.move_to_end(digest)
+        return index
+    except KeyError:
+        pass
+    log.debug("Building the index of %d top file targets", len(targets))
+    index = TopIndex(targets)
+    _INDEX_CACHE[digest] = index
+    while len(_INDEX_CACHE) > INDEX_CACHE_SIZE:
+        _INDEX_CACHE.popitem(last=False)
+    return index
+
+
+def confirm_top(opts, body, confirm):
+    """
+    Return the function which decides if the targets of ``body``, an
+    environment of a top file, match the minion. If ``top_file_index`` is not
+    enabled, this is ``confirm``, the ``confirm_top`` matcher.
+    """
+    if not enabled(opts) or not body:
+        return confirm
+    return get_index(body).confirm_top(opts, body, confirm)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+
+"""
+Time the creation of the loaders of a minion with the
+``loader_file_mapping_cache`` option disabled and enabled.
+
+Every loader is created ``--iterations`` times in each mode, the cache is
+written before the timed runs of the enabled mode. The minimum and median
+times of each loader are printed, for example::
+
+    python tests/loaderbench.py -i 50 -l modules -l states
+"""
+
+import optparse
+import statistics
+import tempfile
+import time
+
+import salt.config
+import salt.loader
+import salt.loader.lazy
+
+# The loaders which can be timed, as (ext_type, tag, int_type) by name
+LOADERS = {
+    "modules": ("modules", "module", None),
+    "states": ("states", "states", None),
+    "grains": ("grains", "grains", None),
+    "utils": ("utils", "utils", None),
+    "returners": ("returners", "returner", None),
+    "renderers": ("renderers", "render", None),
+}
+
+
+def parse():
+    """
+    Parse the script command line inputs
+    """
+    parser = optparse.OptionParser()
+    parser.add_option(
+        "-i",
+        "--iterations",
+        dest="iterations",
+        type="int",
+        default=20,
+        help="The number of times each loader is created in each mode",
+    )
+    parser.add_option(
+        "-l",
+        "--loader",
+        dest="loaders",
+        action="append",
+        choices=sorted(LOADERS),
+        help="The loaders to time, all of them by default",
+    )
+    parser.add_option(
+        "-c",
+        "--config",
+        dest="config",
+        default=None,
+        help=(
+            "The minion configuration file to read the module directories "
+            "from, the defaults are used if it is not given"
+        ),
+    )
+    options, _ = parser.parse_args()
+    return options
+
+
+def _create(opts, name):
+    ext_type, tag, int_type = LOADERS[name]
+    return salt.loader.lazy.LazyLoader(
+        salt.loader._module_dirs(opts, ext_type, tag, int_type),
+        opts,
+        tag=tag,
+    )
+
+
+def _time(opts, name, iterations):
+    times = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        _create(opts, name)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def run(options):
+    """
+    Time the loaders and print the results
+    """
+    if options.config:
+        opts = salt.config.minion_config(options.config)
+    else:
+        opts = salt.config.minion_config(None)
+    names = options.loaders or sorted(LOADERS)
+    with tempfile.TemporaryDirectory() as cachedir:
+        opts["cachedir"] = cachedir
+        print(
+            "{:<10} {:>12} {:>12} {:>12} {:>12}".format(
+                "loader", "off min ms", "off med ms", "on min ms", "on med ms"
+            )
+        )
+        for name in names:
+            opts["loader_file_mapping_cache"] = False
+            off = _time(opts, name, options.iterations)
+            opts["loader_file_mapping_cache"] = True
+            salt.loader.lazy.clear_file_mapping_cache(opts)
+            # Write the cache, as the first start of a minion does
+            _create(opts, name)
+            on = _time(opts, name, options.iterations)
+            print(
+                "{:<10} {:>12.2f} {:>12.2f} {:>12.2f} {:>12.2f}".format(
+                    name,
+                    min(off) * 1000,
+                    statistics.median(off) * 1000,
+                    min(on) * 1000,
+                    statistics.median(on) * 1000,
+                )
+            )
+
+
+if __name__ == "__main__":
+    run(parse())
@@ -272,6 +272,94 @@ def test_multi_files_exclude(tmp_path):
     assert ret[0]["change"] == "IN_DELETE"
 
 
+@pytest.mark.skipif(
+    salt.utils.platform.is_freebsd() is True,
+    reason="Skip on FreeBSD - does not yet have full inotify/watchdog support",
+)
+def test_coalesce_window_and_batch(tmp_path):
+    dp1 = str(tmp_path / "subdir1")
+    os.mkdir(dp1)
+    config = [
+        {
+            "files": {
+                str(tmp_path): {
+                    "mask": ["create", "modify", "delete"],
+                    "recurse": True,
+                    "auto_add": True,
+                }
+            }
+        },
+        {"coalesce_window": 60},
+        {"coalesce_max_paths": 2},
+        {"batch": True},
+    ]
+    ret = inotify.validate(config)
+    assert ret == (True, "Valid beacon configuration")
+
+    ret = inotify.beacon(config)
+    assert ret == []
+    watched = dict(inotify.__context__["inotify.watched"])
+
+    fp = os.path.join(dp1, "tmpfile")
+    with salt.utils.files.fopen(fp, "w") as f:
+        f.write("salt")
+    for name in ("tmpfile1", "tmpfile2"):
+        with salt.utils.files.fopen(os.path.join(dp1, name), "w") as f:
+            pass
+    # The changes are held for the window
+    assert inotify.beacon(config) == []
+    # The watches are left alone while the configuration does not change
+    assert inotify.__context__["inotify.watched"] == watched
+
+    for key in inotify.__context__["inotify.pending"]:
+        inotify.__context__["inotify.pending"][key][1] -= 60
+    ret = inotify.beacon(config)
+    assert ret == [
+        {
+            "changes": [
+                {"tag": dp1, "path": fp, "change": "IN_MODIFY|IN_CREATE"},
+                {
+                    "tag": dp1,
+                    "path": os.path.join(dp1, "tmpfile1"),
+                    "change": "IN_CREATE",
+                },
+                {
+                    "tag": dp1,
+                    "path": dp1,
+                    "change": "IN_CREATE",
+                    "overflow": True,
+                },
+            ]
+        }
+    ]
+    assert not inotify.__context__["inotify.pending"]
+    assert not inotify.__context__["inotify.pending_counts"]
+
+
+def test_update_watches(tmp_path):
+    dp1 = str(tmp_path / "subdir1")
+    dp2 = str(tmp_path / "subdir2")
+    os.mkdir(dp1)
+    os.mkdir(dp2)
+    os.mkdir(os.path.join(dp1, "subdir"))
+    config = [{"files": {dp1: {"mask": ["create"], "recurse": True}}}]
+    inotify.beacon(config)
+    wm = inotify.__context__["inotify.notifier"]._watch_manager
+    paths = {watch.path for watch in wm.watches.values()}
+    assert paths == {dp1, os.path.join(dp1, "subdir")}
+
+    config = [{"files": {dp2: {"mask": ["create"]}}}]
+    inotify.beacon(config)
+    paths = {watch.path for watch in wm.watches.values()}
+    assert paths == {dp2}
+
+    config = [{"files": {dp2: {"mask": ["create", "delete"]}}}]
+    inotify.beacon(config)
+    (watch,) = wm.watches.values()
+    assert watch.path == dp2
+    assert watch.mask == inotify.MASKS["create"] | inotify.MASKS["delete"]
+
+
 # Check __get_notifier and ensure that the right bits are in __context__
 def test__get_notifier():
     config = {
@@ -1,8 +1,15 @@
+import os
+import pathlib
+import shutil
+import socket
+import stat
 import subprocess
+import tempfile
 import types
 
 import pytest
 import salt.client.ssh.shell as shell
+from tests.support.mock import patch
 
 
 @pytest.fixture
@@ -27,3 +34,88 @@ def test_ssh_shell_key_gen(keys):
         timeout=30,
     )
     assert ret.decode().startswith("ssh-rsa")
+
+
+@pytest.fixture
+def multiplex_opts(tmp_path):
+    # The path of tmp_path is too long for a control socket
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        yield {
+            "cachedir": str(tmp_path),
+            "ssh_multiplex": True,
+            "ssh_control_dir": os.path.join(tmp_dir, "ssh_control"),
+            "ssh_control_persist": 60,
+            "ssh_control_max": 2,
+            "_ssh_version": (8, 4),
+        }
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+@pytest.mark.skip_on_windows(reason="Windows does not support salt-ssh")
+def test_ssh_shell_multiplex_opts(multiplex_opts, tmp_path):
+    """
+    Test the options multiplexing the ssh connections to a host
+    """
+    _shell = shell.Shell(
+        multiplex_opts, "localhost", user="root", port="22", priv="/tmp/key"
+    )
+    control_dir = multiplex_opts["ssh_control_dir"]
+    assert _shell.control_path.startswith(control_dir + os.sep)
+    cmd = _shell._cmd_str("/bin/true")
+    assert "-o ControlMaster=auto" in cmd
+    assert "-o ControlPath={}".format(_shell.control_path) in cmd
+    assert "-o ControlPersist=60s" in cmd
+    assert stat.S_IMODE(os.stat(control_dir).st_mode) == 0o700
+
+    # The permissions of an existing directory are fixed, no connection is
+    # closed before the end of the run
+    os.chmod(control_dir, 0o755)
+    with patch("salt.client.ssh.shell.prune_control_sockets") as prune:
+        _shell._cmd_str("/bin/true")
+    assert stat.S_IMODE(os.stat(control_dir).st_mode) == 0o700
+    prune.assert_not_called()
+
+    # The connections to other hosts use other sockets
+    other = shell.Shell(multiplex_opts, "otherhost", user="root", port="22")
+    assert other.control_path != _shell.control_path
+
+    del multiplex_opts["ssh_control_dir"]
+    assert shell.control_dir(multiplex_opts) == str(tmp_path / "ssh_control")
+    multiplex_opts["ssh_control_dir"] = str(tmp_path / ("x" * 100))
+    _shell = shell.Shell(multiplex_opts, "localhost", user="root", port="22")
+    assert _shell.control_path is None
+    assert "ControlPath" not in _shell._cmd_str("/bin/true")
+
+
+@pytest.mark.skip_on_windows(reason="Windows does not support salt-ssh")
+def test_ssh_shell_prune_control_sockets(multiplex_opts, tmp_path):
+    """
+    Test the least recently used ssh master connections over the limit are
+    closed
+    """
+    control_dir = pathlib.Path(multiplex_opts["ssh_control_dir"])
+    control_dir.mkdir()
+    (control_dir / "notasocket").write_text("")
+    paths = []
+    socks = []
+    for idx in range(4):
+        path = str(control_dir / "sock{}".format(idx))
+        sock = socket.socket(socket.AF_UNIX)
+        sock.bind(path)
+        socks.append(sock)
+        os.utime(path, (1000 + idx, 1000 + idx))
+        paths.append(path)
+    try:
+        with patch("salt.client.ssh.shell.close_control_socket") as close:
+            shell.prune_control_sockets(multiplex_opts)
+        assert [call[0][0] for call in close.call_args_list] == paths[:2]
+
+        # A socket without master connection is removed
+        with patch("subprocess.run", return_value=subprocess.CompletedProcess([], 255)):
+            shell.close_control_socket(paths[0])
+        assert not os.path.exists(paths[0])
+    finally:
+        for sock in socks:
+            sock.close()
@@ -1,13 +1,16 @@
 """
 Tests for salt.loader.lazy
 """
+import os
 import sys
+import time
 
 import pytest
 import salt.loader
 import salt.loader.context
 import salt.loader.lazy
 import salt.utils.files
+from tests.support.mock import patch
 
 
 @pytest.fixture
@@ -118,3 +121,81 @@ def test_missing_loader_from_salt_internal_loaders():
         salt.loader._module_dirs(
             {"extension_modules": "/tmp/foo"}, "missingmodules", "module"
         )
+
+
+def test_file_mapping_cache(loader_dir, tmp_path_factory):
+    """
+    The file mapping is cached until a module directory is modified
+    """
+    cachedir = str(tmp_path_factory.mktemp("cache"))
+    opts = {
+        "optimization_order": [0, 1, 2],
+        "cachedir": cachedir,
+        "loader_file_mapping_cache": True,
+    }
+    # The mtime of recently modified directories is not trusted
+    os.utime(loader_dir, (time.time() - 60, time.time() - 60))
+    loader_1 = salt.loader.lazy.LazyLoader([loader_dir], opts)
+    assert sorted(loader_1.file_mapping) == ["mod_a", "mod_b"]
+
+    with patch("os.listdir", side_effect=AssertionError("listed")):
+        loader_2 = salt.loader.lazy.LazyLoader([loader_dir], opts)
+    assert loader_2.file_mapping == loader_1.file_mapping
+    assert loader_2["mod_a.get_context"]
+
+    with salt.utils.files.fopen(os.path.join(loader_dir, "mod_c.py"), "w") as fp_:
+        fp_.write("def __virtual__():\n    return True\n")
+    loader_3 = salt.loader.lazy.LazyLoader([loader_dir], opts)
+    assert sorted(loader_3.file_mapping) == ["mod_a", "mod_b", "mod_c"]
+
+    salt.loader.lazy.clear_file_mapping_cache(opts)
+    assert not os.path.exists(os.path.join(cachedir, "loader_file_mapping"))
+
+
+def test_virtual_cache(tmp_path_factory):
+    """
+    The outcomes of __virtual__ are cached for the loaders of other processes
+    """
+    module_dir = tmp_path_factory.mktemp("modules")
+    modules = {
+        "mod_refused.py": "def __virtual__():\n    return (False, 'no binary')\n",
+        "mod_renamed.py": (
+            "__virtualname__ = 'renamed'\n\n"
+            "def __virtual__():\n    return __virtualname__\n\n"
+            "def ping():\n    return True\n"
+        ),
+        "mod_plain.py": "def ping():\n    return True\n",
+    }
+    for name, contents in modules.items():
+        with salt.utils.files.fopen(str(module_dir / name), "w") as fp_:
+            fp_.write(contents)
+    cachedir = str(tmp_path_factory.mktemp("cache"))
+    opts = {
+        "optimization_order": [0, 1, 2],
+        "cachedir": cachedir,
+        "loader_virtual_cache": True,
+        "grains": {"os": "Linux"},
+    }
+    loader_1 = salt.loader.lazy.LazyLoader([str(module_dir)], opts)
+    loader_1._load_all()
+    assert sorted(loader_1.loaded_modules) == ["mod_plain", "renamed"]
+    assert loader_1.imports_avoided == 0
+
+    loader_2 = salt.loader.lazy.LazyLoader([str(module_dir)], opts)
+    assert loader_2["renamed.ping"]()
+    assert loader_2.loaded_modules == {"renamed"}
+    assert "mod_refused.ping" not in loader_2
+    assert loader_2.missing_modules["mod_refused"] == "no binary"
+    assert loader_2.loaded_modules == {"renamed"}
+    assert loader_2.imports_avoided >= 2
+
+    # Other grains, other outcomes
+    opts["grains"] = {"os": "Windows"}
+    loader_3 = salt.loader.lazy.LazyLoader([str(module_dir)], opts)
+    loader_3._load_all()
+    assert loader_3.imports_avoided == 0
+    # The outcomes cached for the previous grains are removed
+    assert len(os.listdir(os.path.join(cachedir, "loader_virtual"))) == 1
+
+    salt.loader.lazy.clear_virtual_cache(opts)
+    assert not os.path.exists(os.path.join(cachedir, "loader_virtual"))
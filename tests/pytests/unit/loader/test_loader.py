@@ -4,6 +4,9 @@ tests.pytests.unit.loader.test_loader
 
 Unit tests for salt's loader
 """
+import textwrap
+
+import salt.config
 import salt.loader
 import salt.loader.lazy
 
@@ -17,3 +20,143 @@ def test_raw_mod_functions():
     ret = salt.loader.raw_mod(opts, "grains", "get")
     for k, v in ret.items():
         assert isinstance(v, salt.loader.lazy.LoadedFunc)
+
+
+def test_grains_parallel(tmp_path):
+    """
+    Grains functions run in parallel are merged in order, the functions taking
+    the grains see the grains of the functions before them and the functions
+    not returning in time are left out
+    """
+    grains_dir = tmp_path / "grains"
+    grains_dir.mkdir()
+    (grains_dir / "parallel_test.py").write_text(
+        textwrap.dedent(
+            """
+            import time
+
+
+            def a_first():
+                time.sleep(0.5)
+                return {"parallel_test_order": "a", "parallel_test_a": True}
+
+
+            def b_second():
+                return {"parallel_test_order": "b", "parallel_test_b": True}
+
+
+            def c_depends(grains):
+                return {
+                    "parallel_test_seen": [
+                        grains.get("parallel_test_a"), grains.get("parallel_test_b")
+                    ]
+                }
+
+
+            def d_hangs():
+                time.sleep(5)
+                return {"parallel_test_hung": True}
+            """
+        )
+    )
+    opts = salt.config.DEFAULT_MINION_OPTS.copy()
+    opts.update(
+        {
+            "cachedir": str(tmp_path / "cache"),
+            "extension_modules": str(tmp_path / "extmods"),
+            "grains_dirs": [str(grains_dir)],
+            "grains_parallel": True,
+            "grains_function_timeout": 2,
+        }
+    )
+    opts.pop("conf_file", None)
+    grains = salt.loader.grains(opts)
+    assert grains["parallel_test_order"] == "b"
+    assert grains["parallel_test_seen"] == [True, True]
+    assert "parallel_test_hung" not in grains
+    assert "os" in grains
+
+    profile = salt.loader.grains_profile()
+    assert profile["parallel"] is True
+    assert profile["timeouts"] == ["parallel_test.d_hangs"]
+    assert profile["functions"]["parallel_test.a_first"] >= 0.5
+    assert "core.os_data" in profile["functions"]
+
+
+def test_grains_cache_policies(tmp_path):
+    """
+    The results of the grains functions with a cache policy are reused until
+    they expire
+    """
+    grains_dir = tmp_path / "grains"
+    grains_dir.mkdir()
+    (grains_dir / "policy_test.py").write_text(
+        textwrap.dedent(
+            """
+            import os
+
+
+            def _count(name):
+                path = os.path.join(os.path.dirname(__file__), name)
+                count = 1
+                if os.path.exists(path):
+                    with open(path) as fp_:
+                        count += int(fp_.read())
+                with open(path, "w") as fp_:
+                    fp_.write(str(count))
+                return count
+
+
+            def static():
+                return {"policy_test_static": _count("static.count")}
+
+
+            def ttl():
+                return {"policy_test_ttl": _count("ttl.count")}
+
+
+            def always():
+                return {"policy_test_always": _count("always.count")}
+            """
+        )
+    )
+    opts = salt.config.DEFAULT_MINION_OPTS.copy()
+    opts.update(
+        {
+            "cachedir": str(tmp_path / "cache"),
+            "extension_modules": str(tmp_path / "extmods"),
+            "grains_dirs": [str(grains_dir)],
+            "grains_cache_policies": {
+                "policy_test.static": "static",
+                "policy_test.t*": 3600,
+            },
+        }
+    )
+    opts.pop("conf_file", None)
+    (tmp_path / "cache").mkdir()
+
+    grains = salt.loader.grains(opts)
+    assert grains["policy_test_static"] == 1
+    assert grains["policy_test_ttl"] == 1
+    assert grains["policy_test_always"] == 1
+    assert salt.loader.grains_profile()["cached"] == []
+
+    grains = salt.loader.grains(opts)
+    assert grains["policy_test_static"] == 1
+    assert grains["policy_test_ttl"] == 1
+    assert grains["policy_test_always"] == 2
+    assert sorted(salt.loader.grains_profile()["cached"]) == [
+        "policy_test.static",
+        "policy_test.ttl",
+    ]
+    # Only the static grains survive a forced refresh
+    grains = salt.loader.grains(opts, force_refresh=True)
+    assert grains["policy_test_static"] == 1
+    assert grains["policy_test_ttl"] == 2
+    assert grains["policy_test_always"] == 3
+
+    # The cache is dropped when the grains modules change
+    salt.loader.clear_grains_funcs_cache(opts)
+    grains = salt.loader.grains(opts)
+    assert grains["policy_test_static"] == 2
+    assert grains["policy_test_ttl"] == 3
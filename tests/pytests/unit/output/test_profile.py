@@ -0,0 +1,57 @@
+import pytest
+import salt.output.profile as profile
+import salt.output.table_out as table_out
+
+
+@pytest.fixture
+def configure_loader_modules():
+    opts = {"color": False, "strip_colors": True}
+    return {profile: {"__opts__": opts}, table_out: {"__opts__": opts}}
+
+
+def test_render_profile_table():
+    data = {
+        "minion": {
+            "highstate": {},
+            "render_profile": {
+                "sls": [
+                    {
+                        "saltenv": "base",
+                        "sls": "web",
+                        "depth": 0,
+                        "render": {"jinja": 12.41, "yaml": 3.22},
+                        "fetch": 4.12,
+                        "fetches": 3,
+                        "cache_hits": 2,
+                        "total": 25.04,
+                    }
+                ],
+                "parsed_data": {"parses": 4, "hits": 12},
+            },
+        }
+    }
+
+    output = profile.output(data)
+
+    assert "renderers (ms)" in output
+    assert "base:web" in output
+    assert "jinja=12.4100 yaml=3.2200" in output
+    assert "2/3" in output
+    assert "25.0400" in output
+    assert "minion: deserialized YAML/JSON data 4 times, reused it 12 times" in output
+
+
+def test_state_durations_table():
+    data = {
+        "minion": {
+            "file_|-/etc/motd_|-/etc/motd_|-managed": {
+                "name": "/etc/motd",
+                "duration": 1.5,
+            }
+        }
+    }
+
+    output = profile.output(data)
+
+    assert "duration (ms)" in output
+    assert "file.managed" in output
@@ -1,7 +1,19 @@
+import copy
+import os
+import threading
+import time
+
 import pytest
+import salt.config
+import salt.ext.tornado.gen
+import salt.ext.tornado.ioloop
 import salt.loader
+import salt.master
 import salt.pillar
+import salt.utils.cache
+import salt.utils.files
 from salt.utils.odict import OrderedDict
+from tests.support.mock import MagicMock, call, patch
 
 
 @pytest.mark.parametrize(
@@ -27,3 +39,600 @@ def test_pillar_envs_order(envs, temp_salt_minion, tmp_path):
     )
     # The base environment is always present and as the first environment name
     assert pillar._get_envs() == ["base"] + envs
+
+
+@pytest.fixture
+def render_cache_opts(tmp_path):
+    sls_files = {
+        "static": "foo: bar\n",
+        "by_os": "os: {{ grains['os'] }}\nfamily: {{ grains.get('os_family') }}\n",
+        "dynamic": "id: {{ salt['grains.get']('id') }}\n",
+    }
+    for name, contents in sls_files.items():
+        (tmp_path / "{}.sls".format(name)).write_text(contents)
+    return {
+        "optimization_order": [0, 1, 2],
+        "renderer": "jinja|yaml",
+        "renderer_blacklist": [],
+        "renderer_whitelist": [],
+        "state_top": "",
+        "pillar_roots": {"base": [str(tmp_path)]},
+        "file_roots": {"base": [str(tmp_path)]},
+        "extension_modules": "",
+        "saltenv": "base",
+        "pillar_render_cache": True,
+        "pillar_render_cache_size": 10,
+    }
+
+
+@pytest.mark.parametrize(
+    "data,expected",
+    (
+        ("foo: bar", []),
+        ("#!yaml\nfoo: '{{ salt.cmd.run() }}'", []),
+        ("foo: {{ grains['os'] }} {{ grains.get(\"id\") }}", ["id", "os"]),
+        (
+            "foo: {{ grains.kernel }} {{ grains['ip_interfaces:eth0'] }}",
+            ["ip_interfaces", "kernel"],
+        ),
+        ("foo: {{ salt['cmd.run']('hostname') }}", None),
+        ("foo: {{ pillar.get('bar') }}", None),
+        ("{% set key = 'os' %}foo: {{ grains[key] }}", None),
+        ("{% include 'other.sls' %}", None),
+        ("#!py\ndef run():\n    return {}", None),
+        # Methods reading all of the grains are not grains
+        ("{% for k, v in grains.items() %}{{ k }}: {{ v }}\n{% endfor %}", None),
+        ("keys: {{ grains.keys() | list }}", None),
+        ("foo: {{ grains.get(key) }}", None),
+        ("foo: {{ grains.items }}", None),
+        ("foo: {{ __grains__['id'] }}", None),
+        # Filters reading the network, the filesystem or the clock
+        ("foo: {{ 'https://example.com' | http_query }}", None),
+        ("foo: {{ 'example.com' | dns_check(443) }}", None),
+        ("foo: {{ '/etc/hosts' | file_hashsum }}", None),
+        ("{% for f in '/srv' | list_files %}{{ f }}: 1\n{% endfor %}", None),
+        ("foo: {{ '/etc/hosts' | is_text_file }}", None),
+        ("foo: {{ 'now' | date_format }}", None),
+        # Filters which only transform their arguments
+        ("foo: {{ 'bar' | sha256 }} {{ grains['os'] | to_snake_case }}", ["os"]),
+        ("foo: {{ ['a', 'b'] | unique | tojson }}", []),
+    ),
+)
+def test_pillar_render_cache_analyze(data, expected):
+    cache = salt.pillar.PillarRenderCache()
+    assert cache.analyze(data, "jinja|yaml") == expected
+
+
+def test_pillar_render_cache(render_cache_opts, tmp_path):
+    cache = salt.pillar.PillarRenderCache(10)
+    compile_template = MagicMock(wraps=salt.pillar.compile_template)
+    with patch("salt.pillar._RENDER_CACHE", cache), patch(
+        "salt.pillar.compile_template", compile_template
+    ):
+        pillar1 = salt.pillar.Pillar(
+            render_cache_opts, {"os": "Fedora", "os_family": "RedHat"}, "m1", "base"
+        )
+        pillar2 = salt.pillar.Pillar(
+            render_cache_opts, {"os": "Ubuntu", "os_family": "Debian"}, "m2", "base"
+        )
+        pillar3 = salt.pillar.Pillar(
+            render_cache_opts, {"os": "Fedora", "os_family": "RedHat"}, "m3", "base"
+        )
+        assert pillar1.render_cache is cache
+        matches = {"base": ["static", "by_os", "dynamic"]}
+        for pillar in (pillar1, pillar2, pillar3):
+            pillar.functions["grains.get"] = lambda key, pillar=pillar: pillar.minion_id
+        ret1, errors = pillar1.render_pillar(matches)
+        assert not errors
+        ret2, errors = pillar2.render_pillar(matches)
+        assert not errors
+        ret3, errors = pillar3.render_pillar(matches)
+        assert not errors
+
+    assert ret1 == {"foo": "bar", "os": "Fedora", "family": "RedHat", "id": "m1"}
+    assert ret2 == {"foo": "bar", "os": "Ubuntu", "family": "Debian", "id": "m2"}
+    assert ret3 == {"foo": "bar", "os": "Fedora", "family": "RedHat", "id": "m3"}
+    # static: 1 render, by_os: 2 renders, dynamic: 3 renders
+    assert compile_template.call_count == 6
+    assert cache.stats == {"hits": 3, "misses": 3, "uncacheable": 3}
+
+    # A change to the file is picked up
+    (tmp_path / "static.sls").write_text("foo: baz\n")
+    with patch("salt.pillar._RENDER_CACHE", cache):
+        pillar = salt.pillar.Pillar(render_cache_opts, {}, "m1", "base")
+        ret, errors = pillar.render_pillar({"base": ["static"]})
+    assert ret == {"foo": "baz"}
+
+
+def test_pillar_render_cache_static(render_cache_opts):
+    render_cache_opts["pillar_render_cache_static"] = ["dyn*"]
+    cache = salt.pillar.PillarRenderCache(10)
+    with patch("salt.pillar._RENDER_CACHE", cache):
+        pillar = salt.pillar.Pillar(render_cache_opts, {}, "m1", "base")
+        pillar.functions["grains.get"] = lambda key: "m1"
+        pillar.render_pillar({"base": ["dynamic"]})
+        pillar.render_pillar({"base": ["dynamic"]})
+    assert cache.stats == {"hits": 1, "misses": 1, "uncacheable": 0}
+
+
+def test_pillar_render_cache_all_grains(render_cache_opts, tmp_path):
+    """
+    The pillar of a minion rendered from all of its grains is not served to
+    another minion
+    """
+    (tmp_path / "all_grains.sls").write_text(
+        "{% for k, v in grains.items() %}{{ k }}: {{ v }}\n{% endfor %}"
+    )
+    cache = salt.pillar.PillarRenderCache(10)
+    rets = []
+    with patch("salt.pillar._RENDER_CACHE", cache):
+        for minion_id in ("m1", "m2"):
+            pillar = salt.pillar.Pillar(
+                render_cache_opts, {"id": minion_id}, minion_id, "base"
+            )
+            ret, errors = pillar.render_pillar({"base": ["all_grains"]})
+            assert not errors
+            rets.append(ret)
+    assert rets == [{"id": "m1"}, {"id": "m2"}]
+    assert cache.stats == {"hits": 0, "misses": 0, "uncacheable": 2}
+
+
+def _ext_pillar_opts(**kwargs):
+    opts = {
+        "optimization_order": [0, 1, 2],
+        "renderer": "yaml",
+        "renderer_blacklist": [],
+        "renderer_whitelist": [],
+        "state_top": "",
+        "pillar_roots": {"base": []},
+        "file_roots": {"base": []},
+        "extension_modules": "",
+        "saltenv": "base",
+        "ext_pillar_workers": 4,
+    }
+    opts.update(kwargs)
+    return opts
+
+
+def test_ext_pillar_concurrent():
+    calls = []
+
+    def slow(minion_id, pillar, value):
+        time.sleep(0.2)
+        calls.append("slow")
+        return {"key": value, "slow": True}
+
+    def fast(minion_id, pillar, value):
+        calls.append("fast")
+        return {"key": value, "fast": True}
+
+    def dependent(minion_id, pillar, value):
+        calls.append("dependent")
+        return {"seen": sorted(pillar)}
+
+    opts = _ext_pillar_opts(
+        ext_pillar=[
+            {"slow": "first"},
+            {"fast": "second"},
+            {"dependent": None},
+            {"fast": "third"},
+        ],
+        ext_pillar_sequential=["dependent"],
+    )
+    ext_pillars = {"slow": slow, "fast": fast, "dependent": dependent}
+    with patch("salt.loader.pillars", MagicMock(return_value=ext_pillars)):
+        pillar = salt.pillar.Pillar(opts, {}, "minion", "base")
+    ret, errors = pillar.ext_pillar({})
+    assert not errors
+    # The fast external pillar ran before the slow one, but the results were
+    # merged in the configured order.
+    assert calls == ["fast", "slow", "dependent", "fast"]
+    assert ret == {
+        "key": "third",
+        "slow": True,
+        "fast": True,
+        "seen": ["fast", "key", "slow"],
+    }
+
+
+def test_ext_pillar_timeout():
+    def slow(minion_id, pillar, value):
+        time.sleep(2)
+        return {"slow": value}
+
+    def fast(minion_id, pillar, value):
+        return {"fast": value}
+
+    def broken(minion_id, pillar, value):
+        raise Exception("oops")
+
+    opts = _ext_pillar_opts(
+        ext_pillar=[{"slow": 1}, {"broken": 2}, {"fast": 3}],
+        ext_pillar_workers=1,
+        ext_pillar_timeout=1,
+    )
+    ext_pillars = {"slow": slow, "fast": fast, "broken": broken}
+    with patch("salt.loader.pillars", MagicMock(return_value=ext_pillars)):
+        pillar = salt.pillar.Pillar(opts, {}, "minion", "base")
+    with patch.dict(salt.pillar._HUNG_EXT_PILLARS, clear=True):
+        ret, errors = pillar.ext_pillar({})
+    assert ret == {"fast": 3}
+    assert errors == [
+        "Failed to load ext_pillar slow: timed out after 1 seconds",
+        "Failed to load ext_pillar broken: oops",
+    ]
+
+
+def test_ext_pillar_timeout_hung():
+    calls = []
+    release = threading.Event()
+
+    def hung(minion_id, pillar, value):
+        calls.append(value)
+        release.wait(30)
+        return {"hung": value}
+
+    opts = _ext_pillar_opts(ext_pillar=[{"hung": 1}], ext_pillar_timeout=1)
+    with patch(
+        "salt.loader.pillars", MagicMock(return_value={"hung": hung})
+    ), patch.dict(salt.pillar._HUNG_EXT_PILLARS, clear=True):
+        pillar = salt.pillar.Pillar(opts, {}, "minion", "base")
+        ret, errors = pillar.ext_pillar({})
+        assert ret == {}
+        assert errors == ["Failed to load ext_pillar hung: timed out after 1 seconds"]
+
+        # The external pillar is not called again while its call is running
+        ret, errors = pillar.ext_pillar({})
+        assert ret == {}
+        assert errors == [
+            "Failed to load ext_pillar hung: a previous call which timed out is"
+            " still running"
+        ]
+        assert calls == [1]
+
+        release.set()
+        future = salt.pillar._HUNG_EXT_PILLARS[("hung", "1")]
+        future.result(10)
+        ret, errors = pillar.ext_pillar({})
+        assert ret == {"hung": 1}
+        assert not errors
+        assert calls == [1, 1]
+        assert not salt.pillar._HUNG_EXT_PILLARS
+
+
+@pytest.fixture
+def pillar_cache_opts(tmp_path):
+    pillar_root = tmp_path / "pillar"
+    pillar_root.mkdir()
+    (pillar_root / "top.sls").write_text("base:\n  '*':\n    - foo\n")
+    (pillar_root / "foo.sls").write_text("foo: bar\n")
+    cachedir = tmp_path / "cache"
+    (cachedir / "pillar_cache").mkdir(parents=True)
+    opts = salt.config.DEFAULT_MASTER_OPTS.copy()
+    opts.update(
+        {
+            "cachedir": str(cachedir),
+            "pillar_roots": {"base": [str(pillar_root)]},
+            "file_roots": {"base": [str(tmp_path / "files")]},
+            "pillar_cache": True,
+            "pillar_cache_backend": "disk",
+            "pillar_cache_size": 2,
+            "state_top": "top.sls",
+            "ext_pillar": [],
+        }
+    )
+    return opts
+
+
+def test_pillar_cache_invalidation(pillar_cache_opts):
+    fetch_pillar = MagicMock(side_effect=salt.pillar.PillarCache.fetch_pillar)
+
+    def _compile(**kwargs):
+        pillar = salt.pillar.PillarCache(
+            pillar_cache_opts, {}, "minion", "base", pillarenv="base", **kwargs
+        )
+        with patch("salt.loader.minion_mods", MagicMock(return_value={})), patch(
+            "salt.pillar.PillarCache.fetch_pillar",
+            lambda self: fetch_pillar(self),
+        ):
+            return pillar.compile_pillar()
+
+    assert _compile() == {"foo": "bar"}
+    assert _compile() == {"foo": "bar"}
+    assert fetch_pillar.call_count == 1
+
+    # Modifying an SLS file recompiles the pillar
+    pillar_root = pillar_cache_opts["pillar_roots"]["base"][0]
+    sls = os.path.join(pillar_root, "foo.sls")
+    with salt.utils.files.fopen(sls, "w") as fp_:
+        fp_.write("foo: baz\n")
+    mtime = os.path.getmtime(sls) + 10
+    os.utime(sls, (mtime, mtime))
+    assert _compile() == {"foo": "baz"}
+    assert fetch_pillar.call_count == 2
+
+    # A fileserver change in the saltenv of the minion recompiles the pillar,
+    # a change in another saltenv does not
+    salt.utils.cache.bump_generation(
+        pillar_cache_opts, salt.utils.cache.fileserver_generation("dev")
+    )
+    assert _compile() == {"foo": "baz"}
+    assert fetch_pillar.call_count == 2
+    salt.utils.cache.bump_generation(
+        pillar_cache_opts, salt.utils.cache.fileserver_generation("base")
+    )
+    assert _compile() == {"foo": "baz"}
+    assert fetch_pillar.call_count == 3
+    assert _compile() == {"foo": "baz"}
+    assert fetch_pillar.call_count == 3
+
+    # A git_pillar change does not, as the pillar does not use git_pillar
+    salt.utils.cache.bump_generation(pillar_cache_opts, "git_pillar")
+    assert _compile() == {"foo": "baz"}
+    assert fetch_pillar.call_count == 3
+
+    # A pillar refresh from the minion recompiles the pillar
+    assert _compile(clean_cache=True) == {"foo": "baz"}
+    assert fetch_pillar.call_count == 4
+
+
+def test_pillar_cache_size(pillar_cache_opts):
+    cache_dir = os.path.join(pillar_cache_opts["cachedir"], "pillar_cache")
+    for idx, minion_id in enumerate(("minion1", "minion2", "minion3")):
+        pillar = salt.pillar.PillarCache(
+            pillar_cache_opts, {}, minion_id, "base", pillarenv="base"
+        )
+        with patch.object(pillar, "fetch_pillar", MagicMock(return_value={})):
+            pillar.compile_pillar()
+        path = os.path.join(cache_dir, minion_id)
+        os.utime(path, (idx, idx))
+    assert sorted(os.listdir(cache_dir)) == ["minion2", "minion3"]
+
+
+def test_pillar_cache_prune_interval(pillar_cache_opts):
+    cache_dir = os.path.join(pillar_cache_opts["cachedir"], "pillar_cache")
+    pillar_cache_opts["pillar_cache_size"] = 3
+    listed = []
+    listdir = os.listdir
+
+    def _listdir(path):
+        if path == cache_dir:
+            listed.append(path)
+        return listdir(path)
+
+    def _compile(minion_id, mtime=None):
+        pillar = salt.pillar.PillarCache(
+            pillar_cache_opts, {}, minion_id, "base", pillarenv="base"
+        )
+        with patch.object(pillar, "fetch_pillar", MagicMock(return_value={})):
+            pillar.compile_pillar()
+        if mtime is not None:
+            os.utime(os.path.join(cache_dir, minion_id), (mtime, mtime))
+
+    now = time.time()
+    with patch("os.listdir", _listdir), patch("time.time", return_value=now):
+        _compile("minion1", 1)
+        assert len(listed) == 1
+        # The cache is not listed again while it is below the limit
+        _compile("minion2", 2)
+        _compile("minion3", 3)
+        assert len(listed) == 1
+        # A file added by another process
+        with salt.utils.files.fopen(os.path.join(cache_dir, "other"), "w"):
+            pass
+        os.utime(os.path.join(cache_dir, "other"), (4, 4))
+        _compile("minion4")
+        assert len(listed) == 2
+        assert sorted(listdir(cache_dir)) == ["minion3", "minion4", "other"]
+
+    # Below the limit, the files are counted again after PRUNE_INTERVAL seconds
+    pillar_cache_opts["pillar_cache_size"] = 10
+    later = now + salt.pillar.PillarCache.PRUNE_INTERVAL + 1
+    with patch("os.listdir", _listdir), patch("time.time", return_value=later):
+        _compile("minion5")
+        assert len(listed) == 3
+        _compile("minion6")
+        assert len(listed) == 3
+
+
+def test_pillar_diff():
+    old = {
+        "unchanged": {"a": 1},
+        "nested": {"a": 1, "b": {"c": [1, 2]}, "removed": True},
+        "type": 1,
+        "removed": "value",
+        "list": [1, 2, 3],
+    }
+    new = {
+        "unchanged": {"a": 1},
+        "nested": {"a": 1, "b": {"c": [1, 2, 3]}, "added": {"d": 4}},
+        "type": True,
+        "list": [3, 2, 1],
+        "added": "value",
+    }
+    diff = salt.pillar.pillar_diff(old, new)
+    assert diff == {
+        "set": {"type": True, "list": [3, 2, 1], "added": "value"},
+        "nested": {
+            "nested": {
+                "set": {"added": {"d": 4}},
+                "nested": {"b": {"set": {"c": [1, 2, 3]}}},
+                "removed": ["removed"],
+            }
+        },
+        "removed": ["removed"],
+    }
+    assert salt.pillar.apply_pillar_diff(old, diff) == new
+    assert salt.pillar.pillar_diff(new, new) == {}
+    assert salt.pillar.pillar_hash(new) == salt.pillar.pillar_hash(
+        salt.pillar.apply_pillar_diff(old, diff)
+    )
+    assert salt.pillar.pillar_hash(old) != salt.pillar.pillar_hash(new)
+
+
+@pytest.mark.parametrize("minion_data_cache", [True, False])
+def test_async_remote_pillar_delta(minion_data_cache):
+    """
+    The minion only receives the changes to its pillar data
+    """
+    master_cache = {}
+    master = MagicMock()
+    master.opts = {"minion_data_cache": minion_data_cache}
+    master.masterapi.cache.fetch = lambda bank, key: master_cache.get((bank, key))
+    master.masterapi.cache.store = lambda bank, key, data: master_cache.update(
+        {(bank, key): copy.deepcopy(data)}
+    )
+    master_pillar = {"big": "x" * 100, "nested": {"foo": "bar"}}
+    sent = []
+
+    @salt.ext.tornado.gen.coroutine
+    def _send(load, dictkey=None):
+        load = copy.deepcopy(load)
+        sent.append(load)
+        ret = copy.deepcopy(master_pillar)
+        previous = None
+        if minion_data_cache:
+            previous = salt.master.AESFuncs._cached_pillar(master, "minion")
+            master.masterapi.cache.store("minions/minion", "data", {"pillar": ret})
+        if "pillar_hash" in load:
+            ret = salt.master.AESFuncs._pillar_delta(master, load, ret, previous)
+        raise salt.ext.tornado.gen.Return(ret)
+
+    opts = {
+        "renderer": "json",
+        "pillarenv": None,
+        "pillar_delta": True,
+    }
+    channel = MagicMock(crypted_transfer_decode_dictentry=_send)
+
+    def _compile():
+        with patch(
+            "salt.transport.client.AsyncReqChannel.factory",
+            MagicMock(return_value=channel),
+        ), patch.dict(salt.pillar._PILLAR_DELTA_BASE):
+            pillar = salt.pillar.AsyncRemotePillar(opts, {}, "minion", "base")
+        io_loop = salt.ext.tornado.ioloop.IOLoop()
+        try:
+            return io_loop.run_sync(pillar.compile_pillar)
+        finally:
+            io_loop.close()
+
+    with patch.dict(salt.pillar._PILLAR_DELTA_BASE, clear=True):
+        # The first refresh fetches the full pillar
+        assert _compile() == master_pillar
+        assert sent[-1]["pillar_hash"] == ""
+
+        # Nothing changed
+        ret = _compile()
+        assert ret == master_pillar
+        # The minion can modify its pillar without affecting the next delta
+        ret["nested"]["foo"] = "modified"
+        assert sent[-1]["pillar_hash"] == salt.pillar.pillar_hash(master_pillar)
+
+        # Only the change is sent
+        master_pillar["nested"]["baz"] = "qux"
+        with patch(
+            "salt.pillar.apply_pillar_diff", wraps=salt.pillar.apply_pillar_diff
+        ) as apply_diff:
+            assert _compile() == master_pillar
+        assert apply_diff.call_args_list[0] == call(
+            {"big": "x" * 100, "nested": {"foo": "bar"}},
+            {"nested": {"nested": {"set": {"baz": "qux"}}}},
+        )
+        assert len(sent) == 3
+        # The pillar is only kept once by the master
+        base = master_cache[("minions/minion", "pillar_delta")]
+        assert ("pillar" in base) is not minion_data_cache
+        assert base["hash"] == salt.pillar.pillar_hash(master_pillar)
+
+        # A delta which does not apply to the pillar of the minion is retried
+        # as a full fetch
+        salt.pillar._PILLAR_DELTA_BASE[("minion", "base", None)]["pillar"] = {}
+        master_pillar["nested"]["baz"] = "changed"
+        assert _compile() == master_pillar
+        assert len(sent) == 5
+        assert sent[-1]["pillar_hash"] == ""
+
+
+def test_async_remote_pillar_grains_delta():
+    """
+    The minion only sends the changes to its grains
+    """
+    master_cache = {}
+    master = MagicMock()
+    master.masterapi.cache.fetch = lambda bank, key: master_cache.get((bank, key))
+    master.masterapi.cache.store = lambda bank, key, data: master_cache.update(
+        {(bank, key): copy.deepcopy(data)}
+    )
+    sent = []
+    received = []
+
+    @salt.ext.tornado.gen.coroutine
+    def _send(load, dictkey=None):
+        # What AESFuncs._pillar does with the grains
+        load = copy.deepcopy(load)
+        sent.append(copy.deepcopy(load))
+        if "grains_diff" in load:
+            load["grains"] = salt.master.AESFuncs._grains_delta(master, load)
+            if load["grains"] is None:
+                raise salt.ext.tornado.gen.Return(
+                    {salt.pillar.PILLAR_DELTA_KEY: {"grains": False}}
+                )
+        if "grains_hash" in load:
+            salt.master.AESFuncs._store_grains_delta_base(master, load)
+        received.append(load["grains"])
+        raise salt.ext.tornado.gen.Return({"foo": "bar"})
+
+    opts = {
+        "renderer": "json",
+        "pillarenv": None,
+        "grains_delta": True,
+    }
+    channel = MagicMock(crypted_transfer_decode_dictentry=_send)
+
+    def _compile(grains):
+        with patch(
+            "salt.transport.client.AsyncReqChannel.factory",
+            MagicMock(return_value=channel),
+        ):
+            pillar = salt.pillar.AsyncRemotePillar(opts, grains, "minion", "base")
+        io_loop = salt.ext.tornado.ioloop.IOLoop()
+        try:
+            return io_loop.run_sync(pillar.compile_pillar)
+        finally:
+            io_loop.close()
+
+    grains = {"os": "Linux", "ipv4": ["10.0.0.1"], "big": "x" * 100}
+    with patch.dict(salt.pillar._GRAINS_DELTA_BASE, clear=True):
+        # The first refresh sends all grains
+        assert _compile(copy.deepcopy(grains)) == {"foo": "bar"}
+        assert sent[-1]["grains"] == grains
+        assert sent[-1]["grains_hash"] == ""
+        assert received[-1] == grains
+
+        # Only the changes are sent
+        grains["ipv4"] = ["10.0.0.2"]
+        assert _compile(copy.deepcopy(grains)) == {"foo": "bar"}
+        assert "grains" not in sent[-1]
+        assert sent[-1]["grains_diff"] == {"set": {"ipv4": ["10.0.0.2"]}}
+        assert received[-1] == grains
+        assert len(sent) == 2
+
+        # All grains are sent again when the master lost them
+        master_cache.clear()
+        grains["os"] = "Windows"
+        assert _compile(copy.deepcopy(grains)) == {"foo": "bar"}
+        assert len(sent) == 4
+        assert "grains_diff" in sent[-2]
+        assert sent[-1]["grains"] == grains
+        assert received[-1] == grains
+
+        assert _compile(copy.deepcopy(grains)) == {"foo": "bar"}
+        assert sent[-1]["grains_diff"] == {}
+        assert received[-1] == grains
+
+        # Another master has its own base, the first refresh sends all grains
+        opts["master"] = "master2"
+        assert _compile(copy.deepcopy(grains)) == {"foo": "bar"}
+        assert sent[-1]["grains"] == grains
+        assert sent[-1]["grains_hash"] == ""
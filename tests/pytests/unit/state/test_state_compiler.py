@@ -3,6 +3,8 @@
 """
 
 import logging
+import os
+import time
 
 import pytest  # pylint: disable=unused-import
 import salt.exceptions
@@ -931,3 +933,235 @@ def test_aggregate_requisites():
             "/tmp/install-tmux",
             "google-cloud-repo",
         ]
+
+
+def _parallel_high(states):
+    high = OrderedDict()
+    for idx, (id_, fun, args) in enumerate(states):
+        state, fun = fun.split(".")
+        high[id_] = OrderedDict(
+            [
+                (state, [fun, {"order": 10000 + idx}] + args),
+                ("__sls__", "parallel"),
+                ("__env__", "base"),
+            ]
+        )
+    return high
+
+
+def _call_high_parallel(states, workers):
+    minion_opts = salt.config.DEFAULT_MINION_OPTS.copy()
+    minion_opts["file_client"] = "local"
+    minion_opts["state_parallel_workers"] = workers
+    with patch("salt.state.State._gather_pillar", MagicMock(return_value={})):
+        state_obj = salt.state.State(minion_opts)
+    return state_obj.call_high(_parallel_high(states))
+
+
+@pytest.mark.skip_on_windows(reason="The parallel executor forks")
+@pytest.mark.slow_test
+def test_call_chunks_parallel_requisites():
+    """
+    The parallel executor preserves the results of the requisites and order
+    """
+    states = [
+        ("a", "test.succeed_with_changes", []),
+        ("b", "test.succeed_without_changes", [{"require": [{"test": "a"}]}]),
+        ("c", "test.succeed_with_changes", [{"onchanges": [{"test": "b"}]}]),
+        ("d", "test.fail_without_changes", []),
+        ("e", "test.succeed_with_changes", [{"require": ["d"]}]),
+        ("f", "test.succeed_with_changes", [{"onchanges": ["a"]}]),
+        ("g", "test.fail_with_changes", [{"order": "last"}]),
+        ("h", "test.succeed_with_changes", [{"onfail": ["d"]}]),
+        ("i", "test.succeed_without_changes", [{"watch": [{"sls": "parall*"}]}]),
+    ]
+    sequential = _call_high_parallel(states, 0)
+    parallel = _call_high_parallel(states, 4)
+
+    def _summary(ret):
+        return {
+            tag: (data["result"], bool(data["changes"]), data.get("__state_ran__"))
+            for tag, data in ret.items()
+        }
+
+    assert _summary(parallel) == _summary(sequential)
+    assert len(parallel) == len(states)
+    run_nums = sorted(data["__run_num__"] for data in parallel.values())
+    assert run_nums == list(range(len(states)))
+    # The last state only starts once all of the other states are done
+    assert (
+        parallel["test_|-g_|-g_|-fail_with_changes"]["__run_num__"] == len(states) - 1
+    )
+
+
+@pytest.mark.skip_on_windows(reason="The parallel executor forks")
+@pytest.mark.slow_test
+def test_call_chunks_parallel_failhard():
+    states = [
+        ("a", "test.succeed_with_changes", []),
+        ("b", "test.fail_without_changes", [{"require": ["a"]}, {"failhard": True}]),
+        ("c", "test.succeed_with_changes", [{"require": ["b"]}]),
+        ("d", "test.succeed_with_changes", [{"order": "last"}]),
+    ]
+    ret = _call_high_parallel(states, 4)
+    assert set(ret) == {
+        "test_|-a_|-a_|-succeed_with_changes",
+        "test_|-b_|-b_|-fail_without_changes",
+    }
+
+
+@pytest.mark.skip_on_windows(reason="The parallel executor forks")
+@pytest.mark.slow_test
+def test_call_chunks_parallel_concurrency():
+    states = [
+        ("sleep{}".format(idx), "cmd.run", [{"name": "sleep 1"}, {"shell": "/bin/sh"}])
+        for idx in range(4)
+    ]
+    start = time.time()
+    ret = _call_high_parallel(states, 4)
+    assert time.time() - start < 3
+    assert len(ret) == 4
+    assert all(data["result"] for data in ret.values())
+
+
+@pytest.mark.skip_on_windows(reason="The parallel executor forks")
+@pytest.mark.slow_test
+def test_call_chunks_parallel_package_lane():
+    """
+    The chunks running a package manager run one at a time, alongside the
+    other chunks
+    """
+    states = [
+        (
+            "{}{}".format(kind, idx),
+            "cmd.run",
+            [{"name": "date +%s.%N; sleep 1; date +%s.%N"}, {"shell": "/bin/sh"}],
+        )
+        for kind in ("lane", "other")
+        for idx in range(2)
+    ]
+    assert salt.state.State._runs_in_package_lane({"state": "pip"})
+    assert not salt.state.State._runs_in_package_lane({"state": "cmd"})
+    with patch.object(
+        salt.state.State,
+        "_runs_in_package_lane",
+        staticmethod(lambda low: low["__id__"].startswith("lane")),
+    ):
+        start = time.time()
+        ret = _call_high_parallel(states, 4)
+    assert time.time() - start < 3.5
+    spans = {
+        data["__id__"]: [float(x) for x in data["changes"]["stdout"].split()]
+        for data in ret.values()
+    }
+    first, second = sorted([spans["lane0"], spans["lane1"]])
+    assert first[1] <= second[0]
+    # The other chunks ran alongside the first one
+    assert spans["other0"][0] < first[1]
+
+
+@pytest.mark.skip_on_windows(reason="The parallel executor forks")
+@pytest.mark.slow_test
+def test_call_chunks_parallel_pool():
+    """
+    The chunks run on a pool of workers, not in a process each
+    """
+    states = [
+        (
+            "ppid{}".format(idx),
+            "cmd.run",
+            [{"name": "echo $PPID"}, {"shell": "/bin/sh"}],
+        )
+        for idx in range(8)
+    ]
+    ret = _call_high_parallel(states, 2)
+    assert len(ret) == 8
+    pids = {data["changes"]["stdout"] for data in ret.values()}
+    assert str(os.getpid()) not in pids
+    assert 1 <= len(pids) <= 2
+
+
+@pytest.mark.skip_on_windows(reason="The parallel executor forks")
+@pytest.mark.slow_test
+def test_call_chunks_parallel_module_refresh(tmp_path):
+    """
+    A file.managed state runs in a worker and the main process refreshes its
+    modules once the result is merged
+    """
+    states = [
+        (
+            str(tmp_path / "mod.py"),
+            "file.managed",
+            [{"contents": "x = 1"}],
+        ),
+        ("a", "test.succeed_without_changes", []),
+    ]
+    with patch("salt.state.State.module_refresh", autospec=True) as module_refresh:
+        ret = _call_high_parallel(states, 2)
+    assert all(data["result"] for data in ret.values())
+    assert (tmp_path / "mod.py").read_text().strip() == "x = 1"
+    module_refresh.assert_called_once()
+
+
+def test_requisite_index_find():
+    """
+    The requisite index returns the same chunks, in the same order, as
+    matching every chunk with fnmatch
+    """
+    chunks = [
+        {"name": "/tmp/a", "__id__": "a", "state": "file", "__sls__": "web"},
+        {"name": "b", "__id__": "b", "state": "cmd", "__sls__": "web"},
+        {"name": "a", "__id__": "c", "state": "cmd", "__sls__": "db"},
+        {"name": "x", "__id__": "a", "state": "pkg", "__sls__": "db.sub"},
+    ]
+    index = salt.state.RequisiteIndex(chunks)
+    assert index.valid_for(chunks)
+    assert index.find("id", "a") == [chunks[0], chunks[2], chunks[3]]
+    assert index.find("cmd", "a") == [chunks[2]]
+    assert index.find("id", "/tmp/*") == [chunks[0]]
+    assert index.find("sls", "web") == chunks[:2]
+    assert index.find("sls", "db*") == chunks[2:]
+    assert index.find("sls", "nope") == []
+    assert index.find("id", None) == []
+    chunks.pop()
+    assert not index.valid_for(chunks)
+
+
+def test_high_index_find_name():
+    high = OrderedDict(
+        [
+            (
+                "a",
+                OrderedDict(
+                    [
+                        ("file", ["managed", {"name": "/tmp/a"}, {"user": "root"}]),
+                        ("__sls__", "web"),
+                        ("__env__", "base"),
+                    ]
+                ),
+            ),
+            (
+                "b",
+                OrderedDict(
+                    [
+                        ("cmd", ["run", {"name": "/tmp/a"}]),
+                        ("__sls__", "web"),
+                        ("__env__", "base"),
+                    ]
+                ),
+            ),
+        ]
+    )
+    index = salt.state.HighIndex(high)
+    for name, state in (
+        ("/tmp/a", "file"),
+        ("/tmp/a", "cmd"),
+        ("root", "file"),
+        ("web", "sls"),
+        ("a", "file"),
+        ("missing", "cmd"),
+    ):
+        assert index.find_name(name, state) == salt.state.find_name(name, state, high)
+    assert index.find_sls_ids("web") == salt.state.find_sls_ids("web", high)
+    assert index.find_named("/tmp/a") == ("file", "a")
+    assert index.find_named("missing") is None
@@ -3,11 +3,17 @@
 """
 
 import logging
+import os
 import textwrap
+import threading
 
 import pytest  # pylint: disable=unused-import
+import salt.exceptions
 import salt.state
+import salt.utils.files
+import salt.utils.templates
 from salt.utils.odict import OrderedDict
+from tests.support.mock import patch
 
 log = logging.getLogger(__name__)
 
@@ -323,3 +329,172 @@ def test_dont_extend_in_excluded_sls_file(highstate, state_tree_dir):
                 )
             ]
         )
+
+
+def test_state_compile_cache(highstate, state_tree_dir):
+    """
+    The compiled highstate is reused until one of its inputs changes
+    """
+    top_sls = "base: {'*': [foo]}"
+    foo_sls = textwrap.dedent(
+        """\
+        {%- from "bar.jinja" import name %}
+        foo:
+          test.succeed_without_changes:
+            - name: {{ name }}
+        """
+    )
+    sls_dir = str(state_tree_dir)
+    highstate.opts["state_compile_cache"] = True
+    with pytest.helpers.temp_file(
+        "top.sls", top_sls, sls_dir
+    ), pytest.helpers.temp_file("foo.sls", foo_sls, sls_dir), pytest.helpers.temp_file(
+        "bar.jinja", '{% set name = "first" %}', sls_dir
+    ):
+
+        def _run():
+            # Every run uses a new HighState object
+            highstate.building_highstate = OrderedDict()
+            with patch.object(
+                highstate, "render_highstate", wraps=highstate.render_highstate
+            ) as render:
+                ret = highstate.call_highstate()
+            assert len(ret) == 2
+            # The return reports whether the cache was used, before the states
+            first, state = sorted(ret.values(), key=lambda x: x["__run_num__"])
+            assert first["__id__"] == "compiled_highstate"
+            assert first["result"] is True
+            comments.append(first["comment"])
+            return state["name"], render.called
+
+        comments = []
+        assert _run() == ("first", True)
+        assert comments[-1] == (
+            "The highstate was compiled again: no compiled highstate is cached"
+        )
+        assert _run() == ("first", False)
+        assert comments[-1] == "The compiled highstate was reused"
+
+        # The templates imported by SLS files are inputs as well
+        with pytest.helpers.temp_file(
+            "bar.jinja", '{% set name = "second" %}', sls_dir
+        ):
+            assert _run() == ("second", True)
+            assert comments[-1] == (
+                "The highstate was compiled again: salt://bar.jinja in saltenv"
+                " base changed"
+            )
+            assert _run() == ("second", False)
+
+            highstate.state.opts["pillar"] = {"foo": "bar"}
+            assert _run() == ("second", True)
+            assert comments[-1] == (
+                "The highstate was compiled again: the grains, pillar,"
+                " master_tops or options changed"
+            )
+            assert _run() == ("second", False)
+
+            # saltutil.clear_cache removes the cache
+            os.remove(os.path.join(highstate.opts["cachedir"], "highstate.compiled.p"))
+            assert _run() == ("second", True)
+
+
+def test_render_profile(highstate, state_tree_dir):
+    """
+    The render profile records the SLS files with their include depth and
+    renderers, and writes the folded stacks to the cachedir
+    """
+    top_sls = "base: {'*': [foo]}"
+    foo_sls = textwrap.dedent(
+        """\
+        include:
+          - bar
+        foo:
+          test.succeed_without_changes
+        """
+    )
+    sls_dir = str(state_tree_dir)
+    # The same data loaded twice is deserialized once
+    bar_sls = textwrap.dedent(
+        """\
+        {{%- set first = "dir: {0}" | load_yaml %}}
+        {{%- set second = "dir: {0}" | load_yaml %}}
+        bar:
+          test.succeed_without_changes
+        """.format(
+            sls_dir
+        )
+    )
+    with pytest.helpers.temp_file(
+        "top.sls", top_sls, sls_dir
+    ), pytest.helpers.temp_file("foo.sls", foo_sls, sls_dir), pytest.helpers.temp_file(
+        "bar.sls", bar_sls, sls_dir
+    ):
+        highstate.start_render_profile()
+        high = highstate.compile_highstate()
+        report = highstate.stop_render_profile()
+
+    assert set(high) == {"foo", "bar"}
+    assert highstate.profile is None
+    stats = {item["sls"]: item for item in report["sls"]}
+    assert stats["foo"]["depth"] == 0
+    assert stats["bar"]["depth"] == 1
+    assert report["include_depth"] == 1
+    assert sorted(stats["foo"]["render"]) == ["jinja", "yaml"]
+    assert stats["foo"]["fetches"] >= 1
+    assert "render_highstate" in report["phases"]
+    assert "verify_high" in report["phases"]
+    assert report["parsed_data"] == {"parses": 1, "hits": 1}
+    assert os.path.isfile(report["folded"])
+    with salt.utils.files.fopen(report["folded"]) as fp_:
+        folded = fp_.read()
+    assert "render_highstate;sls:base:foo;include;sls:base:bar" in folded
+
+
+def test_render_highstate_drops_jinja_envs(highstate, state_tree_dir):
+    top_sls = """
+    base:
+      '*':
+        - foo
+    """
+    foo_sls = """
+    {{ "foo" }}:
+      test.succeed_without_changes
+    """
+    with pytest.helpers.temp_file(
+        "top.sls", top_sls, str(state_tree_dir)
+    ), pytest.helpers.temp_file("foo.sls", foo_sls, str(state_tree_dir)):
+        matches = highstate.top_matches(highstate.get_top())
+        with patch.object(
+            salt.utils.templates,
+            "clear_jinja_envs",
+            wraps=salt.utils.templates.clear_jinja_envs,
+        ) as clear:
+            high, errors = highstate.render_highstate(matches)
+    assert not errors
+    assert "foo" in high
+    clear.assert_called_once_with()
+    # The environments kept for the render hold its options and file client
+    assert not [
+        key
+        for key in salt.utils.templates._JINJA_ENVS
+        if key[0] == threading.get_ident()
+    ]
+
+
+@pytest.mark.parametrize("render_profile", [False, True])
+def test_call_highstate_top_render_error(highstate, render_profile):
+    """
+    A top file which fails to render is reported in the return
+    """
+    highstate.opts["state_render_profile"] = render_profile
+    with patch.object(
+        highstate,
+        "get_top",
+        side_effect=salt.exceptions.SaltRenderError("bad top"),
+    ):
+        ret = highstate.call_highstate()
+    assert ret["no_|-states_|-states_|-None"]["comment"] == (
+        "Unable to render top file: bad top"
+    )
+    assert highstate.profile is None
@@ -4,6 +4,8 @@ unit tests for the beacon_module parameter
 
 import logging
 
+import pytest
+import salt.beacons
 import salt.config
 from tests.support.mock import MagicMock, call, patch
 
@@ -70,3 +72,72 @@ def test_beacon_module():
     ]
     assert ret == _expected
 
+
+def test_beacon_shared_samples():
+    """
+    Test that the beacons share the metrics sampled during a pass and that
+    identical events are only fired once
+    """
+    psutil = pytest.importorskip("psutil")
+    mock_opts = salt.config.DEFAULT_MINION_OPTS.copy()
+    mock_opts["id"] = "minion"
+    mock_opts["__role"] = "minion"
+    mock_opts["beacons"] = {
+        "memusage_a": [{"percent": "10%"}, {"beacon_module": "memusage"}],
+        "memusage_b": [{"percent": "20%"}, {"beacon_module": "memusage"}],
+        "diskusage": [{"/": "10%"}, {"^/$": "10%"}],
+    }
+    virtual_memory = MagicMock(return_value=MagicMock(percent=50.0))
+    disk_usage = MagicMock(return_value=MagicMock(percent=50.0))
+    disk_partitions = MagicMock(return_value=[MagicMock(mountpoint="/")])
+    beacon = salt.beacons.Beacon(mock_opts, [])
+    with patch.object(psutil, "virtual_memory", virtual_memory), patch.object(
+        psutil, "disk_usage", disk_usage
+    ), patch.object(psutil, "disk_partitions", disk_partitions), patch(
+        "salt.utils.platform.is_windows", MagicMock(return_value=False)
+    ):
+        ret = beacon.process(mock_opts["beacons"], mock_opts["grains"])
+        assert virtual_memory.call_count == 1
+        assert disk_partitions.call_count == 1
+        assert disk_usage.call_count == 1
+        assert [event["tag"] for event in ret] == [
+            "salt/beacon/minion/memusage_a/",
+            "salt/beacon/minion/memusage_b/",
+            "salt/beacon/minion/diskusage/",
+        ]
+
+        # Every pass samples the metrics again
+        beacon.process(mock_opts["beacons"], mock_opts["grains"])
+        assert virtual_memory.call_count == 2
+
+
+def test_beacon_coalesce_opt_in():
+    """
+    Test that only the beacons setting COALESCE_EVENTS have their identical
+    events fired once per pass
+    """
+    mock_opts = salt.config.DEFAULT_MINION_OPTS.copy()
+    mock_opts["id"] = "minion"
+    mock_opts["__role"] = "minion"
+    mock_opts["beacons"] = {
+        "metric": [{"beacon_module": "ps"}],
+        "lines": [{"beacon_module": "sh"}],
+    }
+    event = {"tag": "x", "value": [1, {"a": 2}]}
+    metric_mock = MagicMock(side_effect=lambda config: [dict(event), dict(event)])
+    metric_mock.__globals__ = {"COALESCE_EVENTS": True}
+    lines_mock = MagicMock(side_effect=lambda config: [dict(event), dict(event)])
+    lines_mock.__globals__ = {}
+
+    beacon = salt.beacons.Beacon(mock_opts, [])
+    beacon.beacons["ps.beacon"] = metric_mock
+    beacon.beacons["sh.beacon"] = lines_mock
+    beacon.beacons["ps.validate"] = MagicMock(return_value=(True, ""))
+    beacon.beacons["sh.validate"] = MagicMock(return_value=(True, ""))
+    ret = beacon.process(mock_opts["beacons"], mock_opts["grains"])
+
+    assert [item["tag"] for item in ret] == [
+        "salt/beacon/minion/metric/x",
+        "salt/beacon/minion/lines/x",
+        "salt/beacon/minion/lines/x",
+    ]
@@ -11,6 +11,7 @@ import salt.syspaths
 import salt.utils.crypt
 import salt.utils.event as event
 import salt.utils.jid
+import salt.utils.mine
 import salt.utils.platform
 import salt.utils.process
 from salt._compat import ipaddress
@@ -118,6 +119,55 @@ def test_mine_send_tries(req_channel_factory):
         assert rtn == 20
 
 
+@patch("salt.transport.client.ReqChannel.factory")
+def test_mine_send_delta(req_channel_factory):
+    loads = []
+    replies = []
+
+    def _send(load, timeout, tries):
+        loads.append(copy.deepcopy(load))
+        return replies.pop(0) if replies else True
+
+    channel_enter = MagicMock()
+    channel_enter.send.side_effect = _send
+    channel = MagicMock()
+    channel.__enter__.return_value = channel_enter
+    req_channel_factory.return_value = channel
+
+    opts = {
+        "random_startup_delay": 0,
+        "grains": {},
+        "return_retry_tries": 20,
+        "minion_sign_messages": False,
+        "mine_delta": True,
+    }
+    with patch("salt.loader.grains"):
+        minion = salt.minion.Minion(opts)
+        minion.tok = "token"
+
+        mine_data = {"ip_addrs": ["10.0.0.1"], "os": "Linux"}
+        load = {"cmd": "_mine", "data": dict(mine_data), "id": "minion"}
+        assert minion._mine_send("_minion_mine", copy.deepcopy(load)) is True
+        assert loads[-1]["data"] == mine_data
+        assert set(loads[-1]["mine_hashes"]) == {"ip_addrs", "os"}
+
+        # Only the function which changed is sent
+        load["data"]["ip_addrs"] = ["10.0.0.2"]
+        assert minion._mine_send("_minion_mine", copy.deepcopy(load)) is True
+        assert loads[-1]["data"] == {"ip_addrs": ["10.0.0.2"]}
+        assert set(loads[-1]["mine_hashes"]) == {"ip_addrs", "os"}
+
+        # All functions are sent when the master cannot apply the delta
+        replies.append({salt.utils.mine.MINE_DELTA_KEY: False})
+        del loads[:]
+        assert minion._mine_send("_minion_mine", copy.deepcopy(load)) is True
+        assert [sent["data"] for sent in loads] == [{}, load["data"]]
+
+        minion._mine_send("_minion_mine", {"cmd": "_mine_flush", "id": "minion"})
+        minion._mine_send("_minion_mine", copy.deepcopy(load))
+        assert loads[-1]["data"] == load["data"]
+
+
 def test_invalid_master_address():
     opts = salt.config.DEFAULT_MINION_OPTS.copy()
     with patch.dict(
@@ -549,6 +599,48 @@ def test_minion_module_refresh_beacons_refresh():
             minion.destroy()
 
 
+def test_minion_pillar_refresh_recycles_job_pool():
+    """
+    Tests that the job pool is recycled once the new pillar is in the opts,
+    the workers forked while the pillar was compiled have the old pillar.
+    """
+    recycled = []
+    job_pool = MagicMock()
+    job_pool.recycle.side_effect = lambda: recycled.append(
+        minion.opts["pillar"].get("new")
+    )
+    async_pillar = MagicMock()
+    async_pillar.compile_pillar.return_value = salt.ext.tornado.gen.maybe_future(
+        {"new": True}
+    )
+    with patch("salt.minion.Minion.ctx", MagicMock(return_value={})), patch(
+        "salt.utils.process.SignalHandlingProcess.start",
+        MagicMock(return_value=True),
+    ), patch(
+        "salt.utils.process.SignalHandlingProcess.join",
+        MagicMock(return_value=True),
+    ), patch(
+        "salt.pillar.get_async_pillar", MagicMock(return_value=async_pillar)
+    ), patch(
+        "salt.utils.event.get_event", MagicMock()
+    ):
+        io_loop = salt.ext.tornado.ioloop.IOLoop()
+        try:
+            mock_opts = salt.config.DEFAULT_MINION_OPTS.copy()
+            mock_opts["pillar"] = {}
+            minion = salt.minion.Minion(mock_opts, io_loop=io_loop)
+            minion.connected = True
+            minion.job_pool = job_pool
+            with patch.object(minion, "module_refresh"), patch.object(
+                minion, "matchers_refresh"
+            ), patch.object(minion, "beacons_refresh"):
+                io_loop.run_sync(minion.pillar_refresh)
+            assert minion.opts["pillar"]["new"] is True
+            assert recycled == [True]
+        finally:
+            minion.destroy()
+
+
 @pytest.mark.slow_test
 def test_when_ping_interval_is_set_the_callback_should_be_added_to_periodic_callbacks():
     with patch("salt.minion.Minion.ctx", MagicMock(return_value={})), patch(
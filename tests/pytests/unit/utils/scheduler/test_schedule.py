@@ -343,6 +343,46 @@ def test_eval_schedule_time_eval(schedule):
     )
 
 
+def test_eval_schedule_not_due_cached(schedule):
+    """
+    Tests eval only evaluates the jobs which are due or were modified
+    """
+    schedule.opts.update({"pillar": {"schedule": {}}})
+    schedule.opts.update(
+        {
+            "schedule": {
+                "job1": {"function": "test.true", "seconds": 60},
+                "job2": {"function": "test.true", "minutes": 1},
+            }
+        }
+    )
+    now = datetime.datetime(2021, 1, 1, 12, 0, 0, 500000)
+    schedule.eval(now=now)
+    next_fire_time = schedule.opts["schedule"]["job1"]["_next_fire_time"]
+    assert next_fire_time == now + datetime.timedelta(seconds=60)
+    assert set(schedule._eval_cache) == {"job1", "job2"}
+
+    with patch.object(schedule, "_cache_eval") as cache_eval, patch.object(
+        schedule, "_run_job"
+    ) as run_job:
+        schedule.eval(now=now + datetime.timedelta(seconds=30))
+        cache_eval.assert_not_called()
+
+        # A modified job is evaluated again
+        schedule.opts["schedule"]["job1"] = {"function": "test.true", "seconds": 120}
+        schedule.eval(now=now + datetime.timedelta(seconds=31))
+        assert [call[0][0] for call in cache_eval.call_args_list] == ["job1"]
+        run_job.assert_not_called()
+
+    # A job is evaluated, and run, once it is due
+    with patch.object(schedule, "_run_job") as run_job, patch(
+        "salt.utils.minion.running", MagicMock(return_value=[])
+    ):
+        schedule.eval(now=next_fire_time.replace(microsecond=0))
+        assert [call[0][1]["name"] for call in run_job.call_args_list] == ["job2"]
+    assert schedule._eval_cache["job2"][1] > next_fire_time
+
+
 @pytest.mark.skipif(not _CRON_SUPPORTED, reason="croniter module not installed")
 def test_eval_schedule_cron(schedule):
     """
@@ -0,0 +1,158 @@
+"""
+Tests for salt.utils.blobstore
+"""
+import os
+
+import pytest
+import salt.fileclient
+import salt.utils.blobstore
+import salt.utils.files
+import salt.utils.hashutils
+from tests.support.mock import MagicMock, patch
+
+
+@pytest.fixture
+def opts(tmp_path):
+    cachedir = tmp_path / "cache"
+    cachedir.mkdir()
+    return {
+        "cachedir": str(cachedir),
+        "file_client_blob_cache": True,
+        "file_client_blob_cache_max_size": 0,
+        "hash_type": "sha256",
+    }
+
+
+def _write(path, contents):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with salt.utils.files.fopen(path, "w") as fp_:
+        fp_.write(contents)
+    return {
+        "hsum": salt.utils.hashutils.get_hash(path, form="sha256"),
+        "hash_type": "sha256",
+    }
+
+
+def test_add_and_materialize(opts):
+    store = salt.utils.blobstore.BlobStore(opts)
+    src = os.path.join(opts["cachedir"], "files", "base", "foo.txt")
+    hash_info = _write(src, "foo")
+    blob = store.add(src, hash_info)
+    assert blob == store.blob_path(hash_info)
+    assert os.path.samefile(blob, src)
+
+    dest = os.path.join(opts["cachedir"], "files", "dev", "foo.txt")
+    assert store.materialize(hash_info, dest)
+    assert os.path.samefile(blob, dest)
+
+    copy = os.path.join(opts["cachedir"], "copy.txt")
+    assert store.materialize(hash_info, copy, link=False)
+    assert not os.path.samefile(blob, copy)
+    with salt.utils.files.fopen(copy) as fp_:
+        assert fp_.read() == "foo"
+
+
+def test_add_hash_mismatch(opts):
+    store = salt.utils.blobstore.BlobStore(opts)
+    src = os.path.join(opts["cachedir"], "files", "base", "foo.txt")
+    hash_info = _write(src, "foo")
+    _write(src, "bar")
+    assert store.add(src, hash_info) is None
+    assert store.find(hash_info) is None
+    assert not store.materialize(hash_info, src + ".new")
+
+
+def test_unshare(opts):
+    store = salt.utils.blobstore.BlobStore(opts)
+    src = os.path.join(opts["cachedir"], "files", "base", "foo.txt")
+    hash_info = _write(src, "foo")
+    blob = store.add(src, hash_info)
+    store.unshare(src)
+    assert not os.path.exists(src)
+    assert os.path.isfile(blob)
+    # A blob which is not shared is left alone
+    store.unshare(blob)
+    assert os.path.isfile(blob)
+
+
+def test_prune_lru(opts):
+    store = salt.utils.blobstore.BlobStore(opts)
+    hashes = []
+    for idx in range(3):
+        src = os.path.join(opts["cachedir"], "files", "base", "{}.txt".format(idx))
+        hash_info = _write(src, str(idx) * 400000)
+        blob = store.add(src, hash_info)
+        os.utime(store._access_path(blob), (idx, idx))
+        hashes.append(hash_info)
+    store.max_size = 1048576
+    # Touch the oldest blob so that it becomes the most recently used one
+    assert store.find(hashes[0])
+    assert store.prune() == 1
+    assert store.find(hashes[0])
+    assert store.find(hashes[1]) is None
+    assert store.find(hashes[2])
+    # The cached file linked to the evicted blob is evicted as well
+    assert not os.path.exists(os.path.join(opts["cachedir"], "files", "base", "1.txt"))
+    assert os.path.exists(os.path.join(opts["cachedir"], "files", "base", "0.txt"))
+
+
+def test_find_keeps_mtime(opts):
+    """
+    Using a blob does not change the modification time of the cached files
+    linked to it
+    """
+    store = salt.utils.blobstore.BlobStore(opts)
+    src = os.path.join(opts["cachedir"], "files", "base", "foo.txt")
+    hash_info = _write(src, "foo")
+    store.add(src, hash_info)
+    os.utime(src, (1000, 1000))
+    assert store.find(hash_info)
+    assert os.stat(src).st_mtime == 1000
+
+
+def test_add_prunes_on_interval(opts):
+    store = salt.utils.blobstore.BlobStore(opts)
+    store.max_size = 1048576
+    with patch.object(store, "prune", MagicMock(return_value=0)) as prune:
+        for idx in range(3):
+            src = os.path.join(opts["cachedir"], "files", "base", "{}.txt".format(idx))
+            store.add(src, _write(src, str(idx)))
+        prune.assert_called_once()
+        os.utime(store.prune_stamp, (0, 0))
+        src = os.path.join(opts["cachedir"], "files", "base", "3.txt")
+        store.add(src, _write(src, "3"))
+        assert prune.call_count == 2
+
+
+def test_remote_client_get_file_uses_blob(opts):
+    """
+    A file whose hash is already in the blob cache is not transferred again
+    """
+    src = os.path.join(opts["cachedir"], "files", "base", "foo.txt")
+    hash_info = _write(src, "foo")
+    channel = MagicMock()
+    with patch("salt.loader.utils", MagicMock(return_value={})), patch(
+        "salt.transport.client.ReqChannel.factory", MagicMock(return_value=channel)
+    ):
+        client = salt.fileclient.RemoteClient(opts)
+    client.blobs.add(src, hash_info)
+
+    with patch.object(
+        client,
+        "hash_and_stat_file",
+        MagicMock(side_effect=[(hash_info, None), ({}, None)]),
+    ), patch("salt.utils.platform.is_windows", MagicMock(return_value=False)):
+        ret = client.get_file("salt://foo.txt", saltenv="dev")
+
+    expected = os.path.join(opts["cachedir"], "files", "dev", "foo.txt")
+    assert ret == expected
+    assert os.path.samefile(expected, src)
+    channel.send.assert_not_called()
+
+    # is_cached can populate the cache from the blob store as well
+    assert client.is_cached("salt://foo.txt", saltenv="prod") == ""
+    expected = os.path.join(opts["cachedir"], "files", "prod", "foo.txt")
+    assert (
+        client.is_cached("salt://foo.txt", saltenv="prod", source_hash=hash_info)
+        == expected
+    )
@@ -44,6 +44,19 @@ def test_ttl():
         cd["foo"]  # pylint: disable=pointless-statement
 
 
+def test_max_size():
+    cd = cache.CacheDict(5, max_size=2)
+    cd["foo"] = 1
+    cd["bar"] = 2
+    # Use foo, so that bar is the least recently used item
+    assert cd["foo"] == 1
+    cd["baz"] = 3
+    assert "bar" not in cd
+    assert cd["foo"] == 1
+    assert cd["baz"] == 3
+    assert len(cd) == 2
+
+
 @pytest.fixture
 def cache_dir(tmp_path):
     cachedir = tmp_path / "cachedir"
@@ -72,6 +85,25 @@ def test_smoke_context(minion_config):
     assert ret == data
 
 
+def test_generation(minion_config):
+    assert cache.get_generation(minion_config, "fileserver") == ""
+    assert cache.bump_generation(minion_config, "fileserver")
+    first = cache.get_generation(minion_config, "fileserver")
+    assert first
+    assert cache.bump_generation(minion_config, "fileserver")
+    assert cache.get_generation(minion_config, "fileserver") not in ("", first)
+    assert cache.get_generation(minion_config, "git_pillar") == ""
+
+    # The saltenvs of the fileserver have generations of their own
+    name = cache.fileserver_generation("feature/foo")
+    assert name == "fileserver_feature%2Ffoo"
+    assert cache.bump_generation(minion_config, name)
+    assert cache.get_generation(minion_config, name)
+    assert (
+        cache.get_generation(minion_config, cache.fileserver_generation("base")) == ""
+    )
+
+
 @pytest.fixture
 def cache_mod_name():
     return "cache_mod"
@@ -0,0 +1,75 @@
+"""
+Tests for the reuse of Jinja environments and of the compiled template code
+"""
+import os
+
+import pytest
+import salt.exceptions
+import salt.utils.jinja
+import salt.utils.templates
+
+
+@pytest.fixture
+def opts(tmp_path):
+    return {"cachedir": str(tmp_path), "jinja_bytecode_cache": False}
+
+
+def _render(opts, tmplstr, **kwargs):
+    context = dict(opts=opts, saltenv=None, **kwargs)
+    return salt.utils.templates.render_jinja_tmpl(tmplstr, context)
+
+
+def test_environment_reused_without_leaking_globals(opts):
+    assert _render(opts, "{{ foo }}", foo="bar") == "bar"
+    env = salt.utils.templates._get_jinja_env(opts, None, None, {}, {})
+    assert "foo" not in env.globals
+    with pytest.raises(salt.exceptions.SaltRenderError):
+        _render(opts, "{{ foo }}")
+    assert salt.utils.templates._get_jinja_env(opts, None, None, {}, {}) is env
+
+
+def test_environment_depends_on_settings(opts):
+    env = salt.utils.templates._get_jinja_env(opts, None, None, {}, {})
+    other = salt.utils.templates._get_jinja_env(
+        opts, None, None, {}, {"trim_blocks": True}
+    )
+    assert other is not env
+    assert other.trim_blocks is True
+
+
+def test_compiled_code_reused(opts):
+    bcc = salt.utils.jinja.get_bytecode_cache(opts)
+    assert bcc.directory is None
+    tmplstr = "{{ value }} compiled once"
+    assert _render(opts, tmplstr, value=1) == "1 compiled once"
+    cached = dict(bcc._memory)
+    assert _render(opts, tmplstr, value=2) == "2 compiled once"
+    assert dict(bcc._memory) == cached
+
+
+def test_bytecode_cache_on_disk(opts):
+    opts["jinja_bytecode_cache"] = True
+    bcc = salt.utils.jinja.get_bytecode_cache(opts)
+    assert bcc.directory == os.path.join(opts["cachedir"], "jinja_bytecode")
+    assert _render(opts, "{{ value }} on disk", value=1) == "1 on disk"
+    files = os.listdir(bcc.directory)
+    assert len(files) == 1
+
+    # A new process only has the compiled code on disk
+    bcc._memory.clear()
+    env = salt.utils.templates._get_jinja_env(opts, None, None, {}, {})
+    bucket = bcc.get_bucket(env, None, None, "{{ value }} on disk")
+    assert bucket.code is not None
+    assert _render(opts, "{{ value }} on disk", value=2) == "2 on disk"
+
+    bcc.clear()
+    assert os.listdir(bcc.directory) == []
+
+
+def test_environments_dropped(opts):
+    env = salt.utils.templates._get_jinja_env(opts, None, None, {}, {})
+    # The entry of a thread which exited
+    salt.utils.templates._JINJA_ENVS[(-1,)] = (opts, None, env, {})
+    salt.utils.templates.clear_jinja_envs()
+    assert (-1,) not in salt.utils.templates._JINJA_ENVS
+    assert salt.utils.templates._get_jinja_env(opts, None, None, {}, {}) is not env
@@ -0,0 +1,147 @@
+"""
+Tests for salt.utils.jobpool
+"""
+import os
+import signal
+import time
+
+import pytest
+import salt.loader.lazy
+import salt.utils.files
+import salt.utils.jobpool
+import salt.utils.platform
+
+pytestmark = [
+    pytest.mark.skipif(
+        salt.utils.platform.spawning_platform(),
+        reason="The job pool requires forking processes",
+    ),
+]
+
+
+class FakeMinion:
+    def __init__(self, tmp_path):
+        self.opts = {"output_dir": str(tmp_path)}
+        self.proc_dir = str(tmp_path)
+        self.connected = False
+        self.job_pool_worker = False
+
+    @classmethod
+    def _target(cls, minion_instance, opts, data, connected):
+        path = os.path.join(opts["output_dir"], "{}.out".format(data["jid"]))
+        with salt.utils.files.fopen(path, "w") as fp_:
+            fp_.write(
+                "{} {} {}".format(
+                    os.getpid(), connected, minion_instance.job_pool_worker
+                )
+            )
+        if data.get("sleep"):
+            time.sleep(data["sleep"])
+
+
+def _wait(func, timeout=30):
+    start = time.time()
+    while time.time() - start < timeout:
+        ret = func()
+        if ret:
+            return ret
+        time.sleep(0.05)
+    raise AssertionError("Timed out")
+
+
+def _output(tmp_path, jid):
+    path = tmp_path / "{}.out".format(jid)
+    if path.exists():
+        return path.read_text().split()
+
+
+def _dispatch(pool, data):
+    return _wait(lambda: pool.dispatch(data, True))
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = salt.utils.jobpool.JobPool(FakeMinion(tmp_path), 2, max_jobs=2)
+    try:
+        yield pool
+    finally:
+        pool.stop()
+        for worker in pool.workers:
+            worker.process.join(10)
+
+
+def test_dispatch_and_recycle(pool, tmp_path):
+    # The pool is started on the first job, which runs in its own process
+    assert pool.dispatch({"jid": "1"}, True) is False
+    assert len(pool.workers) == 2
+
+    assert _dispatch(pool, {"jid": "2"})
+    pid, connected, job_pool_worker = _wait(lambda: _output(tmp_path, "2"))
+    assert connected == "True"
+    # The worker does not load the modules again for the job
+    assert job_pool_worker == "True"
+    assert pool.minion.job_pool_worker is False
+    assert int(pid) in [worker.process.pid for worker in pool.workers]
+
+    # A worker is replaced once it ran max_jobs jobs
+    for jid in ("3", "4", "5", "6"):
+        assert _dispatch(pool, {"jid": jid})
+        _wait(lambda: _output(tmp_path, jid))
+    pids = [int(_output(tmp_path, jid)[0]) for jid in ("2", "3", "4", "5", "6")]
+    assert max(pids.count(pid) for pid in pids) <= 2
+    assert len(set(pids)) >= 3
+    assert len([worker for worker in pool.workers if not worker.retired]) == 2
+
+    old = {worker.process.pid for worker in pool.workers}
+    pool.recycle()
+    assert all(worker.retired for worker in pool.workers)
+    assert _dispatch(pool, {"jid": "7"})
+    pid = int(_wait(lambda: _output(tmp_path, "7"))[0])
+    assert pid not in old
+
+
+def test_killed_worker_replaced(pool, tmp_path):
+    pool.dispatch({"jid": "1"}, True)
+    assert _dispatch(pool, {"jid": "2", "sleep": 60})
+    pid = int(_wait(lambda: _output(tmp_path, "2"))[0])
+    os.kill(pid, signal.SIGTERM)
+
+    def _replaced():
+        pool._reap()
+        pool._fill()
+        return pid not in [worker.process.pid for worker in pool.workers]
+
+    _wait(_replaced)
+    assert len(pool.workers) == 2
+    assert _dispatch(pool, {"jid": "3"})
+    _wait(lambda: _output(tmp_path, "3"))
+
+
+class ContextMinion(FakeMinion):
+    def __init__(self, tmp_path):
+        super().__init__(tmp_path)
+        self.functions = salt.loader.lazy.LazyLoader(
+            [], opts={}, pack={"__context__": {"minion": True}}
+        )
+
+    @classmethod
+    def _target(cls, minion_instance, opts, data, connected):
+        context = minion_instance.functions.pack["__context__"]
+        path = os.path.join(opts["output_dir"], "{}.out".format(data["jid"]))
+        with salt.utils.files.fopen(path, "w") as fp_:
+            fp_.write(" ".join(["context"] + sorted(context)))
+        context[data["jid"]] = True
+
+
+def test_context_cleared_between_jobs(tmp_path):
+    pool = salt.utils.jobpool.JobPool(ContextMinion(tmp_path), 1)
+    try:
+        pool.dispatch({"jid": "1"}, True)
+        for jid in ("2", "3"):
+            assert _dispatch(pool, {"jid": jid})
+            # The job does not see what the previous job left in __context__
+            assert _wait(lambda: _output(tmp_path, jid)) == ["context"]
+    finally:
+        pool.stop()
+        for worker in pool.workers:
+            worker.process.join(10)
@@ -0,0 +1,83 @@
+"""
+Tests for salt.utils.renderprofile
+"""
+import salt.utils.renderprofile
+from tests.support.mock import MagicMock
+
+
+def test_span_without_profile():
+    with salt.utils.renderprofile.span(None, "top"):
+        pass
+
+
+def test_sls_render_and_include_depth():
+    profile = salt.utils.renderprofile.RenderProfile()
+    with salt.utils.renderprofile.span(profile, "render_highstate"):
+        with profile.sls("base", "web"):
+            with profile.renderer("jinja"):
+                pass
+            with profile.renderer("yaml"):
+                pass
+            with salt.utils.renderprofile.span(profile, "include"):
+                with profile.sls("base", "web.nginx"):
+                    with profile.renderer("yaml"):
+                        pass
+
+    report = profile.report()
+    assert list(report["phases"]) == ["render_highstate"]
+    assert report["include_depth"] == 1
+    stats = {
+        "{}:{}".format(item["saltenv"], item["sls"]): item for item in report["sls"]
+    }
+    assert stats["base:web"]["depth"] == 0
+    assert sorted(stats["base:web"]["render"]) == ["jinja", "yaml"]
+    assert stats["base:web.nginx"]["depth"] == 1
+    assert list(stats["base:web.nginx"]["render"]) == ["yaml"]
+    assert stats["base:web"]["total"] >= stats["base:web.nginx"]["total"]
+    assert set(profile.folded) == {
+        "render_highstate",
+        "render_highstate;sls:base:web",
+        "render_highstate;sls:base:web;render:jinja",
+        "render_highstate;sls:base:web;render:yaml",
+        "render_highstate;sls:base:web;include",
+        "render_highstate;sls:base:web;include;sls:base:web.nginx",
+        "render_highstate;sls:base:web;include;sls:base:web.nginx;render:yaml",
+    }
+
+
+def test_track_fetches(tmp_path):
+    cached = tmp_path / "cached.sls"
+    cached.write_text("a: b")
+    client = MagicMock()
+    client.is_cached.side_effect = lambda path, saltenv: (
+        str(cached) if path == "salt://cached.sls" else ""
+    )
+    get_file = client.get_file
+    profile = salt.utils.renderprofile.RenderProfile()
+    profile.track(client)
+    with profile.sls("base", "cached"):
+        client.get_file("salt://cached.sls", "", False, "base")
+        client.get_file("salt://missing.sls", "", False, "base")
+    profile.untrack()
+    assert client.get_file is get_file
+    assert get_file.call_count == 2
+
+    report = profile.report()
+    assert report["fetches"] == 2
+    assert report["cache_hits"] == 1
+    assert report["sls"][0]["fetches"] == 2
+    assert report["sls"][0]["cache_hits"] == 1
+    assert "sls:base:cached;fetch:salt://cached.sls" in profile.folded
+
+
+def test_save_folded(tmp_path):
+    profile = salt.utils.renderprofile.RenderProfile()
+    with salt.utils.renderprofile.span(profile, "top"):
+        with salt.utils.renderprofile.span(profile, "render:yaml"):
+            pass
+    path = profile.save({"cachedir": str(tmp_path)}, "20261019")
+    assert path == str(tmp_path / "render_profile" / "20261019.folded")
+    with open(path) as fp_:
+        lines = fp_.read().splitlines()
+    assert [line.rsplit(" ", 1)[0] for line in lines] == ["top", "top;render:yaml"]
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
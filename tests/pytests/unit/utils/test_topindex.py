@@ -0,0 +1,83 @@
+"""
+Tests for salt.utils.topindex
+"""
+import pytest
+import salt.config
+import salt.loader
+import salt.utils.topindex
+from salt.utils.odict import OrderedDict
+from tests.support.mock import MagicMock, patch
+
+
+@pytest.fixture
+def body():
+    return OrderedDict(
+        [
+            ("*", ["common"]),
+            ("web1", ["exact"]),
+            ("web*", ["glob"]),
+            ("w?b2", ["glob_char"]),
+            ("db[0-9]", ["glob_range"]),
+            ("L@db1,web2", ["compound_list"]),
+            ("db1,db2", [{"match": "list"}, "list"]),
+            ("web[12]", [{"match": "glob"}, "glob_matcher"]),
+            ("G@os:Fedora", ["compound_grain"]),
+            ("kernel:Linux", [{"match": "grain"}, "grain"]),
+            ("G@roles:web", ["missing_grain"]),
+            ("G@os:Fedora and web*", ["compound"]),
+            ("E@db[0-9]+", ["pcre"]),
+        ]
+    )
+
+
+@pytest.fixture(params=["web1", "web2", "db1", "db10", "mail"])
+def opts(request):
+    opts = salt.config.DEFAULT_MINION_OPTS.copy()
+    opts.update(
+        {
+            "id": request.param,
+            "grains": {"os": "Fedora", "kernel": "Linux"},
+            "top_file_index": True,
+        }
+    )
+    return opts
+
+
+def test_confirm_top(body, opts):
+    confirm = salt.loader.matchers(opts)["confirm_top.confirm_top"]
+    expected = [tgt for tgt, data in body.items() if confirm(tgt, data, {})]
+
+    mock_confirm = MagicMock(side_effect=confirm)
+    with patch.dict(salt.utils.topindex._INDEX_CACHE, clear=True):
+        confirm_top = salt.utils.topindex.confirm_top(opts, body, mock_confirm)
+        assert [tgt for tgt, data in body.items() if confirm_top(tgt, data, {})] == (
+            expected
+        )
+        # Only the targets which are not in the index were evaluated
+        assert sorted(call[0][0] for call in mock_confirm.call_args_list) == [
+            "E@db[0-9]+",
+            "G@os:Fedora",
+            "G@os:Fedora and web*",
+            "kernel:Linux",
+        ]
+        # The index is reused
+        assert salt.utils.topindex.get_index(body) is salt.utils.topindex.get_index(
+            body.copy()
+        )
+        assert len(salt.utils.topindex._INDEX_CACHE) == 1
+
+
+def test_confirm_top_disabled(body, opts):
+    opts["top_file_index"] = False
+    confirm = MagicMock()
+    assert salt.utils.topindex.confirm_top(opts, body, confirm) is confirm
+
+
+def test_confirm_top_subfilter(body, opts):
+    """
+    Targets which are not the ones of the top file are always evaluated
+    """
+    confirm = MagicMock(return_value=True)
+    confirm_top = salt.utils.topindex.confirm_top(opts, body, confirm)
+    assert confirm_top("web1", ["other"], {})
+    confirm.assert_called_once_with("web1", ["other"], {})
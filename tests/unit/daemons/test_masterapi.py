@@ -5,6 +5,7 @@ from functools import wraps
 import pytest
 import salt.config
 import salt.daemons.masterapi as masterapi
+import salt.utils.mine
 import salt.utils.platform
 from tests.support.mixins import AdaptedConfigurationTestCaseMixin
 from tests.support.mock import MagicMock, patch
@@ -793,7 +794,10 @@ class FakeCache:
         self.data[bank, key] = value
 
     def fetch(self, bank, key):
-        return self.data[bank, key]
+        return self.data.get((bank, key), {})
+
+    def flush(self, bank, key=None):
+        self.data.pop((bank, key), None)
 
 
 class RemoteFuncsTestCase(TestCase):
@@ -993,3 +997,90 @@ class RemoteFuncsTestCase(TestCase):
                 }
             )
         self.assertDictEqual(ret, {})
+
+    def test_mine_delta(self):
+        """
+        Asserts that ``_mine`` applies a mine delta only when the hashes of the
+        functions left out match the mine data it has.
+        """
+        data = {"ip_addr": "2001:db8::1:3", "os": "Linux"}
+        hashes = {
+            function: salt.utils.mine.function_hash(value)
+            for function, value in data.items()
+        }
+        ret = self.funcs._mine(
+            {"id": "webserver", "data": data, "mine_hashes": hashes},
+            skip_verify=True,
+        )
+        self.assertIs(ret, True)
+        self.assertEqual(
+            self.funcs.cache.fetch("minions/webserver", "mine_hashes"), hashes
+        )
+
+        hashes["ip_addr"] = salt.utils.mine.function_hash("2001:db8::1:4")
+        ret = self.funcs._mine(
+            {
+                "id": "webserver",
+                "data": {"ip_addr": "2001:db8::1:4"},
+                "mine_hashes": hashes,
+            },
+            skip_verify=True,
+        )
+        self.assertIs(ret, True)
+        self.assertEqual(
+            self.funcs.cache.fetch("minions/webserver", "mine"),
+            {"ip_addr": "2001:db8::1:4", "os": "Linux"},
+        )
+
+        # The os function was removed from the mine on the master
+        self.funcs.cache.store("minions/webserver", "mine", {})
+        ret = self.funcs._mine(
+            {"id": "webserver", "data": {}, "mine_hashes": hashes},
+            skip_verify=True,
+        )
+        self.assertEqual(ret, {salt.utils.mine.MINE_DELTA_KEY: False})
+        self.assertEqual(self.funcs.cache.fetch("minions/webserver", "mine"), {})
+
+    def test_mine_get_index(self):
+        """
+        Asserts that ``mine_get`` answers from the mine index until the mine
+        data of the function changes.
+        """
+        self.funcs.opts["mine_index"] = True
+        self.funcs.mine_index = salt.utils.mine.MineIndex(self.funcs.cache)
+        self.funcs.cache.store(
+            "minions/webserver", "mine", dict(ip_addr="2001:db8::1:3")
+        )
+        self.funcs.cache.store(
+            "minions/dbserver", "mine", dict(ip_addr="2001:db8::1:4")
+        )
+        load = {"id": "requester_minion", "tgt": "*", "fun": "ip_addr"}
+        minions = {"minions": ["webserver", "dbserver"], "missing": []}
+        fetch = MagicMock(side_effect=self.funcs.cache.fetch)
+        with patch(
+            "salt.utils.minions.CkMinions._check_glob_minions",
+            MagicMock(return_value=minions),
+        ), patch.object(self.funcs.cache, "fetch", fetch):
+            self.funcs.cache.data[
+                (
+                    salt.utils.mine.MINE_INDEX_BANK,
+                    salt.utils.mine._index_key("ip_addr"),
+                )
+            ] = "stamp"
+            ret = self.funcs._mine_get(load)
+            self.assertDictEqual(
+                ret, dict(webserver="2001:db8::1:3", dbserver="2001:db8::1:4")
+            )
+            fetch.reset_mock()
+            self.assertEqual(self.funcs._mine_get(load), ret)
+            # Only the stamp of the function is read
+            fetch.assert_called_once()
+
+            self.funcs._mine(
+                {"id": "webserver", "data": dict(ip_addr="2001:db8::1:5")},
+                skip_verify=True,
+            )
+            ret = self.funcs._mine_get(load)
+        self.assertDictEqual(
+            ret, dict(webserver="2001:db8::1:5", dbserver="2001:db8::1:4")
+        )
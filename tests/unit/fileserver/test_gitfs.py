@@ -13,8 +13,10 @@ import textwrap
 import pytest
 import salt.ext.tornado.ioloop
 import salt.fileserver.gitfs as gitfs
+import salt.utils.atomicfile
 import salt.utils.files
 import salt.utils.gitfs
+import salt.utils.hashutils
 import salt.utils.platform
 import salt.utils.win_functions
 import salt.utils.yaml
@@ -28,7 +30,7 @@ from salt.utils.gitfs import (
 )
 from tests.support.helpers import patched_environ
 from tests.support.mixins import LoaderModuleMockMixin
-from tests.support.mock import patch
+from tests.support.mock import MagicMock, patch
 from tests.support.runtests import RUNTIME_VARS
 from tests.support.unit import TestCase, skipIf
 
@@ -330,6 +332,96 @@ class GitFSTestFuncs:
 
             self.assertDictEqual(ret, {"data": data, "dest": "testfile"})
 
+    def test_file_list_tree_index(self):
+        with patch.dict(gitfs.__opts__, {"gitfs_tree_index": True}), patch.dict(
+            salt.utils.gitfs._TREE_INDEX_CACHE, clear=True
+        ):
+            gitfs.update()
+            ret = gitfs.file_list(LOAD)
+            self.assertIn("testfile", ret)
+            self.assertIn(UNICODE_FILENAME, ret)
+            self.assertIn("/".join((UNICODE_DIRNAME, "foo.txt")), ret)
+            ret = gitfs.dir_list(LOAD)
+            self.assertIn("grail", ret)
+            self.assertIn(UNICODE_DIRNAME, ret)
+            # The index was written to the cachedir to be shared with other
+            # processes
+            index_dir = os.path.join(gitfs.__opts__["cachedir"], "gitfs", "tree_index")
+            self.assertTrue(os.listdir(index_dir))
+
+    def test_find_file_and_hash_tree_index(self):
+        with patch.dict(
+            gitfs.__opts__,
+            {
+                "gitfs_tree_index": True,
+                "file_buffer_size": 262144,
+                "hash_type": "sha256",
+            },
+        ):
+            gitfs.update()
+            fnd = gitfs.find_file("testfile")
+            self.assertEqual("testfile", fnd["rel"])
+            self.assertIn("blob_sha", fnd)
+            self.assertEqual(gitfs.find_file("grail")["path"], "")
+            self.assertEqual(gitfs.find_file("doesnotexist")["path"], "")
+
+            with patch(
+                "salt.utils.atomicfile.atomic_open",
+                MagicMock(wraps=salt.utils.atomicfile.atomic_open),
+            ) as atomic_open:
+                ret = gitfs.file_hash({"saltenv": "base", "path": "testfile"}, fnd)
+            # The hash is written to a temporary file moved in place
+            atomic_open.assert_called_once()
+            self.assertEqual(
+                ret["hsum"],
+                salt.utils.hashutils.get_hash(
+                    os.path.join(RUNTIME_VARS.BASE_FILES, "testfile"), "sha256"
+                ),
+            )
+            self.assertTrue(
+                os.path.isfile(
+                    os.path.join(
+                        gitfs.__opts__["cachedir"],
+                        "gitfs",
+                        "blob_hash",
+                        "{}.hash.sha256".format(fnd["blob_sha"]),
+                    )
+                )
+            )
+
+    def test_fetch_check_refs(self):
+        with patch.dict(gitfs.__opts__, {"gitfs_fetch_check_refs": True}):
+            gitfs.update()
+            repo = gitfs._gitfs().remotes[0]
+            self.assertTrue(repo.refs_up_to_date())
+            self.assertIsNone(repo.fetch())
+
+    def test_prune_tree_index(self):
+        with patch.dict(
+            gitfs.__opts__, {"gitfs_tree_index": True, "hash_type": "sha256"}
+        ), patch.dict(salt.utils.gitfs._TREE_INDEX_CACHE, clear=True):
+            gitfs.update()
+            fnd = gitfs.find_file("testfile")
+            gitfs.file_hash({"saltenv": "base", "path": "testfile"}, fnd)
+            cache_root = os.path.join(gitfs.__opts__["cachedir"], "gitfs")
+            index_dir = os.path.join(cache_root, "tree_index")
+            blob_dir = os.path.join(cache_root, "blob_hash")
+            indexes = os.listdir(index_dir)
+            blob_hash = "{}.hash.sha256".format(fnd["blob_sha"])
+            for path in (
+                os.path.join(index_dir, "0" * 40 + ".p"),
+                os.path.join(blob_dir, "0" * 40 + ".hash.sha256"),
+                os.path.join(blob_dir, ".___atomic_writetmp"),
+            ):
+                with salt.utils.files.fopen(path, "w") as fp_:
+                    fp_.write("stale")
+            gitfs._gitfs().prune_tree_index()
+            self.assertEqual(sorted(os.listdir(index_dir)), sorted(indexes))
+            # A hash being written is kept
+            self.assertEqual(
+                sorted(os.listdir(blob_dir)), [".___atomic_writetmp", blob_hash]
+            )
+
     @pytest.mark.slow_test
     def test_envs(self):
         gitfs.update()
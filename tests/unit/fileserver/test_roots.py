@@ -240,6 +240,43 @@ class RootsTest(TestCase, AdaptedConfigurationTestCaseMixin, LoaderModuleMockMix
         )
         assert lines_written == expected, lines_written
 
+    def test_update_generations(self):
+        """
+        Test that only the generations of the saltenvs serving modified files
+        are bumped
+        """
+        new_mtime_map = {
+            "/srv/salt/foo.sls": 1594263261.0616212,
+            "/srv/dev/foo.sls": 1594263154.0469685,
+        }
+        file_roots = {"base": ["/srv/salt"], "dev": ["/srv/dev"], "prod": ["/srv/sa"]}
+        mtime_map_path = os.path.join(self.opts["cachedir"], "roots", "mtime_map")
+        mtime_map_mock = mock_open(
+            read_data={
+                mtime_map_path: textwrap.dedent(
+                    """\
+                    /srv/salt/foo.sls:1594263160.9336357
+                    /srv/dev/foo.sls:1594263154.0469685
+                    """
+                ),
+            }
+        )
+        with patch(
+            "salt.fileserver.reap_fileserver_cache_dir", MagicMock(return_value=True)
+        ), patch(
+            "salt.fileserver.generate_mtime_map", MagicMock(return_value=new_mtime_map)
+        ), patch.dict(
+            roots.__opts__, {"fileserver_events": False, "file_roots": file_roots}
+        ), patch(
+            "salt.utils.files.fopen", mtime_map_mock
+        ), patch(
+            "salt.utils.cache.bump_generation", MagicMock(return_value=True)
+        ) as bump_generation:
+            ret = roots.update()
+
+        assert ret["files"]["changed"] == ["/srv/salt/foo.sls"]
+        bump_generation.assert_called_once_with(roots.__opts__, "fileserver_base")
+
     def test_update_mtime_map_unicode_error(self):
         """
         Test that a malformed mtime_map (which causes an UnicodeDecodeError
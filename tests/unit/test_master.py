@@ -70,6 +70,10 @@ class TransportMethodsTest(TestCase):
             "__sizeof__",
             "__str__",
             "__subclasshook__",
+            "_cached_pillar",
+            "_grains_delta",
+            "_pillar_delta",
+            "_store_grains_delta_base",
             "get_method",
             "run_func",
             "destroy",
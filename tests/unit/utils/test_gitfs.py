@@ -6,7 +6,7 @@ any remotes.
 
 import os
 import shutil
-from time import time
+import time
 
 import salt.fileserver.gitfs
 import salt.utils.files
@@ -123,6 +123,86 @@ class TestGitBase(TestCase, AdaptedConfigurationTestCaseMixin):
         self.assertTrue(self.main_class.remotes[0].fetched)
         self.assertFalse(self.main_class.remotes[1].fetched)
 
+    def test_update_concurrent(self):
+        with patch.dict(self.main_class.opts, {"gitfs_fetch_workers": 2}):
+            self.main_class.update()
+        self.assertTrue(self.main_class.remotes[0].fetched)
+        self.assertTrue(self.main_class.remotes[1].fetched)
+        self.assertEqual(
+            sorted(self.main_class.fetch_durations),
+            sorted(remote.id for remote in self.main_class.remotes),
+        )
+
+    def test_update_timeout(self):
+        def _slow_fetch():
+            time.sleep(5)
+            return True
+
+        start = time.time()
+        with patch.dict(
+            self.main_class.opts, {"gitfs_fetch_workers": 2, "gitfs_fetch_timeout": 1}
+        ), patch.object(self.main_class.remotes[0], "fetch", _slow_fetch):
+            changed = self.main_class.fetch_remotes()
+        self.assertLess(time.time() - start, 4)
+        self.assertFalse(changed)
+        self.assertTrue(self.main_class.remotes[1].fetched)
+        self.assertGreaterEqual(
+            self.main_class.fetch_durations[self.main_class.remotes[0].id], 1
+        )
+
+    def test_update_timeout_late_change(self):
+        def _slow_fetch():
+            time.sleep(3)
+            return True
+
+        with patch.dict(
+            self.main_class.opts, {"gitfs_fetch_workers": 2, "gitfs_fetch_timeout": 1}
+        ), patch.dict(salt.utils.gitfs._LATE_CHANGES, clear=True):
+            with patch.object(self.main_class.remotes[0], "fetch", _slow_fetch):
+                self.assertFalse(self.main_class.fetch_remotes())
+                durations = self.main_class.fetch_durations
+                abandoned = durations[self.main_class.remotes[0].id]
+                start = time.time()
+                while not salt.utils.gitfs._LATE_CHANGES and time.time() - start < 10:
+                    time.sleep(0.1)
+            # The abandoned fetch did not record anything in the finished call
+            self.assertEqual(self.main_class.changed_remotes, [])
+            self.assertEqual(durations[self.main_class.remotes[0].id], abandoned)
+            # The next call reports the remote it updated
+            self.assertTrue(self.main_class.fetch_remotes())
+            self.assertEqual(
+                self.main_class.changed_remotes, [self.main_class.remotes[0]]
+            )
+            self.assertFalse(self.main_class.fetch_remotes())
+
+    def test_refs_up_to_date(self):
+        remote = self.main_class.remotes[0]
+        remote_refs = {
+            "HEAD": "a" * 40,
+            "refs/heads/master": "a" * 40,
+            "refs/tags/v1": "b" * 40,
+            "refs/tags/v1^{}": "c" * 40,
+            "refs/pull/1/head": "d" * 40,
+        }
+        local_refs = {
+            "refs/heads/master": "e" * 40,
+            "refs/remotes/origin/master": "a" * 40,
+            "refs/tags/v1": "b" * 40,
+        }
+        with patch.object(
+            remote, "remote_refs", MagicMock(return_value=remote_refs), create=True
+        ), patch.object(
+            remote, "local_refs", MagicMock(return_value=local_refs), create=True
+        ):
+            self.assertTrue(remote.refs_up_to_date())
+            # A moved branch
+            local_refs["refs/remotes/origin/master"] = "f" * 40
+            self.assertFalse(remote.refs_up_to_date())
+            # A branch which was deleted on the remote
+            local_refs["refs/remotes/origin/master"] = "a" * 40
+            local_refs["refs/remotes/origin/old"] = "a" * 40
+            self.assertFalse(remote.refs_up_to_date())
+
 
 class TestGitFSProvider(TestCase):
     def setUp(self):
@@ -217,7 +297,7 @@ class TestPygit2(TestCase):
         filename = "README"
 
         signature = pygit2.Signature(
-            "Dummy Commiter", "dummy@dummy.com", int(time()), 0
+            "Dummy Commiter", "dummy@dummy.com", int(time.time()), 0
         )
 
         repository = pygit2.init_repository(path, False)
@@ -19,6 +19,7 @@ import salt.loader
 # dateutils is needed so that the strftime jinja filter is loaded
 import salt.utils.dateutils  # pylint: disable=unused-import
 import salt.utils.files
+import salt.utils.jinja
 import salt.utils.json
 import salt.utils.stringutils
 import salt.utils.yaml
@@ -28,6 +29,7 @@ from salt.utils.decorators.jinja import JinjaFilter
 from salt.utils.jinja import (
     SaltCacheLoader,
     SerializerExtension,
+    TemplateSourceCache,
     ensure_sequence_filter,
     indent,
     tojson,
@@ -245,6 +247,35 @@ class TestSaltCacheLoader(TestCase):
         result = jinja.get_template("hello_include").render(a="Hi", b="Salt")
         self.assertEqual(result, "Hey world !Hi Salt !")
 
+    def test_template_sources(self):
+        """
+        Templates are fetched only once by the loaders sharing a
+        TemplateSourceCache
+        """
+        sources = TemplateSourceCache()
+        fc, jinja = self.get_test_saltenv()
+        jinja.loader.template_sources = sources
+        self.assertEqual(
+            jinja.get_template("hello_include").render(), "Hey world !a b !"
+        )
+        self.assertEqual(len(fc.requests), 3)
+
+        # A new render, with an empty template cache, in the same run
+        fc, jinja = self.get_test_saltenv()
+        jinja.loader.template_sources = sources
+        self.assertEqual(
+            jinja.get_template("hello_import").render(), "Hey world !a b !"
+        )
+        self.assertEqual(fc.requests, [])
+        self.assertEqual(sources.hits, 2)
+        self.assertRaises(
+            exceptions.TemplateNotFound, jinja.get_template, "does_not_exist"
+        )
+        self.assertRaises(
+            exceptions.TemplateNotFound, jinja.get_template, "does_not_exist"
+        )
+        self.assertEqual(len(fc.requests), 1)
+
     def test_cached_file_client(self):
         """
         Multiple instantiations of SaltCacheLoader use the cached file client
@@ -914,6 +945,28 @@ class TestCustomExtensions(TestCase):
         with self.assertRaises(exceptions.TemplateNotFound):
             env.from_string('{% import_json "does not exists" as doc %}').render()
 
+    def test_load_yaml_cached(self):
+        """
+        Imported data is deserialized once and modifying it in a template does
+        not change the data imported by another template
+        """
+        loader = DictLoader({"defaults": "{pkgs: [vim], options: {debug: false}}"})
+        env = Environment(
+            extensions=[SerializerExtension, "jinja2.ext.do"], loader=loader
+        )
+        source = (
+            '{% import_yaml "defaults" as defaults %}'
+            "{{ defaults.pkgs|length }} {{ defaults.options.debug }}"
+            '{% do defaults.pkgs.append("emacs") %}'
+            '{% do defaults.options.update({"debug": true}) %}'
+        )
+        with patch.object(
+            salt.utils.jinja, "parsed_data_cache", salt.utils.jinja.ParsedDataCache()
+        ) as cache:
+            self.assertEqual(env.from_string(source).render(), "1 False")
+            self.assertEqual(env.from_string(source).render(), "1 False")
+            self.assertEqual(cache.stats(), {"hits": 1, "misses": 1})
+
     def test_load_text_template(self):
         loader = DictLoader({"foo": "Foo!"})
         env = Environment(extensions=[SerializerExtension], loader=loader)